@@ -1,29 +1,89 @@
-from flask import Flask
+import click
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import inspect, text
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 import os
 from datetime import timedelta
 
 db = SQLAlchemy()
-migrate = Migrate()
 jwt = JWTManager()
 
+def init_db():
+    """
+    Creates missing tables and indexes, and the full-text search indexes (FTS5 on
+    SQLite, tsvector + GIN on Postgres) with their sync triggers, and records the
+    active embedding model on a fresh index. Run by `flask init-db`,
+    seed_db.py and the server scripts, not on every process start. Needs an app context.
+    """
+    db.create_all()
+    # create_all() skips tables that already exist, so add columns and indexes declared on the models since.
+    # A NOT NULL column can only be added with a server_default to fill existing rows.
+    existing_columns = {table.name: {column['name'] for column in inspect(db.engine).get_columns(table.name)}
+                        for table in db.metadata.sorted_tables}
+    ddl_compiler = db.engine.dialect.ddl_compiler(db.engine.dialect, None)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for column in table.columns:
+                if column.name in existing_columns[table.name]:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                if column.nullable:
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                elif column.server_default is not None:
+                    default = ddl_compiler.get_column_default_string(column)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} NOT NULL DEFAULT {default}'))
+                else:
+                    current_app.logger.warning(f"Cannot add NOT NULL column {table.name}.{column.name} without a server default; migrate it by hand")
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    from app.services.search_service import ensure_search_indexes
+    ensure_search_indexes()
+    from app.services.embedding_service import ensure_active_embedding_model
+    ensure_active_embedding_model()
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object('app.config.Config')
+    # LLM_PROVIDER defaults to the provider LLM_MODEL_NAME belongs to (e.g. gemini-pro -> gemini)
+    from app.services.llm_provider import resolve_llm_provider
+    resolve_llm_provider(app)
+
+    # Hash uploaded files while the request body is received (raw-byte deduplication)
+    from app.utils.upload_hashing import HashingRequest
+    app.request_class = HashingRequest
+
+    # Behind reverse proxies, take the client address and scheme from the X-Forwarded-* headers they set.
+    # Only the last TRUSTED_PROXY_COUNT hops are believed, so clients cannot spoof their address.
+    if app.config['TRUSTED_PROXY_COUNT'] > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
 
+    # Pool sizing, Postgres statement timeout, SQLite WAL and pragmas (from the SQLITE_* / DB_* settings)
+    from app.utils.db_engine import engine_options, register_engine_events
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(app.config), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        for engine in db.engines.values():
+            register_engine_events(engine, app.config)
     jwt.init_app(app)
+    # Flask-Migrate (alembic) is only needed by the `flask db` commands; skip its import otherwise
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
     CORS(app, resources={r"/api/*": {"origins": "*"}}) # Allow CORS for frontend
 
     # Import models so Flask-Migrate can detect them
     from app import models
 
-    with app.app_context():
-        db.create_all()
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create missing tables and search indexes."""
+        init_db()
+        click.echo("Database schema is up to date.")
 
     # Register Blueprints
     from app.api.auth import auth_bp
@@ -31,12 +91,22 @@ def create_app():
     from app.api.pdf_parser import pdf_parser_bp
     from app.api.rag import rag_bp
     from app.api.timetable import timetable_bp
+    from app.api.exports import exports_bp
+    from app.api.search import search_bp
+    from app.api.health import health_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api')
     app.register_blueprint(documents_bp, url_prefix='/api')
     app.register_blueprint(pdf_parser_bp, url_prefix='/api')
     app.register_blueprint(rag_bp, url_prefix='/api')
     app.register_blueprint(timetable_bp, url_prefix='/api')
+    app.register_blueprint(exports_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(health_bp) # /healthz and /readyz, for load balancers and orchestrators
+
+    # Per-route latency histograms and error counters, served on /metrics
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
 
     @app.route('/')
     def index():
@@ -1,11 +1,39 @@
-from flask import Blueprint, request, jsonify
+import threading
+from flask import Blueprint, request, jsonify, current_app
 from app import db, jwt
 from app.models import User
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-import bcrypt # Import bcrypt
+from app.services.password_hashing import PasswordHasherBusy, hash_password, needs_rehash, verify_dummy_password, verify_password
+from app.services.user_identity import token_claims, user_from_token
+from app.utils.rate_limit import FailureRateLimiter
+from flask_jwt_extended import create_access_token, create_refresh_token, current_user, jwt_required, get_jwt_identity
 
 auth_bp = Blueprint('auth', __name__)
 
+_login_limiter = None
+_login_limiter_lock = threading.Lock()
+
+def _get_login_limiter() -> FailureRateLimiter:
+    global _login_limiter
+    if _login_limiter is None:
+        with _login_limiter_lock:
+            if _login_limiter is None:
+                _login_limiter = FailureRateLimiter(window_seconds=current_app.config['LOGIN_FAILURE_WINDOW_SECONDS'])
+    return _login_limiter
+
+@jwt.user_lookup_loader
+def _lookup_token_user(jwt_header, jwt_data):
+    # Runs for every @jwt_required request; served from the user cache, not a query per request
+    return user_from_token(jwt_data)
+
+@jwt.user_lookup_error_loader
+def _token_user_error(jwt_header, jwt_data):
+    return jsonify({"message": "Session is no longer valid, please log in again"}), 401
+
+def _busy_response():
+    response = jsonify({"message": "Authentication service is busy, please retry shortly"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     username = request.json.get('username', None)
@@ -14,23 +42,61 @@ def login():
     if not username or not password:
         return jsonify({"message": "Missing username or password"}), 400
 
+    # Refuse before any bcrypt work once a username or client has too many recent failures.
+    # remote_addr is the real client behind TRUSTED_PROXY_COUNT proxies (ProxyFix in create_app)
+    limiter = _get_login_limiter()
+    user_key, ip_key = f"user:{username.lower()}", f"ip:{request.remote_addr}"
+    retry_after = limiter.retry_after({
+        user_key: current_app.config['LOGIN_MAX_FAILURES_PER_USERNAME'],
+        ip_key: current_app.config['LOGIN_MAX_FAILURES_PER_IP'],
+    })
+    if retry_after:
+        response = jsonify({"message": "Too many failed login attempts, try again later"})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+
     user = User.query.filter_by(username=username).first()
 
-    if user and bcrypt.checkpw(password.encode('utf-8'), user.password_hash.encode('utf-8')):
-        # For debugging: print the JWT_SECRET_KEY
-        from flask import current_app
-        current_app.logger.debug(f"JWT_SECRET_KEY used for token creation: {current_app.config['JWT_SECRET_KEY']}")
+    try:
+        if user:
+            valid = verify_password(password, user.password_hash)
+        else:
+            verify_dummy_password(password)
+            valid = False
+    except PasswordHasherBusy:
+        return _busy_response()
 
-        access_token = create_access_token(identity=str(user.id))
-        return jsonify(access_token=access_token), 200
-    else:
+    if not valid:
+        limiter.record_failure([user_key, ip_key])
         return jsonify({"message": "Bad username or password"}), 401
 
+    limiter.reset(user_key)
+    if needs_rehash(user.password_hash):
+        # Transparent upgrade to the current cost factor while the plaintext is at hand
+        try:
+            user.password_hash = hash_password(password)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Password rehash for user {user.id} failed: {e}")
+
+    claims = token_claims(user)
+    access_token = create_access_token(identity=str(user.id), additional_claims=claims)
+    refresh_token = create_refresh_token(identity=str(user.id), additional_claims=claims)
+    return jsonify(access_token=access_token, refresh_token=refresh_token), 200
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """New access token for a still-valid refresh token; no password check, so no bcrypt work."""
+    access_token = create_access_token(identity=get_jwt_identity(), additional_claims=token_claims(current_user))
+    return jsonify(access_token=access_token), 200
+
 @auth_bp.route('/protected', methods=['GET'])
 @jwt_required()
 def protected():
     current_user_id = get_jwt_identity()
-    return jsonify(logged_in_as=current_user_id), 200
+    return jsonify(logged_in_as=current_user_id, is_admin=current_user.is_admin), 200
 
 # Endpoint to create an admin user (for initial setup, could be restricted in production)
 @auth_bp.route('/register_admin', methods=['POST'])
@@ -48,7 +114,10 @@ def register_admin():
         return jsonify({"message": "Email already exists"}), 409
 
     # Hash the password
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    try:
+        hashed_password = hash_password(password)
+    except PasswordHasherBusy:
+        return _busy_response()
 
     new_user = User(username=username, password_hash=hashed_password, email=email, is_admin=True)
     db.session.add(new_user)
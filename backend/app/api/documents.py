@@ -1,26 +1,49 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import GeneratedDocument, User
-from app.services.document_generation import generate_document_llm
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.enums import TA_CENTER
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from app.models import GeneratedDocument
+from app.services.document_generation import MAX_OUTPUT_TOKENS, build_rag_query, generate_document_cached, stream_document_cached
+from app.services.prompt_budget import llm_call_token_counts, select_rag_context
+from app.services.batch_generation import generate_documents_batch
+from app.services.pdf_rendering import document_pdf_filename, get_cached_document_pdf
+from app.utils.pagination import get_page_limit, keyset_paginate, like_pattern
 import os
-import io
+import json
 from datetime import datetime
 
 documents_bp = Blueprint('documents', __name__)
 
+def _retrieve_rag_context(document_type, inputs):
+    """
+    RAG: Retrieve relevant context based on inputs and trim it to the prompt's token budget.
+    Returns the `select_rag_context` result (context blocks, chunk ids, token counts).
+    """
+    rag_query = build_rag_query(inputs)
+    relevant_embeddings = []
+    
+    if rag_query.strip():
+        try:
+            from app.services.embedding_service import get_embeddings_for_query
+            relevant_embeddings = get_embeddings_for_query(rag_query, top_k=current_app.config['RAG_TOP_K'])
+        except Exception as rag_error:
+            current_app.logger.warning(f"RAG retrieval failed, continuing without RAG context: {rag_error}")
+            # Continue without RAG context - fallback template will be used
+    selection = select_rag_context(document_type, inputs, relevant_embeddings, MAX_OUTPUT_TOKENS)
+    if selection["dropped_chunks"]:
+        current_app.logger.debug(f"Dropped {selection['dropped_chunks']} RAG chunks to fit the prompt token budget")
+    return selection
+
+def _bypass_cache(data):
+    """Clients skip the generation cache with {"bypass_cache": true} or ?cache=bypass."""
+    return bool(data.get('bypass_cache')) or request.args.get('cache') == 'bypass'
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @documents_bp.route('/generate-document', methods=['POST'])
 @jwt_required()
 def generate_document():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"message": "User not found"}), 404
+    current_user_id = get_jwt_identity() # The user's existence is checked (cached) by the JWT user lookup
 
     data = request.json
     document_type = data.get('document_type')
@@ -29,24 +52,12 @@ def generate_document():
     if not document_type or not inputs:
         return jsonify({"message": "Missing document_type or inputs"}), 400
 
-    # RAG: Retrieve relevant context based on inputs
-    # Use a simple combination of inputs as the query for now
-    rag_query = f"{inputs.get('title', '')} {inputs.get('event_name', '')} {inputs.get('department', '')} {inputs.get('details', '')}"
-    rag_context_chunks = []
-    rag_context_ids = []
-    
-    if rag_query.strip():
-        try:
-            from app.services.embedding_service import get_embeddings_for_query
-            relevant_embeddings = get_embeddings_for_query(rag_query, top_k=current_app.config['RAG_TOP_K'])
-            rag_context_chunks = [item['text_chunk'] for item in relevant_embeddings]
-            rag_context_ids = [item['id'] for item in relevant_embeddings]
-        except Exception as rag_error:
-            current_app.logger.warning(f"RAG retrieval failed, continuing without RAG context: {rag_error}")
-            # Continue without RAG context - fallback template will be used
+    rag = _retrieve_rag_context(document_type, inputs)
 
     try:
-        generated_text = generate_document_llm(document_type, inputs, rag_context_chunks)
+        generated_text, cache_status, from_llm = generate_document_cached(
+            document_type, inputs, rag["context"], rag["chunk_ids"], bypass_cache=_bypass_cache(data)
+        )
     except Exception as e:
         current_app.logger.error(f"LLM generation failed: {e}")
         return jsonify({"message": "Failed to generate document with LLM", "error": str(e)}), 500
@@ -57,19 +68,132 @@ def generate_document():
         generated_by=current_user_id,
         content=generated_text,
         admin_inputs=inputs,
-        rag_context_ids=rag_context_ids
+        rag_context_ids=json.dumps(rag["chunk_ids"]), # Text column holding a JSON list
+        **llm_call_token_counts(rag, generated_text, from_llm)
     )
     db.session.add(new_document)
     db.session.commit()
 
-    return jsonify({"message": "Document generated successfully", "document_id": new_document.id, "generated_text": generated_text}), 201
+    return jsonify({"message": "Document generated successfully", "document_id": new_document.id, "generated_text": generated_text, "cache": cache_status}), 201
+
+@documents_bp.route('/generate-document/stream', methods=['POST'])
+@jwt_required()
+def generate_document_stream():
+    """
+    Streaming variant of /generate-document using Server-Sent Events:
+    `start` is sent immediately, then one `delta` event per piece of text as the
+    LLM produces it, then `done` with the id of the persisted GeneratedDocument.
+    """
+    current_user_id = get_jwt_identity()
+
+    data = request.json
+    document_type = data.get('document_type')
+    inputs = data.get('inputs')
+
+    if not document_type or not inputs:
+        return jsonify({"message": "Missing document_type or inputs"}), 400
+    bypass_cache = _bypass_cache(data)
+
+    def generate():
+        # Flush a first event before RAG retrieval and the LLM call so time-to-first-byte stays low
+        yield _sse_event('start', {"document_type": document_type})
+
+        rag = _retrieve_rag_context(document_type, inputs)
+        pieces = []
+        try:
+            cache_status, stream = stream_document_cached(
+                document_type, inputs, rag["context"], rag["chunk_ids"], bypass_cache=bypass_cache
+            )
+            while True:
+                try:
+                    piece = next(stream)
+                except StopIteration as stop:
+                    from_llm = bool(stop.value) # False for cache hits and template fallbacks
+                    break
+                pieces.append(piece)
+                yield _sse_event('delta', {"text": piece})
+        except Exception as e:
+            current_app.logger.error(f"LLM generation failed: {e}")
+            yield _sse_event('error', {"message": "Failed to generate document with LLM", "error": str(e)})
+            return
+
+        generated_text = "".join(pieces)
+        new_document = GeneratedDocument(
+            title=inputs.get('title', f'{document_type} - {datetime.now().strftime("%Y%m%d%H%M%S")}'),
+            document_type=document_type,
+            generated_by=current_user_id,
+            content=generated_text,
+            admin_inputs=inputs,
+            rag_context_ids=json.dumps(rag["chunk_ids"]), # Text column holding a JSON list
+            **llm_call_token_counts(rag, generated_text, from_llm)
+        )
+        db.session.add(new_document)
+        db.session.commit()
+        yield _sse_event('done', {"message": "Document generated successfully", "document_id": new_document.id, "cache": cache_status})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'} # Disable proxy buffering
+    )
+
+@documents_bp.route('/generate-documents/batch', methods=['POST'])
+@jwt_required()
+def generate_documents_batch_route():
+    """
+    Generates several documents in one request, e.g. one circular per department.
+    Body: {"items": [{"document_type": ..., "inputs": {...}}, ...], "bypass_cache": false}
+    """
+    current_user_id = get_jwt_identity()
+
+    data = request.json or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "Missing items"}), 400
+    max_items = current_app.config['GENERATION_BATCH_MAX_ITEMS']
+    if len(items) > max_items:
+        return jsonify({"message": f"Too many items: at most {max_items} per batch"}), 400
+
+    try:
+        results = generate_documents_batch(items, current_user_id, bypass_cache=_bypass_cache(data))
+    except ValueError as e: # e.g. an unsupported LLM_PROVIDER
+        return jsonify({"message": str(e)}), 400
+    succeeded = sum(1 for result in results if result.get('document_id'))
+    return jsonify({
+        "message": f"Generated {succeeded} of {len(results)} documents",
+        "results": results
+    }), 200
 
 @documents_bp.route('/documents/history', methods=['GET'])
 @jwt_required()
 def get_documents_history():
+    """
+    Documents generated by the current user, newest first, one page at a time.
+    Query: limit, cursor (next_cursor of the previous page), document_type, status, q (title search).
+    """
     current_user_id = get_jwt_identity()
-    # Fetch documents generated by the current user
-    history = GeneratedDocument.query.filter_by(generated_by=current_user_id).order_by(GeneratedDocument.generation_date.desc()).all()
+    # Only the listed columns: content and admin_inputs can be large
+    query = db.session.query(
+        GeneratedDocument.id,
+        GeneratedDocument.title,
+        GeneratedDocument.document_type,
+        GeneratedDocument.generation_date,
+        GeneratedDocument.status
+    ).filter(GeneratedDocument.generated_by == current_user_id)
+
+    if request.args.get('document_type'):
+        query = query.filter(GeneratedDocument.document_type == request.args['document_type'])
+    if request.args.get('status'):
+        query = query.filter(GeneratedDocument.status == request.args['status'])
+    if request.args.get('q'):
+        query = query.filter(GeneratedDocument.title.ilike(like_pattern(request.args['q']), escape='\\'))
+
+    try:
+        history, next_cursor = keyset_paginate(
+            query, GeneratedDocument, GeneratedDocument.generation_date, request.args.get('cursor'), get_page_limit(request.args)
+        )
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
     output = []
     for doc in history:
@@ -80,7 +204,7 @@ def get_documents_history():
             "generation_date": doc.generation_date.isoformat(),
             "status": doc.status
         })
-    return jsonify(output), 200
+    return jsonify({"items": output, "next_cursor": next_cursor}), 200
 
 @documents_bp.route('/documents/<int:doc_id>', methods=['GET'])
 @jwt_required()
@@ -98,7 +222,10 @@ def get_document_details(doc_id):
         "generation_date": document.generation_date.isoformat(),
         "content": document.content,
         "admin_inputs": document.admin_inputs,
-        "rag_context_ids": document.rag_context_ids,
+        "rag_context_ids": json.loads(document.rag_context_ids) if document.rag_context_ids else [],
+        "prompt_tokens": document.prompt_tokens,
+        "context_tokens": document.context_tokens,
+        "completion_tokens": document.completion_tokens,
         "status": document.status,
         "pdf_filepath": document.pdf_filepath
     }), 200
@@ -112,59 +239,9 @@ def download_document_pdf(doc_id):
     if not document:
         return jsonify({"message": "Document not found or unauthorized"}), 404
 
-    # Generate PDF dynamically
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
-    # Custom style for title
-    title_style = ParagraphStyle(
-        name='CustomTitle',
-        parent=styles['h1'],
-        fontSize=18,
-        leading=22,
-        alignment=TA_CENTER,
-        spaceAfter=14
+    path, etag = get_cached_document_pdf(document)
+    # conditional=True answers a matching If-None-Match with 304 Not Modified
+    return send_file(
+        path, as_attachment=True, download_name=document_pdf_filename(document),
+        mimetype='application/pdf', etag=etag, conditional=True, max_age=0
     )
-    # Custom style for document type
-    doc_type_style = ParagraphStyle(
-        name='CustomDocType',
-        parent=styles['h2'],
-        fontSize=14,
-        leading=16,
-        alignment=TA_CENTER,
-        spaceAfter=12,
-        textColor='gray'
-    )
-    # Custom style for content
-    content_style = ParagraphStyle(
-        name='CustomContent',
-        parent=styles['Normal'],
-        fontSize=10,
-        leading=14,
-        spaceAfter=8,
-    )
-
-
-    story = []
-    story.append(Paragraph(document.title, title_style))
-    story.append(Paragraph(document.document_type.upper(), doc_type_style))
-    story.append(Spacer(1, 0.2 * 1.5 * 10)) # 0.2 inch spacer
-
-    # Add generation metadata
-    story.append(Paragraph(f"<b>Date:</b> {document.generation_date.strftime('%Y-%m-%d')}", styles['Normal']))
-    story.append(Paragraph(f"<b>Department:</b> {document.admin_inputs.get('department', 'N/A')}", styles['Normal']))
-    story.append(Spacer(1, 0.2 * 10))
-
-    # Add content
-    for paragraph_text in document.content.split('\n\n'): # Split by double newlines for paragraphs
-        if paragraph_text.strip():
-            story.append(Paragraph(paragraph_text.strip(), content_style))
-            story.append(Spacer(1, 0.1 * 10)) # Small spacer between paragraphs
-
-    doc.build(story)
-
-    buffer.seek(0)
-    
-    filename = f"{document.title.replace(' ', '_')}_{document.document_type.replace(' ', '_')}.pdf"
-    return send_file(buffer, as_attachment=True, download_name=filename, mimetype='application/pdf')
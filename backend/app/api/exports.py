@@ -0,0 +1,64 @@
+import os
+from flask import Blueprint, request, jsonify, current_app, Response, send_file, stream_with_context, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.bulk_export import (
+    create_export_job, export_archive_path, export_job_dict, get_export_job, tail_export_archive,
+)
+from datetime import datetime
+
+exports_bp = Blueprint('exports', __name__)
+
+@exports_bp.route('/exports', methods=['POST'])
+@jwt_required()
+def create_export():
+    """
+    Starts a bulk PDF export; its archive is built in the background.
+    Body: {"document_ids": [1, 2, ...], "timetable_draft_id": 3} (either or both)
+    """
+    current_user_id = get_jwt_identity()
+    data = request.json or {}
+    try:
+        job = create_export_job(current_user_id, data.get('document_ids') or [], data.get('timetable_draft_id'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": str(e)}), 400
+
+    return jsonify({
+        "message": "Export created",
+        **export_job_dict(job),
+        "download_url": url_for('exports.download_export', job_id=job.id)
+    }), 202
+
+@exports_bp.route('/exports/<job_id>', methods=['GET'])
+@jwt_required()
+def get_export_status(job_id):
+    job = get_export_job(job_id, get_jwt_identity())
+    if not job:
+        return jsonify({"message": "Export not found or unauthorized"}), 404
+    return jsonify(export_job_dict(job)), 200
+
+@exports_bp.route('/exports/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export(job_id):
+    """
+    Downloads the zip archive. A finished archive is sent as a file; one still
+    being built is streamed (chunked) as its PDFs are added. Poll /exports/<job_id> for progress.
+    """
+    job = get_export_job(job_id, get_jwt_identity())
+    if not job:
+        return jsonify({"message": "Export not found or unauthorized"}), 404
+    if job.status == 'failed':
+        return jsonify({"message": "Export failed", **export_job_dict(job)}), 409
+
+    filename = f"export_{(job.created_at or datetime.now()).strftime('%Y%m%d%H%M%S')}.zip"
+    path = export_archive_path(job.id)
+    if job.status == 'completed':
+        if not os.path.exists(path):
+            return jsonify({"message": "Export archive has expired"}), 410
+        return send_file(path, mimetype='application/zip', as_attachment=True, download_name=filename, conditional=True, max_age=0)
+
+    current_app.logger.info(f"Export {job.id}: streaming while {job.total - job.done - job.failed} of {job.total} PDFs are pending")
+    return Response(
+        stream_with_context(tail_export_archive(job.id)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+    )
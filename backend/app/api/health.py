@@ -0,0 +1,26 @@
+from flask import Blueprint, jsonify, current_app
+from sqlalchemy import text
+from app import db
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving requests. Touches nothing else, so it stays cheap under load."""
+    return jsonify({"status": "ok"}), 200
+
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: the worker can serve real traffic, i.e. the database answers. 503 otherwise."""
+    checks = {}
+    try:
+        db.session.execute(text("SELECT 1"))
+        checks["database"] = "ok"
+    except Exception as e:
+        current_app.logger.warning(f"Readiness check failed: {e}")
+        checks["database"] = "unavailable"
+    finally:
+        db.session.remove()
+
+    ready = all(status == "ok" for status in checks.values())
+    return jsonify({"status": "ready" if ready else "unavailable", "checks": checks}), 200 if ready else 503
@@ -5,8 +5,9 @@ import os
 import hashlib
 from app import db
 from app.models import UploadedDocument
-from app.utils.pdf_extractor import extract_text_from_pdf, chunk_text
-# from app.services.embedding_service import create_embeddings_for_document
+from app.utils.pdf_extractor import extract_text_from_pdf
+from app.utils.upload_hashing import raw_upload_hash
+# from app.services.embedding_service import create_embeddings_for_document, get_chunk_token_budget, get_token_counter
 from datetime import datetime
 
 pdf_parser_bp = Blueprint('pdf_parser', __name__)
@@ -29,19 +30,30 @@ def upload_pdf():
         return jsonify({"message": "No selected file"}), 400
 
     if file and allowed_file(file.filename):
+        # Level 1 dedup: hash of the raw upload bytes, checked before anything is written or parsed
+        raw_hash = raw_upload_hash(file)
+        existing_doc = UploadedDocument.query.filter_by(raw_content_hash=raw_hash).first()
+        if existing_doc:
+            return jsonify({
+                "message": "PDF already exists in knowledge base.",
+                "document_id": existing_doc.id,
+                "status": "duplicate"
+            }), 200
+
         filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         unique_filename = f"{timestamp}_{filename}"
+        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
         filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
         file.save(filepath)
 
         try:
             # 1. Parse PDF
-            parsed_text, metadata = extract_text_from_pdf(filepath)
+            parsed_text, metadata = extract_text_from_pdf(filepath, workers=current_app.config['PDF_EXTRACT_WORKERS'])
             if not parsed_text:
                 raise ValueError("Could not extract text from PDF.")
 
-            # Calculate hash of the extracted text content for deduplication
+            # Level 2 dedup: hash of the extracted text content (same circular, different bytes)
             content_hash = hashlib.sha256(parsed_text.encode('utf-8')).hexdigest()
 
             # Check for duplicates based on content hash
@@ -61,6 +73,7 @@ def upload_pdf():
                 uploaded_by=current_user_id,
                 document_type=request.form.get('document_type', 'unknown'), # Can be passed from frontend form
                 original_content_hash=content_hash,
+                raw_content_hash=raw_hash,
                 document_metadata=metadata,
                 parsed_text=parsed_text,
                 status='processed'
@@ -68,8 +81,9 @@ def upload_pdf():
             db.session.add(new_doc)
             db.session.commit()
 
-            # 3. Create Embeddings for RAG
-            # chunks = chunk_text(parsed_text, current_app.config['CHUNK_SIZE'], current_app.config['CHUNK_OVERLAP'])
+            # 3. Create Embeddings for RAG -- deferred: uploads are not embedded yet. When enabled,
+            # stream the chunks with app.utils.pdf_extractor.iter_pdf_chunks rather than re-splitting parsed_text:
+            # chunks = iter_pdf_chunks(filepath, get_chunk_token_budget(), current_app.config['CHUNK_OVERLAP_TOKENS'], get_token_counter(), workers=current_app.config['PDF_EXTRACT_WORKERS'])
             # create_embeddings_for_document(new_doc.id, chunks)
 
             return jsonify({"message": "PDF uploaded and processed successfully", "document_id": new_doc.id}), 201
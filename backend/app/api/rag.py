@@ -1,35 +1,105 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required
-# from app.services.embedding_service import get_embeddings_for_query, get_chunks_by_ids
+from flask_jwt_extended import current_user, jwt_required
 
 rag_bp = Blueprint('rag', __name__)
 
 @rag_bp.route('/rag/search', methods=['POST'])
 @jwt_required()
 def rag_search():
-    data = request.json
+    """
+    Body: {"query": ..., "top_k": 5, "page_size": 10, "cursor": null, "max_chars": null}
+    top_k is capped server-side. Pass the returned next_cursor (with the same query
+    and top_k) to get the next page; max_chars truncates each chunk's text.
+    """
+    from app.services.rag_search import search_chunks
+    data = request.json or {}
     query_text = data.get('query')
-    top_k = data.get('top_k', current_app.config['RAG_TOP_K'])
 
     if not query_text:
         return jsonify({"message": "Missing query text"}), 400
 
     try:
-        relevant_chunks = get_embeddings_for_query(query_text, top_k=top_k)
-        return jsonify(relevant_chunks), 200
+        page = search_chunks(
+            query_text,
+            top_k=data.get('top_k'),
+            page_size=data.get('page_size'),
+            cursor=data.get('cursor'),
+            max_chars=data.get('max_chars')
+        )
+        return jsonify(page), 200
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"RAG search failed: {e}")
         return jsonify({"message": f"RAG search failed: {str(e)}"}), 500
 
+@rag_bp.route('/rag/chunks', methods=['POST'])
+@jwt_required()
+def get_rag_chunks():
+    """Body: {"ids": [1, 2, ...], "max_chars": null}; at most RAG_CHUNKS_MAX_IDS ids."""
+    from app.services.rag_search import fetch_chunks
+    data = request.json or {}
+    try:
+        return jsonify(fetch_chunks(data.get('ids'), max_chars=data.get('max_chars'))), 200
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Failed to retrieve chunks: {e}")
+        return jsonify({"message": f"Failed to retrieve chunks: {str(e)}"}), 500
+
 @rag_bp.route('/rag/chunks/<string:chunk_ids>', methods=['GET'])
 @jwt_required()
 def get_rag_chunks_by_id(chunk_ids):
+    """Kept for existing clients; same limits as POST /rag/chunks, which should be preferred."""
+    from app.services.rag_search import fetch_chunks
     try:
         ids = [int(x) for x in chunk_ids.split(',')]
-        chunks = get_chunks_by_ids(ids)
-        return jsonify(chunks), 200
     except ValueError:
         return jsonify({"message": "Invalid chunk IDs format. Expected comma-separated integers."}), 400
+    try:
+        return jsonify(fetch_chunks(ids)), 200
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Failed to retrieve chunks: {e}")
         return jsonify({"message": f"Failed to retrieve chunks: {str(e)}"}), 500
+
+@rag_bp.route('/rag/reembed', methods=['POST'])
+@jwt_required()
+def start_rag_reembedding():
+    """
+    Starts (or resumes from its checkpoint) re-embedding the knowledge base with a new embedding model.
+    Body: model_name, batch_size, rebuild (true discards the model's rows built so far).
+    Admins only; model_name must be in EMBEDDING_REEMBED_ALLOWED_MODELS.
+    """
+    if not current_user.is_admin:
+        return jsonify({"message": "Only administrators can re-embed the knowledge base"}), 403
+    from app.services.reembedding import start_reembedding
+    data = request.json or {}
+    try:
+        version, started = start_reembedding(data.get('model_name'), data.get('batch_size'), data.get('rebuild') is True)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Failed to start re-embedding: {e}")
+        return jsonify({"message": f"Failed to start re-embedding: {str(e)}"}), 500
+    message = "Re-embedding started" if started else "Re-embedding is already running"
+    return jsonify({"message": message, "model_name": version.model_name, "status": version.status, "rows_done": version.rows_done}), 202
+
+@rag_bp.route('/rag/reembed/status', methods=['GET'])
+@jwt_required()
+def get_rag_reembedding_status():
+    from app.models import EmbeddingModelVersion
+    from app.services.reembedding import is_reembedding_running
+    versions = EmbeddingModelVersion.query.order_by(EmbeddingModelVersion.started_at.desc()).all()
+    return jsonify([{
+        "model_name": version.model_name,
+        "dimension": version.dimension,
+        "status": version.status,
+        "source_model_name": version.source_model_name,
+        "rows_done": version.rows_done,
+        "running": is_reembedding_running(version),
+        "error": version.error,
+        "started_at": version.started_at.isoformat() if version.started_at else None,
+        "activated_at": version.activated_at.isoformat() if version.activated_at else None
+    } for version in versions]), 200
@@ -0,0 +1,33 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.search_service import search_documents
+from app.utils.pagination import get_page_limit
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search():
+    """
+    Full-text search over your generated documents and the uploaded knowledge base.
+    Query: q, scope=generated|uploaded|all (default all), limit, offset.
+    """
+    current_user_id = get_jwt_identity()
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({"message": "Missing search query"}), 400
+
+    limit = get_page_limit(request.args)
+    offset = max(0, request.args.get('offset', 0, type=int))
+    if offset > current_app.config['SEARCH_MAX_OFFSET']:
+        return jsonify({"message": f"offset must be at most {current_app.config['SEARCH_MAX_OFFSET']}; refine the query instead"}), 400
+
+    try:
+        results = search_documents(query, current_user_id, request.args.get('scope', 'all'), limit, offset)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Search failed: {e}")
+        return jsonify({"message": f"Search failed: {str(e)}"}), 500
+
+    return jsonify({"query": query, "limit": limit, "offset": offset, **results}), 200
@@ -1,12 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import TimetableConfiguration, TimetableDraft, XaiLog, Faculty, Subject, Room
 from app.services.timetable_solver import generate_timetable_draft_with_xai
+from app.services.solver_profiling import NULL_PROFILER, SolverProfiler, write_profile
+from app.services.timetable_rendering import get_cached_timetable_render
+from app.utils.metrics import stage
+from app.utils.pagination import get_page_limit, keyset_paginate, like_pattern
 from datetime import datetime
 
 timetable_bp = Blueprint('timetable', __name__)
 
+PROFILE_LOG_TYPE = 'profile' # XAI log entry holding a profiled run's summary; kept out of the explanation list
+
 @timetable_bp.route('/timetable/configs', methods=['GET'])
 @jwt_required()
 def get_timetable_configs():
@@ -28,6 +34,11 @@ def get_timetable_configs():
 @timetable_bp.route('/timetable/generate', methods=['POST'])
 @jwt_required()
 def generate_timetable():
+    """
+    Runs the solver for a configuration and stores the draft with its XAI log.
+    Body: config_id, inputs, profile (optional; true records per-rule solver timings,
+    also enabled for every run by SOLVER_PROFILE=true).
+    """
     current_user_id = get_jwt_identity()
     data = request.json
     config_id = data.get('config_id')
@@ -45,14 +56,17 @@ def generate_timetable():
         faculties = Faculty.query.all()
         subjects = Subject.query.all()
         rooms = Room.query.all()
+        profiler = SolverProfiler() if data.get('profile') is True or current_app.config['SOLVER_PROFILE_ENABLED'] else NULL_PROFILER
 
-        draft_content, xai_logs_data = generate_timetable_draft_with_xai(
-            config=config,
-            inputs=inputs, # Admin-provided specific allocations/preferences
-            all_faculties=faculties,
-            all_subjects=subjects,
-            all_rooms=rooms
-        )
+        with stage('solver_run'):
+            draft_content, xai_logs_data = generate_timetable_draft_with_xai(
+                config=config,
+                inputs=inputs, # Admin-provided specific allocations/preferences
+                all_faculties=faculties,
+                all_subjects=subjects,
+                all_rooms=rooms,
+                profiler=profiler
+            )
 
         new_draft = TimetableDraft(
             config_id=config_id,
@@ -63,19 +77,36 @@ def generate_timetable():
         db.session.add(new_draft)
         db.session.flush() # To get new_draft.id before committing
 
+        solver_profile = None
+        if profiler.enabled:
+            try:
+                profile_file = write_profile(profiler, current_app.config['SOLVER_PROFILE_FOLDER'], new_draft.id)
+            except OSError as e:
+                current_app.logger.warning(f"Could not write the solver profile of draft {new_draft.id}: {e}")
+                profile_file = None
+            solver_profile = profiler.summary(profile_file)
+            xai_logs_data.append({
+                "log_type": PROFILE_LOG_TYPE,
+                "rule_name": "Solver_Profile",
+                "slot_details": solver_profile,
+                "explanation": f"Solver run took {solver_profile['total_ms']} ms; slowest rule: {next(iter(solver_profile['rules']), 'none')}.",
+                "priority": 1
+            })
+
         # Store XAI logs
-        for log_data in xai_logs_data:
-            xai_log = XaiLog(
-                timetable_draft_id=new_draft.id,
-                log_type=log_data['log_type'],
-                rule_name=log_data['rule_name'],
-                slot_details=log_data['slot_details'],
-                explanation=log_data['explanation'],
-                priority=log_data.get('priority', 1)
-            )
-            db.session.add(xai_log)
+        with stage('xai_persist'):
+            for log_data in xai_logs_data:
+                xai_log = XaiLog(
+                    timetable_draft_id=new_draft.id,
+                    log_type=log_data['log_type'],
+                    rule_name=log_data['rule_name'],
+                    slot_details=log_data['slot_details'],
+                    explanation=log_data['explanation'],
+                    priority=log_data.get('priority', 1)
+                )
+                db.session.add(xai_log)
 
-        db.session.commit()
+            db.session.commit()
 
         # Prepare XAI logs for response (make them serializable)
         response_xai_logs = [{
@@ -85,15 +116,17 @@ def generate_timetable():
             "explanation": log.explanation,
             "priority": log.priority,
             "timestamp": log.timestamp.isoformat()
-        } for log in new_draft.xai_logs]
-
+        } for log in new_draft.xai_logs if log.log_type != PROFILE_LOG_TYPE]
 
-        return jsonify({
+        response = {
             "message": "Timetable draft generated successfully",
             "draft_id": new_draft.id,
             "draft_content": draft_content,
             "xai_logs": response_xai_logs
-        }), 201
+        }
+        if solver_profile:
+            response["solver_profile"] = solver_profile
+        return jsonify(response), 201
 
     except Exception as e:
         current_app.logger.error(f"Timetable generation failed: {e}")
@@ -103,8 +136,33 @@ def generate_timetable():
 @timetable_bp.route('/timetable/drafts', methods=['GET'])
 @jwt_required()
 def get_timetable_drafts():
+    """
+    Timetable drafts of the current user, newest first, one page at a time.
+    Query: limit, cursor (next_cursor of the previous page), status, q (configuration name search).
+    """
     current_user_id = get_jwt_identity()
-    drafts = TimetableDraft.query.filter_by(generated_by=current_user_id).order_by(TimetableDraft.generation_date.desc()).all()
+    # Only the listed columns (draft_content can be large); the config name comes from the same query
+    query = db.session.query(
+        TimetableDraft.id,
+        TimetableDraft.config_id,
+        TimetableDraft.generation_date,
+        TimetableDraft.status,
+        TimetableConfiguration.config_name
+    ).outerjoin(TimetableConfiguration, TimetableDraft.config_id == TimetableConfiguration.id) \
+     .filter(TimetableDraft.generated_by == current_user_id)
+
+    if request.args.get('status'):
+        query = query.filter(TimetableDraft.status == request.args['status'])
+    if request.args.get('q'):
+        query = query.filter(TimetableConfiguration.config_name.ilike(like_pattern(request.args['q']), escape='\\'))
+
+    try:
+        drafts, next_cursor = keyset_paginate(
+            query, TimetableDraft, TimetableDraft.generation_date, request.args.get('cursor'), get_page_limit(request.args)
+        )
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
     output = []
     for draft in drafts:
         output.append({
@@ -112,9 +170,9 @@ def get_timetable_drafts():
             "config_id": draft.config_id,
             "generation_date": draft.generation_date.isoformat(),
             "status": draft.status,
-            "config_name": draft.config.config_name # Access config name via relationship
+            "config_name": draft.config_name
         })
-    return jsonify(output), 200
+    return jsonify({"items": output, "next_cursor": next_cursor}), 200
 
 @timetable_bp.route('/timetable/drafts/<int:draft_id>', methods=['GET'])
 @jwt_required()
@@ -127,6 +185,7 @@ def get_timetable_draft_details(draft_id):
 
     # Also fetch XAI logs associated with this draft
     xai_logs = XaiLog.query.filter_by(timetable_draft_id=draft.id).order_by(XaiLog.timestamp).all()
+    solver_profile = next((log.slot_details for log in xai_logs if log.log_type == PROFILE_LOG_TYPE), None)
     xai_logs_data = [{
         "log_type": log.log_type,
         "rule_name": log.rule_name,
@@ -134,7 +193,7 @@ def get_timetable_draft_details(draft_id):
         "explanation": log.explanation,
         "priority": log.priority,
         "timestamp": log.timestamp.isoformat()
-    } for log in xai_logs]
+    } for log in xai_logs if log.log_type != PROFILE_LOG_TYPE]
 
     return jsonify({
         "id": draft.id,
@@ -143,9 +202,39 @@ def get_timetable_draft_details(draft_id):
         "status": draft.status,
         "draft_content": draft.draft_content,
         "last_validated_at": draft.last_validated_at.isoformat() if draft.last_validated_at else None,
-        "xai_logs": xai_logs_data
+        "xai_logs": xai_logs_data,
+        "solver_profile": solver_profile # Summary of a profiled generation, else None
     }), 200
 
+@timetable_bp.route('/timetable/drafts/<int:draft_id>/render', methods=['GET'])
+@jwt_required()
+def render_timetable_draft(draft_id):
+    """
+    Downloads a draft's timetables as PDF or XLSX, one page/sheet per timetable.
+    Query: view=section|faculty|room (default section), format=pdf|xlsx (default pdf).
+    """
+    current_user_id = get_jwt_identity()
+    draft = TimetableDraft.query.filter_by(id=draft_id, generated_by=current_user_id).first()
+
+    if not draft:
+        return jsonify({"message": "Timetable draft not found or unauthorized"}), 404
+
+    view = request.args.get('view', 'section')
+    fmt = request.args.get('format', 'pdf')
+    try:
+        path, etag = get_cached_timetable_render(draft, view, fmt)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Timetable rendering failed: {e}")
+        return jsonify({"message": f"Failed to render timetable: {str(e)}"}), 500
+
+    mimetype = 'application/pdf' if fmt == 'pdf' else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return send_file(
+        path, as_attachment=True, download_name=f"timetable_draft_{draft.id}_{view}.{fmt}",
+        mimetype=mimetype, etag=etag, conditional=True, max_age=0
+    )
+
 @timetable_bp.route('/timetable/drafts/<int:draft_id>', methods=['PUT'])
 @jwt_required()
 def update_timetable_draft(draft_id):
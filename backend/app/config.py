@@ -7,25 +7,99 @@ load_dotenv() # Load environment variables from .flaskenv
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///college_admin.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Database engine (see app/utils/db_engine.py)
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL') # WAL lets request threads read while one writes
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL') # NORMAL fsyncs at checkpoints rather than every commit (safe in WAL mode)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')) # How long a writer waits for the lock before "database is locked"
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536')) # Page cache per connection
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))) # Bytes of the file read via mmap; 0 disables
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10')) # Connections kept open per process; match SERVER_THREADS
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10')) # Extra connections allowed under bursts
+    DB_POOL_TIMEOUT_SECONDS = int(os.getenv('DB_POOL_TIMEOUT_SECONDS', '30')) # Wait for a free connection before erroring
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', '1800')) # Replace connections older than this (0 = never)
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true' # Detect connections dropped by the server/proxy before use
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000')) # Postgres statement_timeout; 0 disables
     SECRET_KEY = os.getenv('SECRET_KEY', 'a_very_secret_key_that_should_be_changed_in_production')
     JWT_SECRET_KEY = os.getenv('SECRET_KEY', 'a_very_secret_key_that_should_be_changed_in_production') # Use the same for simplicity
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', '14'))) # POST /api/refresh swaps it for a new access token without a password check
+    USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', '60')) # Longest a change made by another process goes unnoticed
+    USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', '1024'))
+
+    # Password hashing (bcrypt runs in a dedicated process pool, off the request threads)
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12')) # Cost factor; older hashes are upgraded on the next successful login
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2')) # 0 hashes on the request thread
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '4')) # Waiting checks beyond the workers before answering 503; keep workers + queue below the server's thread count
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', '5'))
+    LOGIN_FAILURE_WINDOW_SECONDS = int(os.getenv('LOGIN_FAILURE_WINDOW_SECONDS', '900'))
+    LOGIN_MAX_FAILURES_PER_USERNAME = int(os.getenv('LOGIN_MAX_FAILURES_PER_USERNAME', '5')) # Within the window
+    LOGIN_MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', '50')) # Keyed on the client address, see TRUSTED_PROXY_COUNT
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0')) # Reverse proxies in front of the app whose X-Forwarded-For/-Proto are trusted; 0 ignores the headers
+
+    # Production server (serve.py): gunicorn pre-fork workers on Linux, single-process waitress elsewhere
+    SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.getenv('SERVER_PORT', '5000'))
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', '0')) # Processes; 0 = one per CPU core. Each has its own hashing/render pools and caches
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', '8')) # Request threads per worker
+    SERVER_BACKLOG = int(os.getenv('SERVER_BACKLOG', '2048')) # Pending connections queued by the kernel
+    SERVER_MAX_CONNECTIONS = int(os.getenv('SERVER_MAX_CONNECTIONS', '1000')) # Open client connections per worker
+    SERVER_TIMEOUT_SECONDS = int(os.getenv('SERVER_TIMEOUT_SECONDS', '120')) # Unresponsive workers are killed after this
+    SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv('SERVER_GRACEFUL_TIMEOUT_SECONDS', '30')) # In-flight requests get this long on restart/stop
+    SERVER_KEEPALIVE_SECONDS = int(os.getenv('SERVER_KEEPALIVE_SECONDS', '5'))
+    SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', '0')) # Recycle a worker after this many requests (0 = never)
 
-    # LLM Configuration
     LLM_API_KEY = os.getenv('LLM_API_KEY')
     LLM_MODEL_NAME = os.getenv('LLM_MODEL_NAME', 'gpt-3.5-turbo') # e.g., 'gemini-pro', 'gpt-4'
+    LLM_PROVIDER = os.getenv('LLM_PROVIDER') # 'openai' or 'gemini'; inferred from LLM_MODEL_NAME at startup when unset
+    LLM_BASE_URL = os.getenv('LLM_BASE_URL') # Optional OpenAI-compatible endpoint, e.g. a local mock server
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '60')) # Per-request timeout
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8')) # Concurrent requests to the provider per process
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+    LLM_CONTEXT_WINDOW = int(os.getenv('LLM_CONTEXT_WINDOW', '4096')) # Prompt + completion tokens the model accepts
+    PROMPT_RAG_TOKEN_BUDGET = int(os.getenv('PROMPT_RAG_TOKEN_BUDGET', '1500')) # Upper bound on RAG context tokens per prompt
+
+    # Generated document cache (process-local LRU with TTL)
+    GENERATION_CACHE_ENABLED = os.getenv('GENERATION_CACHE_ENABLED', 'true').lower() == 'true'
+    GENERATION_CACHE_MAX_ENTRIES = int(os.getenv('GENERATION_CACHE_MAX_ENTRIES', '512'))
+    GENERATION_CACHE_TTL_SECONDS = int(os.getenv('GENERATION_CACHE_TTL_SECONDS', '3600'))
+    GENERATION_CACHE_SIMILARITY_THRESHOLD = float(os.getenv('GENERATION_CACHE_SIMILARITY_THRESHOLD', '0')) # e.g. 0.97; 0 disables similarity lookups
+    GENERATION_BATCH_MAX_ITEMS = int(os.getenv('GENERATION_BATCH_MAX_ITEMS', '100')) # Items per /generate-documents/batch request
     EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2') # For SentenceTransformers
+    EMBEDDING_REEMBED_BATCH_SIZE = int(os.getenv('EMBEDDING_REEMBED_BATCH_SIZE', '64')) # Chunks per re-embedding batch/checkpoint
+    # Models /api/rag/reembed may download and switch to (comma-separated); EMBEDDING_MODEL_NAME is always allowed
+    EMBEDDING_REEMBED_ALLOWED_MODELS = [name.strip() for name in os.getenv('EMBEDDING_REEMBED_ALLOWED_MODELS', 'all-MiniLM-L6-v2,all-MiniLM-L12-v2,all-mpnet-base-v2').split(',') if name.strip()]
 
     # File Uploads
-    UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads') # Directory to store uploaded PDFs
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.getcwd(), 'uploads')) # Directory to store uploaded PDFs
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024 # 16 MB limit for uploads
     ALLOWED_EXTENSIONS = {'pdf'}
+    PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', '0')) # >1 extracts large PDFs in parallel worker processes
+    PDF_CACHE_FOLDER = os.getenv('PDF_CACHE_FOLDER', os.path.join(os.getcwd(), 'generated_pdfs')) # Rendered PDFs of generated documents
+    EXPORT_RENDER_WORKERS = int(os.getenv('EXPORT_RENDER_WORKERS', '2')) # Processes rendering bulk exports and timetable PDFs; 0 renders in the request thread
+    EXPORT_MAX_DOCUMENTS = int(os.getenv('EXPORT_MAX_DOCUMENTS', '1000')) # Documents per bulk export
+    EXPORT_JOB_TTL_SECONDS = int(os.getenv('EXPORT_JOB_TTL_SECONDS', '3600')) # How long export jobs and their archives are kept
+    EXPORT_FOLDER = os.getenv('EXPORT_FOLDER', os.path.join(os.getcwd(), 'exports')) # Export archives; must be shared by all server workers
+    EXPORT_MAX_CONCURRENT_JOBS = int(os.getenv('EXPORT_MAX_CONCURRENT_JOBS', '2')) # Archives built at once per process; later jobs wait as 'pending'
+    EXPORT_DOWNLOAD_TIMEOUT_SECONDS = int(os.getenv('EXPORT_DOWNLOAD_TIMEOUT_SECONDS', '1800')) # Longest a download of an unfinished archive waits for it
+
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true' # Request/stage timing and the /metrics endpoint
+    METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR') # Shared dir of per-worker metric files summed by /metrics; needed with SERVER_WORKERS > 1
+    SOLVER_PROFILE_ENABLED = os.getenv('SOLVER_PROFILE', 'false').lower() == 'true' # Profile every timetable generation, not only those sent with "profile": true
+    SOLVER_PROFILE_FOLDER = os.getenv('SOLVER_PROFILE_FOLDER', os.path.join(os.getcwd(), 'solver_profiles')) # Collapsed-stack (flamegraph) files of profiled runs
 
-    # Ensure upload folder exists
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
+    # List endpoints (keyset pagination)
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', '20'))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', '100'))
+    SEARCH_MAX_OFFSET = int(os.getenv('SEARCH_MAX_OFFSET', '1000')) # Deepest page of ranked full-text search results
 
     # RAG Configuration
     RAG_TOP_K = 5 # Number of top similar documents/chunks to retrieve
-    CHUNK_SIZE = 500 # Characters per text chunk
-    CHUNK_OVERLAP = 50 # Characters for overlap between chunks
+    RAG_SEARCH_MAX_TOP_K = int(os.getenv('RAG_SEARCH_MAX_TOP_K', '50')) # Upper bound on client-requested top_k
+    RAG_SEARCH_PAGE_SIZE = int(os.getenv('RAG_SEARCH_PAGE_SIZE', '10')) # Results per /rag/search page
+    RAG_SEARCH_MAX_CHARS = int(os.getenv('RAG_SEARCH_MAX_CHARS', '4000')) # Upper bound on max_chars truncation
+    RAG_CHUNKS_MAX_IDS = int(os.getenv('RAG_CHUNKS_MAX_IDS', '100')) # Chunk ids per /rag/chunks request
+    RAG_RESULT_CACHE_TTL_SECONDS = int(os.getenv('RAG_RESULT_CACHE_TTL_SECONDS', '120')) # How long a ranked result set stays pageable
+    RAG_RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RAG_RESULT_CACHE_MAX_ENTRIES', '256'))
+    CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', '256')) # Embedding-model tokens per chunk (capped at the model's max_seq_length)
+    CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', '32')) # Tokens of trailing sentences repeated in the next chunk
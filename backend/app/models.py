@@ -1,6 +1,5 @@
 from app import db
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy import func
 import bcrypt # For password hashing
 
@@ -20,6 +19,7 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     email = db.Column(db.String(120), unique=True)
     is_admin = db.Column(db.Boolean, default=True)
+    token_version = db.Column(db.Integer, nullable=False, default=1, server_default='1') # Carried in JWTs as `ver`; bumping it revokes issued tokens
     created_at = db.Column(db.DateTime(timezone=True), default=func.now())
     updated_at = db.Column(db.DateTime(timezone=True), default=func.now(), onupdate=func.now())
 
@@ -31,6 +31,11 @@ class User(db.Model):
 
     def set_password(self, password):
         self.password_hash = set_password(password)
+        self.revoke_tokens()
+
+    def revoke_tokens(self):
+        """Invalidates every access and refresh token issued so far (e.g. after a password change)."""
+        self.token_version = (self.token_version or 0) + 1
 
     def check_password(self, password):
         return check_password(self.password_hash, password)
@@ -47,6 +52,7 @@ class UploadedDocument(db.Model):
     upload_date = db.Column(db.DateTime(timezone=True), default=func.now())
     document_type = db.Column(db.String(50))
     original_content_hash = db.Column(db.String(64), unique=True)
+    raw_content_hash = db.Column(db.String(64), index=True) # SHA-256 of the uploaded bytes, checked before parsing
     document_metadata = db.Column(db.JSON)
     parsed_text = db.Column(db.Text)
     status = db.Column(db.String(20), default='processed')
@@ -64,12 +70,45 @@ class Embedding(db.Model):
     uploaded_document_id = db.Column(db.Integer, db.ForeignKey('uploaded_documents.id', ondelete='CASCADE'))
     text_chunk = db.Column(db.Text, nullable=False)
     embedding = db.Column(db.Text) # Store as JSON list
+    model_name = db.Column(db.String(100)) # Embedding model that produced the vector
+    dimension = db.Column(db.Integer)
     chunk_index = db.Column(db.Integer)
+    token_count = db.Column(db.Integer)
+    page_start = db.Column(db.Integer) # 1-based page span of the chunk in the source PDF
+    page_end = db.Column(db.Integer)
+    char_start = db.Column(db.Integer) # [char_start, char_end) span within UploadedDocument.parsed_text
+    char_end = db.Column(db.Integer)
     created_at = db.Column(db.DateTime(timezone=True), default=func.now())
 
+    __table_args__ = (
+        # A document's chunks in order; also serves the ON DELETE CASCADE from uploaded_documents
+        db.Index('idx_embeddings_document_chunk', 'uploaded_document_id', 'chunk_index'),
+        # One model's rows in id order: re-embedding batches and the non-vector retrieval fallback
+        db.Index('idx_embeddings_model_id', 'model_name', 'id'),
+    )
+
     def __repr__(self):
         return f'<Embedding {self.id} from Doc {self.uploaded_document_id}>'
 
+class EmbeddingModelVersion(db.Model):
+    __tablename__ = 'embedding_model_versions'
+    id = db.Column(db.Integer, primary_key=True)
+    model_name = db.Column(db.String(100), unique=True, nullable=False)
+    dimension = db.Column(db.Integer)
+    status = db.Column(db.String(20), default='building') # 'building', 'active', 'retired', 'failed'
+    source_model_name = db.Column(db.String(100)) # Model whose rows are being re-embedded
+    last_source_embedding_id = db.Column(db.Integer, default=0) # Checkpoint: highest source row already re-embedded
+    rows_done = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime(timezone=True), default=func.now())
+    completed_at = db.Column(db.DateTime(timezone=True))
+    activated_at = db.Column(db.DateTime(timezone=True))
+    lease_expires_at = db.Column(db.DateTime(timezone=True)) # The worker running the job holds it until then (renewed every batch)
+    lease_owner = db.Column(db.String(32)) # Token of the claim holding the lease; every batch commit checks it
+
+    def __repr__(self):
+        return f'<EmbeddingModelVersion {self.model_name} ({self.status})>'
+
 class GeneratedDocument(db.Model):
     __tablename__ = 'generated_documents'
     id = db.Column(db.Integer, primary_key=True)
@@ -81,6 +120,9 @@ class GeneratedDocument(db.Model):
     pdf_filepath = db.Column(db.String(255))
     admin_inputs = db.Column(db.JSON)
     rag_context_ids = db.Column(db.Text) # Store as JSON list
+    prompt_tokens = db.Column(db.Integer) # Token counts of the LLM call that produced `content`
+    context_tokens = db.Column(db.Integer) # RAG context share of prompt_tokens
+    completion_tokens = db.Column(db.Integer)
     status = db.Column(db.String(20), default='draft')
     version = db.Column(db.Integer, default=1)
     parent_document_id = db.Column(db.Integer, db.ForeignKey('generated_documents.id', ondelete='SET NULL'))
@@ -89,6 +131,13 @@ class GeneratedDocument(db.Model):
     # Relationship for versioning (self-referencing)
     children_documents = db.relationship('GeneratedDocument', backref=db.backref('parent_document', remote_side=[id]), lazy=True)
 
+    __table_args__ = (
+        # Backs the keyset-paginated history listing
+        db.Index('idx_generated_documents_user_date', 'generated_by', generation_date.desc(), id.desc()),
+        # ON DELETE SET NULL from a parent version
+        db.Index('idx_generated_documents_parent', 'parent_document_id'),
+    )
+
     def __repr__(self):
         return f'<GeneratedDocument {self.title}>'
 
@@ -166,9 +215,40 @@ class TimetableDraft(db.Model):
     # Relationships
     xai_logs = db.relationship('XaiLog', backref='timetable_draft', lazy=True)
 
+    __table_args__ = (
+        # Backs the keyset-paginated drafts listing
+        db.Index('idx_timetable_drafts_user_date', 'generated_by', generation_date.desc(), id.desc()),
+        # ON DELETE CASCADE from timetable_configurations
+        db.Index('idx_timetable_drafts_config', 'config_id'),
+    )
+
     def __repr__(self):
         return f'<TimetableDraft {self.id}>'
 
+class ExportJob(db.Model):
+    """A bulk PDF export; its archive is written under EXPORT_FOLDER, readable by every worker process."""
+    __tablename__ = 'export_jobs'
+    id = db.Column(db.String(32), primary_key=True) # uuid4 hex, also the archive's file name
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    document_ids = db.Column(db.JSON)
+    timetable_draft_id = db.Column(db.Integer)
+    status = db.Column(db.String(20), default='pending') # pending -> running -> completed | failed
+    total = db.Column(db.Integer, default=0)
+    done = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    errors = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime(timezone=True), default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), default=func.now(), onupdate=func.now()) # Heartbeat of the building worker
+    finished_at = db.Column(db.DateTime(timezone=True))
+
+    __table_args__ = (
+        # Pruning of expired jobs
+        db.Index('idx_export_jobs_created_at', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<ExportJob {self.id} ({self.status})>'
+
 class XaiLog(db.Model):
     __tablename__ = 'xai_logs'
     id = db.Column(db.Integer, primary_key=True)
@@ -180,5 +260,27 @@ class XaiLog(db.Model):
     explanation = db.Column(db.Text, nullable=False)
     priority = db.Column(db.Integer, default=1)
 
+    __table_args__ = (
+        # A draft's explanation log in time order (draft details view); also serves the cascade delete
+        db.Index('idx_xai_logs_draft_timestamp', 'timetable_draft_id', 'timestamp'),
+    )
+
     def __repr__(self):
         return f'<XaiLog {self.id} for Draft {self.timetable_draft_id}>'
+
+class LoginFailure(db.Model):
+    """One failed login for a rate-limit key ("user:alice", "ip:10.0.0.7"); shared by all worker processes."""
+    __tablename__ = 'login_failures'
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    failed_at = db.Column(db.Float, nullable=False) # time.time(), comparable across processes
+
+    __table_args__ = (
+        # Failures of a key within the window, newest first
+        db.Index('idx_login_failures_key_time', 'key', 'failed_at'),
+        # Pruning of failures older than the window
+        db.Index('idx_login_failures_failed_at', 'failed_at'),
+    )
+
+    def __repr__(self):
+        return f'<LoginFailure {self.key}>'
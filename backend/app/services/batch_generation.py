@@ -0,0 +1,134 @@
+import asyncio
+import json
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models import GeneratedDocument
+from app.services.llm_provider import get_llm_provider
+from app.services.document_generation import (
+    MAX_OUTPUT_TOKENS, PROMPT_TEMPLATE_VERSION, build_document_prompt, build_rag_query,
+    _error_fallback_lines, _fallback_template_lines,
+)
+from app.services.prompt_budget import llm_call_token_counts, select_rag_context
+from app.services.generation_cache import get_generation_cache, make_bucket_key, make_cache_key, normalize_inputs
+
+def generate_documents_batch(items: list[dict], user_id, bypass_cache: bool = False) -> list[dict]:
+    """
+    Generates many documents in one request.
+
+    RAG queries are deduplicated and embedded in a single batched encode, the
+    LLM calls run concurrently on an asyncio loop (bounded by the provider's
+    concurrency limit), and all resulting documents are committed in one
+    transaction. Returns one status dict per input item, in input order; items
+    that are not objects with a document_type and inputs are reported 'invalid'.
+    Raises ValueError when the configured LLM provider is unsupported.
+    """
+    llm_provider = get_llm_provider() # Before any work: a misconfigured provider fails the whole batch
+    results = [{"index": i} for i in range(len(items))]
+    valid = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[i].update(status='invalid', error="Item must be an object with document_type and inputs")
+            continue
+        document_type = item.get('document_type')
+        inputs = item.get('inputs')
+        if not document_type or not isinstance(inputs, dict) or not inputs:
+            results[i].update(status='invalid', error="Missing document_type or inputs")
+        else:
+            valid.append((i, document_type, inputs))
+
+    # RAG: one batched retrieval for all distinct queries
+    rag_queries = [build_rag_query(inputs) for _, _, inputs in valid]
+    rag_results = [[] for _ in valid]
+    searchable = [j for j, query in enumerate(rag_queries) if query.strip()]
+    if searchable:
+        try:
+            from app.services.embedding_service import get_embeddings_for_queries
+            found = get_embeddings_for_queries([rag_queries[j] for j in searchable], top_k=current_app.config['RAG_TOP_K'])
+            for j, chunks in zip(searchable, found):
+                rag_results[j] = chunks
+        except Exception as rag_error:
+            current_app.logger.warning(f"Batch RAG retrieval failed, continuing without RAG context: {rag_error}")
+
+    use_cache = current_app.config['GENERATION_CACHE_ENABLED'] and not bypass_cache
+    cache = get_generation_cache() if use_cache else None
+    model_name = f"{current_app.config.get('LLM_PROVIDER')}:{current_app.config.get('LLM_MODEL_NAME')}"
+
+    # Resolve cache hits and template fallbacks up front; collect the prompts that need the LLM
+    jobs = []
+    for (i, document_type, inputs), chunks in zip(valid, rag_results):
+        rag = select_rag_context(document_type, inputs, chunks, MAX_OUTPUT_TOKENS)
+        rag_context, rag_context_ids = rag["context"], rag["chunk_ids"]
+        job = {"index": i, "document_type": document_type, "inputs": inputs, "rag_context_ids": rag_context_ids, "rag": rag, "text": None}
+        job["bucket_key"] = make_bucket_key(document_type, rag_context_ids, model_name, PROMPT_TEMPLATE_VERSION)
+        job["cache_key"] = make_cache_key(job["bucket_key"], normalize_inputs(inputs))
+        if use_cache:
+            cached_text, _ = cache.get(job["cache_key"])
+            if cached_text is not None:
+                job.update(text=cached_text, cache='hit', status='generated')
+        if job["text"] is None and llm_provider is None:
+            job.update(text="\n".join(_fallback_template_lines(document_type, inputs, rag_context)), cache='bypass' if not use_cache else 'miss', status='fallback')
+        if job["text"] is None:
+            job["prompts"] = build_document_prompt(document_type, inputs, rag_context)
+        jobs.append(job)
+
+    # Identical requests within the batch share one LLM call
+    pending = {}
+    for job in jobs:
+        if job["text"] is None:
+            pending.setdefault(job["cache_key"], []).append(job)
+    if pending:
+        current_app.logger.info(f"Batch generation: {len(pending)} LLM calls, up to {llm_provider.max_concurrency} concurrent")
+        outcomes = asyncio.run(_complete_all(llm_provider, [group[0]["prompts"] for group in pending.values()]))
+        for group, outcome in zip(pending.values(), outcomes):
+            for job in group:
+                job["cache"] = 'miss' if use_cache else 'bypass'
+                if isinstance(outcome, Exception):
+                    current_app.logger.error(f"Batch LLM generation failed for item {job['index']}: {outcome}")
+                    job.update(text="\n".join(_error_fallback_lines(job["document_type"], job["inputs"], outcome)), status='fallback', error=str(outcome))
+                else:
+                    job.update(text=outcome, status='generated')
+            # Only the first of identical requests spent tokens; the rest reuse its text
+            group[0]["from_llm"] = not isinstance(outcome, Exception)
+            if use_cache and not isinstance(outcome, Exception):
+                cache.put(group[0]["cache_key"], outcome, group[0]["bucket_key"])
+
+    # Persist every document in a single transaction
+    documents = []
+    for job in jobs:
+        document = GeneratedDocument(
+            title=job["inputs"].get('title', f'{job["document_type"]} - {datetime.now().strftime("%Y%m%d%H%M%S")}'),
+            document_type=job["document_type"],
+            generated_by=user_id,
+            content=job["text"],
+            admin_inputs=job["inputs"],
+            rag_context_ids=json.dumps(job["rag_context_ids"]), # Text column holding a JSON list
+            **llm_call_token_counts(job["rag"], job["text"], job.get("from_llm", False))
+        )
+        documents.append(document)
+    try:
+        db.session.add_all(documents)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to persist batch of {len(documents)} documents: {e}")
+        for job in jobs:
+            results[job["index"]].update(status='failed', error=f"Failed to save document: {e}")
+        return results
+
+    for job, document in zip(jobs, documents):
+        result = results[job["index"]]
+        result.update(status=job["status"], document_id=document.id, cache=job["cache"], generated_text=job["text"])
+        if job.get("error"):
+            result["error"] = job["error"]
+    return results
+
+async def _complete_all(llm_provider, prompts):
+    """Runs all completions concurrently, at most `max_concurrency` in flight. Exceptions are returned, not raised."""
+    slots = asyncio.Semaphore(llm_provider.max_concurrency)
+
+    async def complete(system_prompt, prompt):
+        async with slots:
+            return await llm_provider.acomplete(system_prompt, prompt, temperature=0.7, max_tokens=MAX_OUTPUT_TOKENS)
+
+    return await asyncio.gather(*(complete(system_prompt, prompt) for system_prompt, prompt in prompts), return_exceptions=True)
@@ -0,0 +1,324 @@
+import os
+import re
+import threading
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import ExportJob, GeneratedDocument, TimetableDraft
+from app.services.pdf_rendering import (
+    document_pdf_cache_path, document_pdf_fields, document_pdf_filename, get_render_executor, render_document_pdf,
+    write_cache_file,
+)
+from app.services.timetable_rendering import render_timetable_pdf, section_timetables, timetable_axes
+
+# Threads building archives in this process; job state itself lives in the export_jobs table
+_job_executor = None
+_job_executor_lock = threading.Lock()
+
+DOCUMENT_QUERY_BATCH_SIZE = 50
+PROGRESS_COMMIT_SECONDS = 1.0 # Progress is committed at most this often (and when the job ends)
+TAIL_POLL_SECONDS = 0.25 # How often a download of an unfinished archive checks for new bytes
+STALE_JOB_SECONDS = 300 # A running job without progress for this long lost its worker (restart, crash)
+STALE_PENDING_SECONDS = 900 # A job still pending this long after creation lost its worker before starting
+MAX_ERRORS_KEPT = 100
+
+def export_job_dict(job: ExportJob) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "done": job.done,
+        "failed": job.failed,
+        "errors": (job.errors or [])[-20:], # Most recent only
+    }
+
+def export_archive_path(job_id: str) -> str:
+    return os.path.join(current_app.config['EXPORT_FOLDER'], f"{job_id}.zip")
+
+def _get_job_executor():
+    global _job_executor
+    if _job_executor is None:
+        with _job_executor_lock:
+            if _job_executor is None:
+                _job_executor = ThreadPoolExecutor(max_workers=max(1, current_app.config['EXPORT_MAX_CONCURRENT_JOBS']),
+                                                   thread_name_prefix='export')
+    return _job_executor
+
+def create_export_job(user_id, document_ids: list, timetable_draft_id=None) -> ExportJob:
+    """
+    Registers an export of the user's generated documents and/or every section
+    timetable of one draft, and starts building its archive in the background.
+    Raises ValueError for ids that don't exist or don't belong to the user.
+    """
+    document_ids = list(dict.fromkeys(int(doc_id) for doc_id in document_ids or []))
+    if not document_ids and timetable_draft_id is None:
+        raise ValueError("Nothing to export: pass document_ids and/or timetable_draft_id")
+    max_items = current_app.config['EXPORT_MAX_DOCUMENTS']
+    if len(document_ids) > max_items:
+        raise ValueError(f"Too many documents: at most {max_items} per export")
+
+    if document_ids:
+        owned = GeneratedDocument.query.with_entities(GeneratedDocument.id).filter(
+            GeneratedDocument.id.in_(document_ids), GeneratedDocument.generated_by == user_id
+        ).count()
+        if owned != len(document_ids):
+            raise ValueError("Some documents were not found or are not yours")
+    sections = 0
+    if timetable_draft_id is not None:
+        draft = TimetableDraft.query.filter_by(id=timetable_draft_id, generated_by=user_id).first()
+        if draft is None:
+            raise ValueError("Timetable draft not found or unauthorized")
+        sections = len(section_timetables(draft.draft_content))
+
+    _prune_jobs()
+    job = ExportJob(
+        id=uuid.uuid4().hex, user_id=int(user_id), document_ids=document_ids, timetable_draft_id=timetable_draft_id,
+        status='pending', total=len(document_ids) + sections, done=0, failed=0, errors=[]
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _get_job_executor().submit(_run_job, app, job.id)
+    return job
+
+def get_export_job(job_id: str, user_id) -> ExportJob:
+    """The user's job, from whichever worker created it; a job whose worker stopped is marked failed."""
+    job = db.session.get(ExportJob, job_id)
+    if job is None or str(job.user_id) != str(user_id):
+        return None
+    if _is_stale(job):
+        _fail_stale_job(job)
+    return job
+
+def _is_stale(job) -> bool:
+    """
+    Whether the job's worker is gone: a running job without progress for
+    STALE_JOB_SECONDS, or a pending one not started STALE_PENDING_SECONDS after
+    creation (its worker restarted while the job was queued). `job` is an
+    ExportJob or a row with its status, created_at and updated_at.
+    """
+    if job.status == 'running':
+        since, limit = job.updated_at or job.created_at, STALE_JOB_SECONDS
+    elif job.status == 'pending':
+        since, limit = job.created_at, STALE_PENDING_SECONDS
+    else:
+        return False
+    if since is None:
+        return False
+    if since.tzinfo is None: # SQLite returns the UTC CURRENT_TIMESTAMP without an offset
+        since = since.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - since > timedelta(seconds=limit)
+
+def _fail_stale_job(job: ExportJob):
+    """Marks a stale job failed, unless its worker moved it on since it was read."""
+    status = job.status
+    claimed = ExportJob.query.filter(
+        ExportJob.id == job.id, ExportJob.status == status, ExportJob.updated_at == job.updated_at
+    ).update({
+        ExportJob.status: 'failed',
+        ExportJob.errors: (job.errors or []) + ["The worker building this export stopped"],
+        ExportJob.finished_at: func.now(),
+    }, synchronize_session=False)
+    db.session.commit()
+    if claimed:
+        current_app.logger.warning(f"Export {job.id}: worker gone while {status}, marked failed")
+    db.session.refresh(job)
+
+def _prune_jobs():
+    """Deletes jobs (and their archives) older than EXPORT_JOB_TTL_SECONDS."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=current_app.config['EXPORT_JOB_TTL_SECONDS'])
+    expired = [row.id for row in ExportJob.query.with_entities(ExportJob.id).filter(ExportJob.created_at < cutoff)]
+    if not expired:
+        return
+    for job_id in expired:
+        try:
+            os.remove(export_archive_path(job_id))
+        except FileNotFoundError:
+            pass
+    ExportJob.query.filter(ExportJob.id.in_(expired)).delete(synchronize_session=False)
+    db.session.commit()
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_') or 'document'
+
+def _export_items(job: ExportJob):
+    """
+    Yields (archive name, cache path or None, render function, render args).
+    Documents are loaded in small batches so only a window of rows is in memory.
+    """
+    document_ids = job.document_ids or []
+    for start in range(0, len(document_ids), DOCUMENT_QUERY_BATCH_SIZE):
+        batch = document_ids[start:start + DOCUMENT_QUERY_BATCH_SIZE]
+        documents = GeneratedDocument.query.filter(GeneratedDocument.id.in_(batch)).all()
+        for document in sorted(documents, key=lambda d: batch.index(d.id)):
+            cache_path, _ = document_pdf_cache_path(document)
+            name = f"documents/{document.id}_{_safe_name(document_pdf_filename(document))}"
+            yield name, cache_path, render_document_pdf, (document_pdf_fields(document),)
+
+    if job.timetable_draft_id is not None:
+        draft = db.session.get(TimetableDraft, job.timetable_draft_id)
+        days, slots = timetable_axes(draft.draft_content)
+        for section, grid in sorted(section_timetables(draft.draft_content).items()):
+            title = f"Timetable - {section} (draft {draft.id})"
+            yield f"timetables/draft_{draft.id}/{_safe_name(section)}.pdf", None, render_timetable_pdf, (title, 'section', days, slots, grid)
+
+def _submit(executor, cache_path, render, args) -> Future:
+    future = Future()
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            future.set_result((f.read(), False))
+        return future
+    if executor is None:
+        try:
+            future.set_result((render(*args), True))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    rendered = executor.submit(render, *args)
+    rendered.add_done_callback(lambda done: future.set_exception(done.exception()) if done.exception() else future.set_result((done.result(), True)))
+    return future
+
+class _ZipStream:
+    """
+    Write-only sink for ZipFile. Not seekable, so ZipFile never rewrites bytes
+    already written (sizes go in data descriptors) and the archive file can be
+    read while it grows.
+    """
+
+    def __init__(self):
+        self._pieces = []
+
+    def write(self, data):
+        self._pieces.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._pieces)
+        self._pieces = []
+        return data
+
+def _run_job(app, job_id):
+    with app.app_context():
+        try:
+            build_export_archive(job_id)
+        except Exception as e:
+            app.logger.error(f"Export {job_id} failed: {e}")
+            db.session.rollback()
+            job = db.session.get(ExportJob, job_id)
+            if job is not None:
+                job.status = 'failed'
+                job.errors = (job.errors or []) + [str(e)]
+                job.finished_at = func.now()
+                db.session.commit()
+        finally:
+            db.session.remove()
+
+def build_export_archive(job_id: str):
+    """
+    Writes the job's zip archive to EXPORT_FOLDER. PDFs render in the process
+    pool, a few per worker in flight; each is appended to the archive file as
+    soon as it (and every entry before it) is ready, and progress is committed
+    to the job row, so any worker can report it or stream the archive so far.
+    Documents whose PDF is already cached are read from disk instead of re-rendered.
+    """
+    # Start only a job still pending: one already marked failed as stale stays failed
+    started = ExportJob.query.filter(ExportJob.id == job_id, ExportJob.status == 'pending').update(
+        {ExportJob.status: 'running'}, synchronize_session=False)
+    db.session.commit()
+    if not started:
+        return
+    job = db.session.get(ExportJob, job_id)
+
+    executor = get_render_executor()
+    window = max(1, current_app.config['EXPORT_RENDER_WORKERS']) * 2
+    sink = _ZipStream()
+    in_flight = deque()
+    errors = list(job.errors or [])
+    progress = {"done": 0, "failed": 0, "committed_at": time.monotonic()}
+
+    def commit_progress(force=False):
+        if not force and time.monotonic() - progress["committed_at"] < PROGRESS_COMMIT_SECONDS:
+            return
+        job.done, job.failed, job.errors = progress["done"], progress["failed"], errors[-MAX_ERRORS_KEPT:]
+        db.session.commit()
+        progress["committed_at"] = time.monotonic()
+
+    def finish_oldest(archive, output):
+        name, cache_path, future = in_flight.popleft()
+        try:
+            pdf_bytes, rendered = future.result()
+        except Exception as e:
+            current_app.logger.error(f"Export {job.id}: failed to render {name}: {e}")
+            progress["failed"] += 1
+            errors.append(f"{name}: {e}")
+        else:
+            if rendered and cache_path:
+                write_cache_file(cache_path, pdf_bytes)
+            # PDFs are already compressed; storing them avoids burning CPU on deflate
+            archive.writestr(zipfile.ZipInfo(name, date_time=time.localtime()[:6]), pdf_bytes, compress_type=zipfile.ZIP_STORED)
+            output.write(sink.drain())
+            output.flush()
+            progress["done"] += 1
+        commit_progress()
+
+    path = export_archive_path(job.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as output:
+        with zipfile.ZipFile(sink, mode='w') as archive:
+            for name, cache_path, render, args in _export_items(job):
+                in_flight.append((name, cache_path, _submit(executor, cache_path, render, args)))
+                if len(in_flight) >= window:
+                    finish_oldest(archive, output)
+            while in_flight:
+                finish_oldest(archive, output)
+            if errors:
+                archive.writestr('errors.txt', "\n".join(errors))
+        output.write(sink.drain()) # Central directory
+    job.status = 'completed'
+    job.finished_at = func.now()
+    commit_progress(force=True)
+    current_app.logger.info(f"Export {job.id}: {progress['done']} PDFs written, {progress['failed']} failed")
+
+def tail_export_archive(job_id: str):
+    """
+    Generator of the bytes of an archive that is still being built, possibly by
+    another worker: sends what has been written so far, then waits for more
+    until the job row says the archive is complete. Stops when the job's worker
+    is gone or after EXPORT_DOWNLOAD_TIMEOUT_SECONDS, so no download polls forever.
+    """
+    path = export_archive_path(job_id)
+    offset = 0
+    deadline = time.monotonic() + current_app.config['EXPORT_DOWNLOAD_TIMEOUT_SECONDS']
+    while True:
+        row = db.session.query(ExportJob.status, ExportJob.created_at, ExportJob.updated_at).filter(ExportJob.id == job_id).first()
+        if row is not None and _is_stale(row):
+            job = db.session.get(ExportJob, job_id)
+            _fail_stale_job(job)
+            row = job
+        status = row.status if row is not None else None
+        db.session.rollback() # End the read so the next poll sees new commits, and free the connection meanwhile
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                while data := f.read(1024 * 1024):
+                    offset += len(data)
+                    yield data
+        if status == 'completed': # Read before the file, so everything up to the central directory was just sent
+            return
+        if status not in ('pending', 'running'):
+            current_app.logger.warning(f"Export {job_id} {status or 'vanished'} while being downloaded")
+            return # The client is left with a truncated archive
+        if time.monotonic() > deadline:
+            current_app.logger.warning(f"Export {job_id} still {status} after {current_app.config['EXPORT_DOWNLOAD_TIMEOUT_SECONDS']}s, download stopped")
+            return
+        time.sleep(TAIL_POLL_SECONDS)
@@ -1,51 +1,20 @@
 from flask import current_app
 from app.models import GeneratedDocument
+from app.services.llm_provider import get_llm_provider
+from app.services.generation_cache import get_generation_cache, make_bucket_key, make_cache_key, normalize_inputs
+import json
 import os
 
-# Make these optional imports so app can start without them
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+# Bump whenever build_document_prompt or the generation parameters change, so cached documents are not reused
+PROMPT_TEMPLATE_VERSION = 1
+MAX_OUTPUT_TOKENS = 1500 # Adjust as needed for document length
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-
-def _get_llm_client():
-    """Initializes and returns the appropriate LLM client based on config.
-    If no API key is configured, returns None so callers can fallback gracefully.
-    """
-    llm_model_name = current_app.config.get('LLM_MODEL_NAME', 'gpt-3.5-turbo').lower()
-    api_key = current_app.config.get('LLM_API_KEY')
-
-    if not api_key:
-        current_app.logger.warning("LLM_API_KEY not set; falling back to template-based document generation.")
-        return None
-
-    if 'gpt' in llm_model_name:
-        if OpenAI is None:
-            current_app.logger.warning("OpenAI library not installed")
-            return None
-        return OpenAI(api_key=api_key)
-    elif 'gemini' in llm_model_name:
-        if genai is None:
-            current_app.logger.warning("Google Generative AI library not installed")
-            return None
-        genai.configure(api_key=api_key)
-        return genai
-    else:
-        raise ValueError(f"Unsupported LLM model: {llm_model_name}. Supported: GPT, Gemini.")
-
-def generate_document_llm(document_type: str, admin_inputs: dict, rag_context: list[str]) -> str:
-    """
-    Generates an academic document using an LLM, incorporating RAG context.
-    If LLM is unavailable, falls back to a simple template.
-    """
-    llm_client = _get_llm_client()
-    llm_model_name = current_app.config.get('LLM_MODEL_NAME', 'gpt-3.5-turbo')
+def build_rag_query(admin_inputs: dict) -> str:
+    """RAG query for a generation request: a simple combination of the main inputs."""
+    return f"{admin_inputs.get('title', '')} {admin_inputs.get('event_name', '')} {admin_inputs.get('department', '')} {admin_inputs.get('details', '')}"
 
+def build_document_prompt(document_type: str, admin_inputs: dict, rag_context: list[str]) -> tuple[str, str]:
+    """Builds the (system prompt, user prompt) pair for a document generation request."""
     base_prompt = (
         f"You are a professional college administrative assistant AI. "
         f"Your task is to generate a formal and institution-ready '{document_type}' based on the provided information. "
@@ -69,72 +38,178 @@ def generate_document_llm(document_type: str, admin_inputs: dict, rag_context: l
     
     # Construct the final prompt
     final_prompt = f"{base_prompt}\n\n{context_str}{input_details}\n\nGenerate the complete document now:"
+    return base_prompt, final_prompt
+
+def _fallback_template_lines(document_type: str, admin_inputs: dict, rag_context: list[str]) -> list[str]:
+    """Deterministic template used when no LLM is configured."""
+    fallback_lines = [
+        f"*** {document_type.upper()} ***",
+        "",
+        "This is an auto-generated document using the built-in template.",
+        "Please review and edit as needed.",
+        "",
+        "Details provided:",
+    ]
+    for key, value in (admin_inputs or {}).items():
+        if value:
+            fallback_lines.append(f"- {key.replace('_', ' ').title()}: {value}")
+    if rag_context:
+        fallback_lines.append("")
+        fallback_lines.append("Context snippets:")
+        for i, chunk in enumerate(rag_context[:3]):
+            fallback_lines.append(f"  {i+1}. {chunk[:200]}{'...' if len(chunk)>200 else ''}")
+    fallback_lines.append("")
+    fallback_lines.append("Thank you.")
+    return fallback_lines
+
+def _error_fallback_lines(document_type: str, admin_inputs: dict, error: Exception) -> list[str]:
+    """Template used when the LLM call fails."""
+    fallback_lines = [
+        f"*** {document_type.upper()} ***",
+        "",
+        "This document was generated using the fallback template due to an LLM error.",
+        f"Error: {error}",
+        "",
+        "Details provided:",
+    ]
+    for key, value in (admin_inputs or {}).items():
+        if value:
+            fallback_lines.append(f"- {key.replace('_', ' ').title()}: {value}")
+    fallback_lines.append("")
+    fallback_lines.append("Please review and edit as needed.")
+    return fallback_lines
+
+def generate_document_llm(document_type: str, admin_inputs: dict, rag_context: list[str]) -> str:
+    """
+    Generates an academic document using an LLM, incorporating RAG context.
+    If LLM is unavailable, falls back to a simple template.
+    """
+    return _generate_document(document_type, admin_inputs, rag_context)[0]
+
+def _generate_document(document_type, admin_inputs, rag_context):
+    """Returns (text, from_llm); from_llm is False when a template fallback was used."""
+    llm_provider = get_llm_provider()
+    base_prompt, final_prompt = build_document_prompt(document_type, admin_inputs, rag_context)
 
     # If no LLM client is available, fallback to a deterministic template
-    if llm_client is None:
+    if llm_provider is None:
         current_app.logger.info("Using fallback template for document generation (LLM not configured).")
-        fallback_lines = [
-            f"*** {document_type.upper()} ***",
-            "",
-            "This is an auto-generated document using the built-in template.",
-            "Please review and edit as needed.",
-            "",
-            "Details provided:",
-        ]
-        for key, value in (admin_inputs or {}).items():
-            if value:
-                fallback_lines.append(f"- {key.replace('_', ' ').title()}: {value}")
-        if rag_context:
-            fallback_lines.append("")
-            fallback_lines.append("Context snippets:")
-            for i, chunk in enumerate(rag_context[:3]):
-                fallback_lines.append(f"  {i+1}. {chunk[:200]}{'...' if len(chunk)>200 else ''}")
-        fallback_lines.append("")
-        fallback_lines.append("Thank you.")
-        return "\n".join(fallback_lines)
+        return "\n".join(_fallback_template_lines(document_type, admin_inputs, rag_context)), False
 
-    current_app.logger.debug(f"Sending prompt to LLM (model: {llm_model_name}): {final_prompt[:500]}...")
+    current_app.logger.debug(f"Sending prompt to LLM (model: {llm_provider.model_name}): {final_prompt[:500]}...")
 
     try:
-        if 'gpt' in llm_model_name.lower():
-            response = llm_client.chat.completions.create(
-                model=llm_model_name,
-                messages=[
-                    {"role": "system", "content": base_prompt},
-                    {"role": "user", "content": final_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1500, # Adjust as needed for document length
-            )
-            generated_content = response.choices[0].message.content
-        elif 'gemini' in llm_model_name.lower():
-            model = llm_client.GenerativeModel(llm_model_name)
-            response = model.generate_content(
-                contents=final_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    max_output_tokens=1500,
-                )
-            )
-            generated_content = response.text
-        else:
-            raise ValueError(f"Unsupported LLM model for generation: {llm_model_name}")
-
-        return generated_content
+        return llm_provider.complete(base_prompt, final_prompt, temperature=0.7, max_tokens=MAX_OUTPUT_TOKENS), True
     except Exception as e:
         current_app.logger.error(f"Error during LLM content generation: {e}")
         # Fallback to template if LLM call fails
-        fallback_lines = [
-            f"*** {document_type.upper()} ***",
-            "",
-            "This document was generated using the fallback template due to an LLM error.",
-            f"Error: {e}",
-            "",
-            "Details provided:",
-        ]
-        for key, value in (admin_inputs or {}).items():
-            if value:
-                fallback_lines.append(f"- {key.replace('_', ' ').title()}: {value}")
-        fallback_lines.append("")
-        fallback_lines.append("Please review and edit as needed.")
-        return "\n".join(fallback_lines)
+        return "\n".join(_error_fallback_lines(document_type, admin_inputs, e)), False
+
+def stream_document_llm(document_type: str, admin_inputs: dict, rag_context: list[str]):
+    """
+    Streaming variant of `generate_document_llm`: yields pieces of the document
+    as the LLM produces them. The template fallbacks are streamed line by line.
+    The generator's return value is True when the whole text came from the LLM.
+    """
+    llm_provider = get_llm_provider()
+    base_prompt, final_prompt = build_document_prompt(document_type, admin_inputs, rag_context)
+
+    if llm_provider is None:
+        current_app.logger.info("Using fallback template for document generation (LLM not configured).")
+        yield from _stream_lines(_fallback_template_lines(document_type, admin_inputs, rag_context))
+        return False
+
+    current_app.logger.debug(f"Streaming prompt to LLM (model: {llm_provider.model_name}): {final_prompt[:500]}...")
+
+    produced_any = False
+    try:
+        for piece in llm_provider.stream(base_prompt, final_prompt, temperature=0.7, max_tokens=MAX_OUTPUT_TOKENS):
+            produced_any = True
+            yield piece
+    except Exception as e:
+        current_app.logger.error(f"Error during streamed LLM content generation: {e}")
+        if produced_any:
+            # Part of the document was already sent; note the interruption instead of restarting
+            yield f"\n\n[Generation interrupted due to an LLM error: {e}]"
+        else:
+            yield from _stream_lines(_error_fallback_lines(document_type, admin_inputs, e))
+        return False
+    return True
+
+def _stream_lines(lines: list[str]):
+    for i, line in enumerate(lines):
+        yield line if i == len(lines) - 1 else line + "\n"
+
+def _cache_lookup(document_type, admin_inputs, rag_context_ids):
+    """Returns (cache, key, bucket_key, input embedding, cached text or None)."""
+    cache = get_generation_cache()
+    model_name = f"{current_app.config.get('LLM_PROVIDER')}:{current_app.config.get('LLM_MODEL_NAME')}"
+    normalized = normalize_inputs(admin_inputs)
+    bucket_key = make_bucket_key(document_type, rag_context_ids, model_name, PROMPT_TEMPLATE_VERSION)
+    key = make_cache_key(bucket_key, normalized)
+
+    embedding = None
+    if cache.similarity_threshold > 0:
+        try:
+            from app.services.embedding_service import generate_embedding
+            embedding = generate_embedding(json.dumps(normalized, sort_keys=True, default=str))
+        except Exception as e:
+            current_app.logger.warning(f"Input embedding for similarity cache lookup failed: {e}")
+    text, match = cache.get(key, bucket_key, embedding)
+    if match:
+        current_app.logger.debug(f"Generation cache {match} hit for '{document_type}'")
+    return cache, key, bucket_key, embedding, text
+
+def generate_document_cached(document_type: str, admin_inputs: dict, rag_context: list[str], rag_context_ids: list, bypass_cache: bool = False) -> tuple[str, str, bool]:
+    """
+    `generate_document_llm` behind the generation cache.
+    Returns (text, cache status, from_llm) where the status is 'hit', 'miss' or 'bypass'
+    and from_llm is True only when this call's LLM request produced the text.
+    Only LLM output is cached; template fallbacks are not.
+    """
+    if bypass_cache or not current_app.config['GENERATION_CACHE_ENABLED']:
+        text, from_llm = _generate_document(document_type, admin_inputs, rag_context)
+        return text, 'bypass', from_llm
+
+    cache, key, bucket_key, embedding, cached_text = _cache_lookup(document_type, admin_inputs, rag_context_ids)
+    if cached_text is not None:
+        return cached_text, 'hit', False
+
+    text, from_llm = _generate_document(document_type, admin_inputs, rag_context)
+    if from_llm:
+        cache.put(key, text, bucket_key, embedding)
+    return text, 'miss', from_llm
+
+def stream_document_cached(document_type: str, admin_inputs: dict, rag_context: list[str], rag_context_ids: list, bypass_cache: bool = False):
+    """
+    Streaming counterpart of `generate_document_cached`.
+    Returns (cache status, generator of text pieces); a hit yields the whole text at once.
+    Like `stream_document_llm`, the generator returns True when this call's LLM request produced the text.
+    """
+    if bypass_cache or not current_app.config['GENERATION_CACHE_ENABLED']:
+        return 'bypass', stream_document_llm(document_type, admin_inputs, rag_context)
+
+    cache, key, bucket_key, embedding, cached_text = _cache_lookup(document_type, admin_inputs, rag_context_ids)
+    if cached_text is not None:
+        return 'hit', _stream_cached(cached_text)
+
+    def stream_and_store():
+        generator = stream_document_llm(document_type, admin_inputs, rag_context)
+        pieces = []
+        while True:
+            try:
+                piece = next(generator)
+            except StopIteration as stop:
+                from_llm = stop.value # stream_document_llm returns True when no fallback was used
+                break
+            pieces.append(piece)
+            yield piece
+        if from_llm:
+            cache.put(key, "".join(pieces), bucket_key, embedding)
+        return from_llm
+
+    return 'miss', stream_and_store()
+
+def _stream_cached(text):
+    yield text
+    return False # No LLM call was made
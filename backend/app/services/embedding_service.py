@@ -1,51 +1,140 @@
-from sentence_transformers import SentenceTransformer
 from app import db
-from app.models import Embedding, UploadedDocument
+from app.models import Embedding, EmbeddingModelVersion, UploadedDocument
 from flask import current_app
-from sqlalchemy import text # For raw SQL with pgvector
+from sqlalchemy import text, func # For raw SQL with pgvector
+from sqlalchemy.exc import IntegrityError
+import json
+from app.utils.chunker import approximate_token_count
+from app.utils.metrics import stage
 
-# Initialize embedding model globally (or lazily)
-# This model will be loaded once when the app starts or first requested
-_embedding_model = None
+# Embedding models are loaded lazily, once per process, keyed by model name.
+# Several can be loaded at once while the index is being re-embedded with a new model.
+_embedding_models = {}
 
-def get_embedding_model():
-    global _embedding_model
-    if _embedding_model is None:
+DUMMY_EMBEDDING_DIMENSION = 384 # Dimension of all-MiniLM-L6-v2, used for placeholder vectors
+
+def get_embedding_model(model_name: str = None):
+    model_name = model_name or current_app.config.get('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
+    if model_name not in _embedding_models:
         try:
-            model_name = current_app.config.get('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
             current_app.logger.info(f"Loading embedding model: {model_name}")
-            _embedding_model = SentenceTransformer(model_name)
+            # Imported here so init_db() and the routes that never embed do not load torch
+            from sentence_transformers import SentenceTransformer
+            _embedding_models[model_name] = SentenceTransformer(model_name)
         except Exception as e:
             current_app.logger.error(f"Failed to load embedding model: {e}")
             # Return None to indicate embedding model is unavailable
-            _embedding_model = False  # Use False to indicate failed attempt
-    return _embedding_model if _embedding_model is not False else None
+            _embedding_models[model_name] = False  # Use False to indicate failed attempt
+    model = _embedding_models[model_name]
+    return model if model is not False else None
+
+def preload_embedding_model() -> bool:
+    """
+    Loads the active embedding model now, e.g. in a pre-fork master so the workers
+    inherit it instead of each loading it on first use. A failed load is not
+    remembered, so every worker still retries on its own.
+    """
+    model_name = get_active_embedding_model_name()
+    if get_embedding_model(model_name) is not None:
+        return True
+    _embedding_models.pop(model_name, None)
+    return False
+
+def get_active_embedding_model_name() -> str:
+    """
+    Returns the model whose vectors retrieval currently serves from. Read-only: before
+    init_db() has recorded an active version, this is the configured EMBEDDING_MODEL_NAME.
+    Afterwards, changing the config does not change it until a re-embedding job completes.
+    """
+    active = db.session.query(EmbeddingModelVersion.model_name).filter_by(status='active').first()
+    if active:
+        return active.model_name
+    return current_app.config.get('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
+
+def ensure_active_embedding_model() -> str:
+    """
+    Records the configured EMBEDDING_MODEL_NAME as the active version on a fresh
+    index, and tags legacy rows without a model with the active one. Run by
+    init_db(); safe when several processes run it at once.
+    """
+    if not db.session.query(EmbeddingModelVersion.id).filter_by(status='active').first():
+        model_name = current_app.config.get('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
+        try:
+            db.session.add(EmbeddingModelVersion(model_name=model_name, status='active', activated_at=func.now()))
+            db.session.commit()
+        except IntegrityError: # Recorded by another process meanwhile
+            db.session.rollback()
+    model_name = get_active_embedding_model_name()
+    Embedding.query.filter(Embedding.model_name.is_(None)).update({Embedding.model_name: model_name}, synchronize_session=False)
+    db.session.commit()
+    return model_name
 
-def generate_embedding(text: str):
+def serialize_embedding(vector) -> str:
+    """Serializes a vector as a JSON list (also valid pgvector text input)."""
+    return json.dumps(vector, separators=(',', ':'))
+
+def generate_embedding(text: str, model_name: str = None):
     """Generates a vector embedding for a given text."""
     try:
-        model = get_embedding_model()
+        model = get_embedding_model(model_name)
         if model is None:
             current_app.logger.warning("Embedding model not available, returning empty embedding")
-            return [0.0] * 384  # Return dummy embedding (384 is default for all-MiniLM-L6-v2)
-        return model.encode(text).tolist()
+            return [0.0] * DUMMY_EMBEDDING_DIMENSION  # Return dummy embedding
+        with stage('embedding_encode'):
+            return model.encode(text).tolist()
     except Exception as e:
         current_app.logger.error(f"Failed to generate embedding: {e}")
-        return [0.0] * 384  # Return dummy embedding on error
+        return [0.0] * DUMMY_EMBEDDING_DIMENSION  # Return dummy embedding on error
+
+def generate_embeddings(texts: list[str], model_name: str = None, batch_size: int = 32):
+    """Generates embeddings for many texts in one batched encode call."""
+    model = get_embedding_model(model_name)
+    if model is None:
+        raise RuntimeError(f"Embedding model '{model_name}' is not available")
+    with stage('embedding_encode'):
+        return model.encode(texts, batch_size=batch_size).tolist()
+
+def get_token_counter():
+    """
+    Returns a callable counting tokens with the active embedding model's tokenizer,
+    or the word-based approximation when the model is unavailable.
+    """
+    model = get_embedding_model(get_active_embedding_model_name())
+    tokenizer = getattr(model, 'tokenizer', None)
+    if tokenizer is None:
+        return approximate_token_count
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+def get_chunk_token_budget():
+    """CHUNK_MAX_TOKENS, capped so a chunk plus special tokens fits the embedding model's window."""
+    budget = current_app.config['CHUNK_MAX_TOKENS']
+    model = get_embedding_model(get_active_embedding_model_name())
+    max_seq_length = getattr(model, 'max_seq_length', None)
+    if max_seq_length:
+        budget = min(budget, max_seq_length - 2) # Leave room for [CLS]/[SEP]
+    return budget
 
-def create_embeddings_for_document(doc_id: int, text_chunks: list[str]):
+def create_embeddings_for_document(doc_id: int, chunks):
     """
-    Generates embeddings for all text chunks of an uploaded document
-    and stores them in the database.
+    Generates embeddings for all chunks of an uploaded document (as yielded by
+    app.utils.chunker.iter_chunks) and stores them in the database.
     """
+    model_name = get_active_embedding_model_name()
     embeddings_to_add = []
-    for i, chunk in enumerate(text_chunks):
-        embedding_vector = generate_embedding(chunk)
+    for chunk in chunks:
+        embedding_vector = generate_embedding(chunk["text"], model_name)
         new_embedding = Embedding(
             uploaded_document_id=doc_id,
-            text_chunk=chunk,
-            embedding=embedding_vector,
-            chunk_index=i
+            text_chunk=chunk["text"],
+            embedding=serialize_embedding(embedding_vector),
+            model_name=model_name,
+            dimension=len(embedding_vector),
+            chunk_index=chunk["chunk_index"],
+            token_count=chunk["token_count"],
+            page_start=chunk["page_start"],
+            page_end=chunk["page_end"],
+            char_start=chunk["char_start"],
+            char_end=chunk["char_end"]
         )
         embeddings_to_add.append(new_embedding)
     
@@ -59,59 +148,91 @@ def get_embeddings_for_query(query_text: str, top_k: int = 5):
     to retrieve the most relevant text chunks from the knowledge base.
     Falls back gracefully if database doesn't support pgvector (e.g., SQLite).
     """
+    return get_embeddings_for_queries([query_text], top_k=top_k)[0]
+
+def get_embeddings_for_queries(query_texts: list[str], top_k: int = 5):
+    """
+    Batched form of `get_embeddings_for_query`: duplicate queries are searched once
+    and all distinct queries are embedded in a single encode call.
+    Returns one list of chunks per input query, in input order.
+    """
+    unique_queries = list(dict.fromkeys(query_texts))
     try:
+        # Serve from the active model version only; rows from a model being built are ignored
+        model_name = get_active_embedding_model_name()
+        if model_name != current_app.config.get('EMBEDDING_MODEL_NAME'):
+            current_app.logger.warning(f"Serving embeddings from '{model_name}' until re-embedding for '{current_app.config.get('EMBEDDING_MODEL_NAME')}' completes")
+
         # First, check if there are any embeddings in the database
-        embedding_count = db.session.query(Embedding).count()
-        if embedding_count == 0:
+        if db.session.query(Embedding.id).filter_by(model_name=model_name).first() is None:
             current_app.logger.info("No embeddings found in database, returning empty list")
-            return []
+            return [[] for _ in query_texts]
         
-        query_embedding = generate_embedding(query_text)
-
-        # Try PostgreSQL pgvector approach first
-        query_embedding_str = f"ARRAY{query_embedding}"
-
-        results = db.session.execute(
-            text(f"""
-            SELECT id, text_chunk, uploaded_document_id, embedding <-> CAST(:query_embedding AS vector) AS distance
-            FROM embeddings
-            ORDER BY distance
-            LIMIT :top_k
-            """),
-            {'query_embedding': query_embedding_str, 'top_k': top_k}
-        ).fetchall()
+        try:
+            query_embeddings = generate_embeddings(unique_queries, model_name)
+        except Exception as e:
+            current_app.logger.error(f"Batched query embedding failed, embedding queries one by one: {e}")
+            query_embeddings = [generate_embedding(query_text, model_name) for query_text in unique_queries]
 
-        relevant_chunks = []
-        for row in results:
-            relevant_chunks.append({
-                "id": row.id,
-                "text_chunk": row.text_chunk,
-                "uploaded_document_id": row.uploaded_document_id,
-                "distance": row.distance
-            })
-        
-        current_app.logger.debug(f"RAG retrieved {len(relevant_chunks)} chunks for query: '{query_text[:50]}...'")
-        return relevant_chunks
+        results_by_query = {}
+        for query_text, query_embedding in zip(unique_queries, query_embeddings):
+            results_by_query[query_text] = _vector_search(query_embedding, model_name, top_k)
+            current_app.logger.debug(f"RAG retrieved {len(results_by_query[query_text])} chunks for query: '{query_text[:50]}...'")
+        return [results_by_query[query_text] for query_text in query_texts]
     
     except Exception as e:
         # Fallback for SQLite or other databases that don't support pgvector
         current_app.logger.warning(f"Vector similarity search failed, using simple text search fallback: {e}")
+        db.session.rollback() # Clear the failed transaction (e.g. missing pgvector) before querying again
         try:
             # Simple fallback: search by text content similarity using LIKE
-            embeddings = db.session.query(Embedding).limit(top_k).all()
+            # Ids first, read from the covering idx_embeddings_model_id, then those rows by primary key
+            fallback_ids = (db.session.query(Embedding.id).filter_by(model_name=get_active_embedding_model_name())
+                            .order_by(Embedding.id).limit(top_k).subquery())
+            embeddings = Embedding.query.filter(Embedding.id.in_(db.select(fallback_ids.c.id))).order_by(Embedding.id).all()
             relevant_chunks = []
             for emb in embeddings:
                 relevant_chunks.append({
                     "id": emb.id,
                     "text_chunk": emb.text_chunk,
                     "uploaded_document_id": emb.uploaded_document_id,
+                    "chunk_index": emb.chunk_index,
+                    "char_start": emb.char_start,
+                    "char_end": emb.char_end,
                     "distance": 0
                 })
             current_app.logger.debug(f"RAG fallback retrieved {len(relevant_chunks)} chunks")
-            return relevant_chunks
+            return [list(relevant_chunks) for _ in query_texts]
         except Exception as fallback_error:
             current_app.logger.error(f"RAG fallback also failed: {fallback_error}")
-            return []
+            return [[] for _ in query_texts]
+
+def _vector_search(query_embedding, model_name: str, top_k: int):
+    """pgvector nearest-neighbour search over the given model's embeddings."""
+    query_embedding_str = f"ARRAY{query_embedding}"
+
+    with stage('vector_search'):
+        results = db.session.execute(
+            text(f"""
+            SELECT id, text_chunk, uploaded_document_id, chunk_index, char_start, char_end,
+                   embedding <-> CAST(:query_embedding AS vector) AS distance
+            FROM embeddings
+            WHERE model_name = :model_name
+            ORDER BY distance
+            LIMIT :top_k
+            """),
+            {'query_embedding': query_embedding_str, 'model_name': model_name, 'top_k': top_k}
+        ).fetchall()
+
+    return [{
+        "id": row.id,
+        "text_chunk": row.text_chunk,
+        "uploaded_document_id": row.uploaded_document_id,
+        "chunk_index": row.chunk_index,
+        "char_start": row.char_start,
+        "char_end": row.char_end,
+        "distance": row.distance
+    } for row in results]
 
 def get_chunks_by_ids(chunk_ids: list[int]):
     """Retrieves specific text chunks by their IDs."""
@@ -119,5 +240,8 @@ def get_chunks_by_ids(chunk_ids: list[int]):
     return [{
         "id": chunk.id,
         "text_chunk": chunk.text_chunk,
-        "uploaded_document_id": chunk.uploaded_document_id
+        "uploaded_document_id": chunk.uploaded_document_id,
+        "chunk_index": chunk.chunk_index,
+        "page_start": chunk.page_start,
+        "page_end": chunk.page_end
     } for chunk in chunks]
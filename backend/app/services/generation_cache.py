@@ -0,0 +1,103 @@
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+def normalize_inputs(admin_inputs: dict) -> dict:
+    """Drops empty values and collapses whitespace so trivially different inputs share a cache key."""
+    normalized = {}
+    for key, value in (admin_inputs or {}).items():
+        if isinstance(value, str):
+            value = " ".join(value.split())
+        if value not in (None, "", [], {}):
+            normalized[key.strip().lower()] = value
+    return normalized
+
+def make_bucket_key(document_type: str, rag_context_ids: list, model_name: str, template_version: int) -> str:
+    """Everything except the admin inputs; similarity lookups only compare entries within one bucket."""
+    payload = json.dumps([document_type.strip().lower(), sorted(rag_context_ids or []), model_name, template_version])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def make_cache_key(bucket_key: str, normalized_inputs: dict) -> str:
+    payload = json.dumps([bucket_key, normalized_inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class GenerationCache:
+    """
+    Process-local LRU cache of generated document text with a TTL.
+    Entries are looked up by exact key, then optionally by cosine similarity
+    of the input embedding against entries in the same bucket.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=3600, similarity_threshold=0.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict() # key -> (expires_at, bucket_key, embedding, text)
+        self._lock = threading.Lock()
+
+    def get(self, key, bucket_key=None, embedding=None):
+        """Returns (text, match) where match is 'exact', 'similar' or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[3], 'exact'
+
+            if embedding is None or self.similarity_threshold <= 0:
+                return None, None
+            best_key, best_score = None, self.similarity_threshold
+            for candidate_key, (expires_at, candidate_bucket, candidate_embedding, _) in self._entries.items():
+                if expires_at <= now or candidate_bucket != bucket_key or candidate_embedding is None:
+                    continue
+                score = _cosine_similarity(embedding, candidate_embedding)
+                if score >= best_score:
+                    best_key, best_score = candidate_key, score
+            if best_key is None:
+                return None, None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][3], 'similar'
+
+    def put(self, key, text, bucket_key=None, embedding=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, bucket_key, embedding, text)
+            self._entries.move_to_end(key)
+            self._evict(time.monotonic())
+
+    def _evict(self, now):
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        for key in expired:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False) # Least recently used
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_generation_cache() -> GenerationCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GenerationCache(
+                    max_entries=current_app.config['GENERATION_CACHE_MAX_ENTRIES'],
+                    ttl_seconds=current_app.config['GENERATION_CACHE_TTL_SECONDS'],
+                    similarity_threshold=current_app.config['GENERATION_CACHE_SIMILARITY_THRESHOLD'],
+                )
+    return _cache
@@ -0,0 +1,214 @@
+import abc
+import asyncio
+import importlib.util
+import threading
+from flask import current_app
+from app.utils.metrics import stage
+
+# Optional SDKs: openai/httpx and google.generativeai are imported when the
+# provider is first created, since importing them costs a few hundred ms at startup
+def _is_installed(module_name: str) -> bool:
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ImportError: # Parent package missing, e.g. "google"
+        return False
+
+SUPPORTED_PROVIDERS = ('openai', 'gemini')
+OPENAI_MODEL_PREFIXES = ('gpt-', 'chatgpt-', 'o1', 'o3', 'o4', 'text-davinci')
+
+def infer_provider_name(model_name: str) -> str | None:
+    """The provider a model name clearly belongs to, or None (e.g. a model of a local OpenAI-compatible server)."""
+    name = (model_name or '').lower().removeprefix('models/')
+    if name.startswith('gemini'):
+        return 'gemini'
+    if name.startswith(OPENAI_MODEL_PREFIXES):
+        return 'openai'
+    return None
+
+def resolve_llm_provider(app):
+    """Fills in LLM_PROVIDER from LLM_MODEL_NAME when it is not set; called once by create_app."""
+    if app.config.get('LLM_PROVIDER'):
+        return
+    model_name = app.config.get('LLM_MODEL_NAME')
+    inferred = infer_provider_name(model_name)
+    app.config['LLM_PROVIDER'] = inferred or 'openai'
+    reason = f"inferred from LLM_MODEL_NAME '{model_name}'" if inferred else f"the default for LLM_MODEL_NAME '{model_name}'"
+    app.logger.warning(f"LLM_PROVIDER is not set; using '{app.config['LLM_PROVIDER']}' ({reason}). Set LLM_PROVIDER to choose explicitly.")
+
+class LLMBusyError(RuntimeError):
+    """Raised when no concurrency slot frees up within the request timeout."""
+
+class LLMProvider(abc.ABC):
+    """
+    A process-wide LLM client. Subclasses create their SDK client once and reuse
+    its keep-alive connection pool; every call holds one slot of a semaphore
+    bounding concurrent requests to the provider.
+    """
+
+    def __init__(self, model_name, api_key, base_url=None, timeout=60.0, max_concurrency=8, max_retries=2):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise LLMBusyError(f"All {self.max_concurrency} LLM slots busy for {self.timeout}s")
+
+    def complete(self, system_prompt: str, prompt: str, temperature: float = 0.7, max_tokens: int = 1500) -> str:
+        self._acquire()
+        try:
+            with stage('llm_call'):
+                return self._complete(system_prompt, prompt, temperature, max_tokens)
+        finally:
+            self._slots.release()
+
+    async def acomplete(self, system_prompt: str, prompt: str, temperature: float = 0.7, max_tokens: int = 1500) -> str:
+        """Async form of `complete` for batch callers; the blocking SDK call runs in a worker thread."""
+        return await asyncio.to_thread(self.complete, system_prompt, prompt, temperature, max_tokens)
+
+    def stream(self, system_prompt: str, prompt: str, temperature: float = 0.7, max_tokens: int = 1500):
+        """Yields pieces of the completion as they arrive; the slot is held until the stream ends."""
+        self._acquire()
+        try:
+            with stage('llm_call'): # Until the last piece
+                yield from self._stream(system_prompt, prompt, temperature, max_tokens)
+        finally:
+            self._slots.release()
+
+    @abc.abstractmethod
+    def _complete(self, system_prompt, prompt, temperature, max_tokens) -> str:
+        """One blocking completion; called with a slot held."""
+
+    @abc.abstractmethod
+    def _stream(self, system_prompt, prompt, temperature, max_tokens):
+        """Yields pieces of one completion; called with a slot held."""
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI (or any OpenAI-compatible server, via LLM_BASE_URL) chat completions."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        from openai import OpenAI
+        import httpx
+        # One pooled HTTP client per process: keep-alive connections skip the TCP/TLS handshake per document
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            timeout=self.timeout,
+        )
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            http_client=self.http_client,
+        )
+
+    def _messages(self, system_prompt, prompt):
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _complete(self, system_prompt, prompt, temperature, max_tokens):
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(system_prompt, prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message.content
+
+    def _stream(self, system_prompt, prompt, temperature, max_tokens):
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(system_prompt, prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google-generativeai; the SDK is configured once per process."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import google.generativeai as genai
+        self.genai = genai
+        genai.configure(api_key=self.api_key)
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def _generate(self, prompt, temperature, max_tokens, stream):
+        return self.model.generate_content(
+            contents=prompt,
+            generation_config=self.genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+            ),
+            stream=stream,
+            request_options={"timeout": self.timeout},
+        )
+
+    def _complete(self, system_prompt, prompt, temperature, max_tokens):
+        # The system prompt is already the first paragraph of `prompt` (see build_document_prompt)
+        return self._generate(prompt, temperature, max_tokens, stream=False).text
+
+    def _stream(self, system_prompt, prompt, temperature, max_tokens):
+        for chunk in self._generate(prompt, temperature, max_tokens, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_llm_provider():
+    """
+    Returns the process-wide provider for the configured LLM_PROVIDER / LLM_MODEL_NAME,
+    creating it on first use. Returns None when no API key is configured or the
+    provider's library is not installed, so callers can fall back to templates.
+    Raises ValueError for an unsupported provider or a model name of another provider.
+    """
+    config = current_app.config
+    provider_name = (config.get('LLM_PROVIDER') or infer_provider_name(config.get('LLM_MODEL_NAME')) or 'openai').lower()
+    api_key = config.get('LLM_API_KEY')
+
+    if not api_key:
+        current_app.logger.warning("LLM_API_KEY not set; falling back to template-based document generation.")
+        return None
+    if provider_name not in SUPPORTED_PROVIDERS:
+        raise ValueError(f"Unsupported LLM_PROVIDER: {provider_name}. Supported: {', '.join(SUPPORTED_PROVIDERS)}.")
+    model_provider = infer_provider_name(config.get('LLM_MODEL_NAME'))
+    # An OpenAI-compatible LLM_BASE_URL may serve any model name (Gemini has such an endpoint too)
+    if model_provider and model_provider != provider_name and not (provider_name == 'openai' and config.get('LLM_BASE_URL')):
+        raise ValueError(f"LLM_MODEL_NAME '{config.get('LLM_MODEL_NAME')}' is a {model_provider} model, but LLM_PROVIDER is '{provider_name}'.")
+    if provider_name == 'openai' and not (_is_installed('openai') and _is_installed('httpx')):
+        current_app.logger.warning("OpenAI library not installed")
+        return None
+    if provider_name == 'gemini' and not _is_installed('google.generativeai'):
+        current_app.logger.warning("Google Generative AI library not installed")
+        return None
+
+    key = (provider_name, config.get('LLM_MODEL_NAME'), api_key, config.get('LLM_BASE_URL'))
+    provider = _providers.get(key)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(key)
+            if provider is None:
+                provider_class = OpenAIProvider if provider_name == 'openai' else GeminiProvider
+                provider = provider_class(
+                    model_name=config.get('LLM_MODEL_NAME'),
+                    api_key=api_key,
+                    base_url=config.get('LLM_BASE_URL'),
+                    timeout=config['LLM_TIMEOUT_SECONDS'],
+                    max_concurrency=config['LLM_MAX_CONCURRENCY'],
+                    max_retries=config['LLM_MAX_RETRIES'],
+                )
+                _providers[key] = provider
+    return provider
@@ -0,0 +1,80 @@
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from flask import current_app
+import bcrypt
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing pool's queue is full or a result takes too long; callers answer 503."""
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None # Semaphore bounding queued + running hash jobs
+_dummy_hash = None
+
+_BCRYPT_COST = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+def _verify(password: bytes, password_hash: bytes) -> bool:
+    try:
+        return bcrypt.checkpw(password, password_hash)
+    except ValueError: # Malformed stored hash
+        return False
+
+def _get_executor():
+    """Dedicated pool so bcrypt never runs on (and starves) the server's request threads."""
+    global _executor, _pending
+    workers = current_app.config['PASSWORD_HASH_WORKERS']
+    if workers <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _pending = threading.BoundedSemaphore(workers + current_app.config['PASSWORD_HASH_MAX_QUEUE'])
+                _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+def _run(func, *args):
+    executor = _get_executor()
+    if executor is None:
+        return func(*args)
+    if not _pending.acquire(blocking=False):
+        raise PasswordHasherBusy("Too many password checks in progress")
+    try:
+        future = executor.submit(func, *args)
+    except Exception:
+        _pending.release()
+        raise
+    # The slot frees when the work actually finishes, even if this caller stops waiting
+    future.add_done_callback(lambda _: _pending.release())
+    try:
+        return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT_SECONDS'])
+    except FutureTimeoutError:
+        raise PasswordHasherBusy("Password check timed out")
+
+def hash_password(password: str) -> str:
+    """bcrypt hash at the configured cost (BCRYPT_ROUNDS), computed in the hashing pool."""
+    return _run(_hash, password.encode('utf-8'), current_app.config['BCRYPT_ROUNDS']).decode('utf-8')
+
+def verify_password(password: str, password_hash: str) -> bool:
+    if not password_hash:
+        return False
+    return _run(_verify, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+def verify_dummy_password(password: str):
+    """
+    Spends the same work as a real check for unknown usernames, so response
+    timing does not reveal which usernames exist.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password('dummy-password-for-timing')
+    verify_password(password, _dummy_hash)
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when the stored hash uses a different cost than BCRYPT_ROUNDS (or is not a bcrypt hash)."""
+    match = _BCRYPT_COST.match(password_hash or '')
+    return match is None or int(match.group(1)) != current_app.config['BCRYPT_ROUNDS']
@@ -0,0 +1,174 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from app import db
+from app.models import GeneratedDocument
+from app.utils.metrics import stage
+
+# Bump whenever the layout below changes, so previously cached PDFs are re-rendered
+PDF_TEMPLATE_VERSION = 1
+
+_styles = None
+_styles_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_render_executor():
+    """Process pool shared by bulk exports and timetable renders; None when EXPORT_RENDER_WORKERS is 0."""
+    global _executor
+    workers = current_app.config['EXPORT_RENDER_WORKERS']
+    if workers <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+def get_pdf_styles() -> dict:
+    """Paragraph styles for generated documents, built once per process."""
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                from reportlab.lib.enums import TA_CENTER
+                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+                sample = getSampleStyleSheet()
+                _styles = {
+                    "normal": sample['Normal'],
+                    # Custom style for title
+                    "title": ParagraphStyle(
+                        name='CustomTitle',
+                        parent=sample['h1'],
+                        fontSize=18,
+                        leading=22,
+                        alignment=TA_CENTER,
+                        spaceAfter=14
+                    ),
+                    # Custom style for document type
+                    "document_type": ParagraphStyle(
+                        name='CustomDocType',
+                        parent=sample['h2'],
+                        fontSize=14,
+                        leading=16,
+                        alignment=TA_CENTER,
+                        spaceAfter=12,
+                        textColor='gray'
+                    ),
+                    # Custom style for content
+                    "content": ParagraphStyle(
+                        name='CustomContent',
+                        parent=sample['Normal'],
+                        fontSize=10,
+                        leading=14,
+                        spaceAfter=8,
+                    ),
+                }
+    return _styles
+
+def document_pdf_fields(document: GeneratedDocument) -> dict:
+    """The plain values `render_document_pdf` needs; picklable, so rendering can run in another process."""
+    return {
+        "title": document.title,
+        "document_type": document.document_type,
+        "generation_date": document.generation_date.strftime('%Y-%m-%d') if document.generation_date else '',
+        "department": (document.admin_inputs or {}).get('department', 'N/A'),
+        "content": document.content,
+    }
+
+def render_document_pdf(fields: dict) -> bytes:
+    """Renders a generated document (see `document_pdf_fields`) to PDF bytes."""
+    # reportlab is imported on first render rather than at app startup
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    styles = get_pdf_styles()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+
+    story = []
+    story.append(Paragraph(fields["title"], styles["title"]))
+    story.append(Paragraph(fields["document_type"].upper(), styles["document_type"]))
+    story.append(Spacer(1, 0.2 * 1.5 * 10)) # 0.2 inch spacer
+
+    # Add generation metadata
+    story.append(Paragraph(f"<b>Date:</b> {fields['generation_date']}", styles["normal"]))
+    story.append(Paragraph(f"<b>Department:</b> {fields['department']}", styles["normal"]))
+    story.append(Spacer(1, 0.2 * 10))
+
+    # Add content
+    for paragraph_text in fields["content"].split('\n\n'): # Split by double newlines for paragraphs
+        if paragraph_text.strip():
+            story.append(Paragraph(paragraph_text.strip(), styles["content"]))
+            story.append(Spacer(1, 0.1 * 10)) # Small spacer between paragraphs
+
+    doc.build(story)
+    return buffer.getvalue()
+
+def document_pdf_etag(document: GeneratedDocument) -> str:
+    """
+    Cache key of a document's PDF: changes whenever the document or the template does.
+    The rendered fields are hashed too, since SQLite's updated_at only has second resolution.
+    """
+    updated_at = document.updated_at.isoformat() if document.updated_at else ''
+    key = json.dumps([document.id, updated_at, PDF_TEMPLATE_VERSION, document_pdf_fields(document)], sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+def document_pdf_filename(document: GeneratedDocument) -> str:
+    """Download name offered to the browser."""
+    return f"{document.title.replace(' ', '_')}_{document.document_type.replace(' ', '_')}.pdf"
+
+def document_pdf_cache_path(document: GeneratedDocument) -> tuple[str, str]:
+    """Returns (path, etag) of the cache file for the document's current PDF; the file may not exist yet."""
+    etag = document_pdf_etag(document)
+    path = os.path.join(current_app.config['PDF_CACHE_FOLDER'], f"document_{document.id}_{etag}.pdf")
+    return path, etag
+
+def write_cache_file(path: str, data: bytes):
+    """Writes a rendered file to the cache under a temporary name first, so concurrent readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def get_cached_document_pdf(document: GeneratedDocument) -> tuple[str, str]:
+    """
+    Returns (path, etag) of the document's rendered PDF, rendering it only when
+    no cached file matches the current (id, updated_at, template version).
+    The cached path is recorded in `GeneratedDocument.pdf_filepath`.
+    """
+    path, etag = document_pdf_cache_path(document)
+    if not os.path.exists(path):
+        with stage('pdf_render'):
+            pdf_bytes = render_document_pdf(document_pdf_fields(document))
+        write_cache_file(path, pdf_bytes)
+        current_app.logger.debug(f"Rendered PDF for document {document.id} ({len(pdf_bytes)} bytes)")
+
+    if document.pdf_filepath != path:
+        _record_pdf_filepath(document, path)
+    return path, etag
+
+def _record_pdf_filepath(document: GeneratedDocument, path: str):
+    previous = document.pdf_filepath
+    try:
+        # Keep updated_at as is: recording the cache file is not a change to the document
+        GeneratedDocument.query.filter_by(id=document.id).update(
+            {"pdf_filepath": path, "updated_at": document.updated_at}, synchronize_session=False
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Failed to record PDF path for document {document.id}: {e}")
+        return
+
+    # The previous render of this document is stale now
+    if previous and previous != path and os.path.dirname(previous) == os.path.dirname(path):
+        try:
+            os.remove(previous)
+        except OSError:
+            pass
@@ -0,0 +1,131 @@
+import threading
+from flask import current_app
+from app.utils.chunker import approximate_token_count
+
+_token_counters = {}
+_token_counters_lock = threading.Lock()
+
+def get_llm_token_counter(model_name: str = None):
+    """
+    Returns a callable counting tokens for the configured LLM: tiktoken's encoding
+    for OpenAI models when installed, otherwise the word-based approximation.
+    """
+    model_name = model_name or current_app.config.get('LLM_MODEL_NAME')
+    counter = _token_counters.get(model_name)
+    if counter is None:
+        with _token_counters_lock:
+            counter = approximate_token_count
+            # Optional: exact token counts for OpenAI models (imported on first use; slow to import)
+            try:
+                import tiktoken
+            except ImportError:
+                tiktoken = None
+            if tiktoken is not None and current_app.config.get('LLM_PROVIDER') == 'openai':
+                try:
+                    encoding = tiktoken.encoding_for_model(model_name)
+                except KeyError:
+                    encoding = tiktoken.get_encoding('cl100k_base')
+                counter = lambda text: len(encoding.encode(text, disallowed_special=()))
+            _token_counters[model_name] = counter
+    return counter
+
+def _rank_key(chunk):
+    distance = chunk.get('distance')
+    return float('inf') if distance is None else distance
+
+def _strip_overlap(previous, chunk):
+    """
+    Returns `chunk`'s text without the part already covered by `previous`, the
+    preceding chunk of the same document. Uses the stored character offsets
+    when both chunks have them, otherwise the longest suffix/prefix match.
+    """
+    text = chunk['text_chunk']
+    if previous.get('char_end') is not None and chunk.get('char_start') is not None:
+        overlap = previous['char_end'] - chunk['char_start']
+        return text[max(overlap, 0):]
+    previous_text = previous['text_chunk']
+    for size in range(min(len(previous_text), len(text)), 0, -1):
+        if previous_text.endswith(text[:size]):
+            return text[size:]
+    return text
+
+def select_rag_context(document_type: str, admin_inputs: dict, chunks: list[dict], max_output_tokens: int) -> dict:
+    """
+    Ranks retrieved chunks by distance and keeps as many as fit the context budget:
+    PROMPT_RAG_TOKEN_BUDGET, further limited by what is left of LLM_CONTEXT_WINDOW
+    after the instructions, admin inputs and `max_output_tokens`.
+
+    Duplicate (document, chunk_index) pairs are dropped and adjacent chunks of the
+    same document are merged with their overlap removed, so shared text is only
+    paid for once. Returns the context blocks to put in the prompt, the ids of the
+    chunks used and the token counts of the assembled prompt.
+    """
+    from app.services.document_generation import build_document_prompt
+
+    count_tokens = get_llm_token_counter()
+    system_prompt, bare_prompt = build_document_prompt(document_type, admin_inputs, [])
+    system_tokens = count_tokens(system_prompt) # Sent again as the system message
+    base_tokens = system_tokens + count_tokens(bare_prompt)
+    window_left = current_app.config['LLM_CONTEXT_WINDOW'] - max_output_tokens - base_tokens
+    budget = max(0, min(current_app.config['PROMPT_RAG_TOKEN_BUDGET'], window_left))
+
+    selected = {} # (uploaded_document_id, chunk_index) -> chunk
+    used_tokens = 0
+    for chunk in sorted(chunks, key=_rank_key):
+        key = (chunk.get('uploaded_document_id'), chunk.get('chunk_index'))
+        if key in selected:
+            continue
+        text = chunk['text_chunk']
+        if key[1] is not None:
+            previous = selected.get((key[0], key[1] - 1))
+            if previous is not None:
+                text = _strip_overlap(previous, chunk)
+        tokens = count_tokens(text)
+        if used_tokens + tokens > budget:
+            continue # A lower-ranked but shorter chunk may still fit
+        selected[key] = chunk
+        used_tokens += tokens
+
+    # Documents in order of their best chunk; each document's chunks in reading order, adjacent ones merged
+    best_rank = {}
+    for rank, chunk in enumerate(sorted(selected.values(), key=_rank_key)):
+        best_rank.setdefault(chunk.get('uploaded_document_id'), rank)
+    ordered = sorted(selected.values(), key=lambda c: (best_rank[c.get('uploaded_document_id')], c.get('chunk_index') or 0))
+
+    context_blocks = []
+    previous = None
+    for chunk in ordered:
+        adjacent = (
+            previous is not None
+            and chunk.get('uploaded_document_id') == previous.get('uploaded_document_id')
+            and chunk.get('chunk_index') is not None
+            and chunk.get('chunk_index') == (previous.get('chunk_index') or 0) + 1
+        )
+        if adjacent:
+            context_blocks[-1] += _strip_overlap(previous, chunk)
+        else:
+            context_blocks.append(chunk['text_chunk'])
+        previous = chunk
+
+    _, final_prompt = build_document_prompt(document_type, admin_inputs, context_blocks)
+    prompt_tokens = system_tokens + count_tokens(final_prompt)
+    return {
+        "context": context_blocks,
+        "chunk_ids": [chunk['id'] for chunk in ordered],
+        "context_tokens": prompt_tokens - base_tokens,
+        "prompt_tokens": prompt_tokens,
+        "dropped_chunks": len(chunks) - len(selected),
+    }
+
+def llm_call_token_counts(rag: dict, completion: str, from_llm: bool) -> dict:
+    """
+    The GeneratedDocument token columns for a document. All None unless this
+    request's LLM call produced the text: cache hits and template fallbacks cost no tokens.
+    """
+    if not from_llm:
+        return {"prompt_tokens": None, "context_tokens": None, "completion_tokens": None}
+    return {
+        "prompt_tokens": rag["prompt_tokens"],
+        "context_tokens": rag["context_tokens"],
+        "completion_tokens": get_llm_token_counter()(completion),
+    }
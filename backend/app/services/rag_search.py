@@ -0,0 +1,143 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+class RankedResultCache:
+    """
+    Short-lived, process-local LRU of ranked retrieval results, so paging through
+    one search does not re-encode the query and re-run the vector search per page.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=120):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # key -> (expires_at, results)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, results):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def _get_result_cache() -> RankedResultCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RankedResultCache(
+                    max_entries=current_app.config['RAG_RESULT_CACHE_MAX_ENTRIES'],
+                    ttl_seconds=current_app.config['RAG_RESULT_CACHE_TTL_SECONDS'],
+                )
+    return _cache
+
+def _clamp(value, default, maximum, name):
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    return max(1, min(value, maximum))
+
+def _result_key(query_text: str, top_k: int, model_name: str) -> str:
+    payload = json.dumps([" ".join(query_text.split()), top_k, model_name])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+def _encode_cursor(key: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([key, offset]).encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key, offset = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return key, int(offset)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def truncate_text(text: str, max_chars: int) -> tuple[str, bool]:
+    """Cuts `text` to at most `max_chars` on a word boundary; returns (text, truncated)."""
+    if not max_chars or len(text) <= max_chars:
+        return text, False
+    cut = text[:max_chars]
+    if ' ' in cut:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip() + '…', True
+
+def _shape(chunk: dict, max_chars: int) -> dict:
+    shaped = dict(chunk)
+    if max_chars:
+        shaped['text_chunk'], shaped['truncated'] = truncate_text(chunk['text_chunk'], max_chars)
+    return shaped
+
+def search_chunks(query_text: str, top_k=None, page_size=None, cursor: str = None, max_chars=None) -> dict:
+    """
+    One page of the top_k chunks ranked for `query_text`.
+
+    top_k is capped at RAG_SEARCH_MAX_TOP_K. The ranked list is computed once and
+    cached for RAG_RESULT_CACHE_TTL_SECONDS; further pages are requested with
+    the same query plus the returned cursor. If the cached list has expired it is
+    recomputed. `max_chars` optionally truncates each chunk's text.
+    """
+    from app.services.embedding_service import get_active_embedding_model_name, get_embeddings_for_query
+
+    config = current_app.config
+    top_k = _clamp(top_k, config['RAG_TOP_K'], config['RAG_SEARCH_MAX_TOP_K'], 'top_k')
+    page_size = _clamp(page_size, config['RAG_SEARCH_PAGE_SIZE'], config['RAG_SEARCH_MAX_TOP_K'], 'page_size')
+    max_chars = _clamp(max_chars, 0, config['RAG_SEARCH_MAX_CHARS'], 'max_chars') if max_chars else 0
+
+    key = _result_key(query_text, top_k, get_active_embedding_model_name())
+    offset = 0
+    if cursor:
+        cursor_key, offset = _decode_cursor(cursor)
+        offset = max(0, offset)
+        if cursor_key != key:
+            raise ValueError("Cursor does not belong to this query and top_k")
+
+    cache = _get_result_cache()
+    results = cache.get(key)
+    if results is None:
+        results = get_embeddings_for_query(query_text, top_k=top_k)
+        cache.put(key, results)
+
+    page = results[offset:offset + page_size]
+    next_offset = offset + page_size
+    return {
+        "results": [_shape(chunk, max_chars) for chunk in page],
+        "total": len(results),
+        "next_cursor": _encode_cursor(key, next_offset) if next_offset < len(results) else None,
+    }
+
+def fetch_chunks(chunk_ids: list, max_chars=None) -> list[dict]:
+    """Chunks by id, in the requested order; at most RAG_CHUNKS_MAX_IDS ids per call."""
+    from app.services.embedding_service import get_chunks_by_ids
+
+    config = current_app.config
+    if not isinstance(chunk_ids, list) or not chunk_ids:
+        raise ValueError("ids must be a non-empty list of integers")
+    try:
+        ids = list(dict.fromkeys(int(chunk_id) for chunk_id in chunk_ids))
+    except (TypeError, ValueError):
+        raise ValueError("ids must be a non-empty list of integers")
+    if len(ids) > config['RAG_CHUNKS_MAX_IDS']:
+        raise ValueError(f"Too many ids: at most {config['RAG_CHUNKS_MAX_IDS']} per request")
+    max_chars = _clamp(max_chars, 0, config['RAG_SEARCH_MAX_CHARS'], 'max_chars') if max_chars else 0
+
+    by_id = {chunk['id']: chunk for chunk in get_chunks_by_ids(ids)}
+    return [_shape(by_id[chunk_id], max_chars) for chunk_id in ids if chunk_id in by_id]
@@ -0,0 +1,190 @@
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Embedding, EmbeddingModelVersion
+from app.services.embedding_service import generate_embeddings, get_active_embedding_model_name, serialize_embedding
+
+# A job is claimed in the database with a lease, so only one worker process runs it; the
+# lease is renewed with every batch, and one left by a crashed worker lapses after this long
+LEASE_SECONDS = 120
+
+def _lease_until():
+    return datetime.now(timezone.utc) + timedelta(seconds=LEASE_SECONDS)
+
+class LeaseLost(RuntimeError):
+    """The job's lease lapsed and another worker claimed it; this worker must stop writing."""
+
+def _update_if_owner(version: EmbeddingModelVersion, owner: str, values: dict):
+    """
+    Applies `values` to the version row in the current transaction, and renews the
+    lease, only while `owner` still holds it. Otherwise rolls the transaction back
+    (discarding the batch written in it) and raises LeaseLost.
+    """
+    updated = EmbeddingModelVersion.query.filter(
+        EmbeddingModelVersion.id == version.id, EmbeddingModelVersion.lease_owner == owner
+    ).update({EmbeddingModelVersion.lease_expires_at: _lease_until(), **values}, synchronize_session=False)
+    if not updated:
+        db.session.rollback()
+        raise LeaseLost(f"Re-embedding job for '{version.model_name}' was claimed by another worker")
+
+def start_reembedding(target_model_name: str = None, batch_size: int = None, rebuild: bool = False) -> tuple[EmbeddingModelVersion, bool]:
+    """
+    Starts, or resumes from its checkpoint, a background job that re-embeds every
+    chunk of the active model with `target_model_name` (default: EMBEDDING_MODEL_NAME).
+    Retrieval keeps serving the active model until the job switches over.
+
+    An unfinished or failed job built from the same source model resumes where it
+    stopped; it is rebuilt from scratch only when the active (source) model has
+    changed since, the version was retired, or `rebuild` is set. Returns
+    (version, started); started is False when a worker already runs the job.
+    Raises ValueError for a model outside EMBEDDING_REEMBED_ALLOWED_MODELS.
+    """
+    target_model_name = target_model_name or current_app.config['EMBEDDING_MODEL_NAME']
+    allowed = set(current_app.config['EMBEDDING_REEMBED_ALLOWED_MODELS']) | {current_app.config['EMBEDDING_MODEL_NAME']}
+    if target_model_name not in allowed:
+        raise ValueError(f"'{target_model_name}' is not an allowed embedding model. Allowed: {', '.join(sorted(allowed))}")
+    batch_size = batch_size or current_app.config['EMBEDDING_REEMBED_BATCH_SIZE']
+    source_model_name = get_active_embedding_model_name()
+    if target_model_name == source_model_name:
+        raise ValueError(f"'{target_model_name}' is already the active embedding model")
+
+    version = EmbeddingModelVersion.query.filter_by(model_name=target_model_name).first()
+    if version is None:
+        try:
+            version = EmbeddingModelVersion(model_name=target_model_name, source_model_name=source_model_name, status='building')
+            db.session.add(version)
+            db.session.commit()
+        except IntegrityError: # Another worker created it first
+            db.session.rollback()
+            version = EmbeddingModelVersion.query.filter_by(model_name=target_model_name).first()
+
+    # Claim: only succeeds if no live lease is held, so concurrent requests (in any worker) start one job
+    owner = uuid.uuid4().hex
+    claimed = EmbeddingModelVersion.query.filter(
+        EmbeddingModelVersion.id == version.id,
+        EmbeddingModelVersion.status != 'active',
+        or_(EmbeddingModelVersion.lease_expires_at.is_(None), EmbeddingModelVersion.lease_expires_at < datetime.now(timezone.utc))
+    ).update({EmbeddingModelVersion.lease_expires_at: _lease_until(), EmbeddingModelVersion.lease_owner: owner}, synchronize_session=False)
+    db.session.commit()
+    db.session.refresh(version)
+    if not claimed:
+        return version, False
+
+    if rebuild or version.status == 'retired' or version.source_model_name != source_model_name:
+        # Rebuild from scratch: retired rows, rows built from another source, or an explicit request
+        Embedding.query.filter_by(model_name=target_model_name).delete(synchronize_session=False)
+        version.source_model_name = source_model_name
+        version.last_source_embedding_id = 0
+        version.rows_done = 0
+        version.started_at = func.now()
+        version.completed_at = None
+        version.activated_at = None
+    # Otherwise resume ('building' after a crash or 'failed' after an error) from last_source_embedding_id
+    version.status = 'building'
+    version.error = None
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    threading.Thread(
+        target=_run_job, args=(app, version.id, owner, batch_size), name=f"reembed-{target_model_name}", daemon=True
+    ).start()
+    return version, True
+
+def is_reembedding_running(version: EmbeddingModelVersion) -> bool:
+    """Whether a worker (in any process) holds the job's lease."""
+    lease_expires_at = version.lease_expires_at
+    if version.status != 'building' or lease_expires_at is None:
+        return False
+    if lease_expires_at.tzinfo is None: # SQLite drops the offset; leases are stored in UTC
+        lease_expires_at = lease_expires_at.replace(tzinfo=timezone.utc)
+    return lease_expires_at > datetime.now(timezone.utc)
+
+def _run_job(app, version_id, owner, batch_size):
+    with app.app_context():
+        try:
+            run_reembedding(version_id, owner, batch_size)
+        except LeaseLost as e:
+            app.logger.warning(f"Re-embedding job {version_id} stopped: {e}")
+        except Exception as e:
+            app.logger.error(f"Re-embedding job {version_id} failed: {e}")
+            db.session.rollback()
+            # Resumable from its checkpoint by the next start_reembedding; left alone if another worker took it over
+            EmbeddingModelVersion.query.filter_by(id=version_id, lease_owner=owner).update({
+                EmbeddingModelVersion.status: 'failed',
+                EmbeddingModelVersion.error: str(e),
+                EmbeddingModelVersion.lease_expires_at: None,
+                EmbeddingModelVersion.lease_owner: None,
+            }, synchronize_session=False)
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+def run_reembedding(version_id: int, owner: str, batch_size: int):
+    """
+    Re-embeds source rows in id order, committing each batch together with its
+    checkpoint so an interrupted job resumes exactly where it stopped. When no
+    rows are left, the new version is activated in a single transaction.
+    Every commit first checks that `owner` still holds the lease (LeaseLost otherwise).
+    """
+    version = db.session.get(EmbeddingModelVersion, version_id)
+    while _reembed_batch(version, owner, batch_size):
+        pass
+
+    # Atomic switch: retrieval reads the 'active' row, so flipping both statuses in one commit moves all readers at once
+    source_model_name = version.source_model_name
+    _update_if_owner(version, owner, {
+        EmbeddingModelVersion.status: 'active',
+        EmbeddingModelVersion.completed_at: func.now(),
+        EmbeddingModelVersion.activated_at: func.now(),
+    })
+    EmbeddingModelVersion.query.filter(
+        EmbeddingModelVersion.status == 'active', EmbeddingModelVersion.id != version.id
+    ).update({EmbeddingModelVersion.status: 'retired'}, synchronize_session=False)
+    db.session.commit()
+    current_app.logger.info(f"Embedding model '{version.model_name}' is now active ({version.rows_done} chunks re-embedded)")
+
+    # Chunks added with the old model between the last batch and the switch
+    while _reembed_batch(version, owner, batch_size):
+        pass
+    Embedding.query.filter_by(model_name=source_model_name).delete(synchronize_session=False)
+    _update_if_owner(version, owner, {EmbeddingModelVersion.lease_expires_at: None, EmbeddingModelVersion.lease_owner: None})
+    db.session.commit()
+
+def _reembed_batch(version: EmbeddingModelVersion, owner: str, batch_size: int) -> bool:
+    """Re-embeds the next batch of source rows after the checkpoint. Returns False when none are left."""
+    batch = (Embedding.query
+             .filter(Embedding.model_name == version.source_model_name, Embedding.id > version.last_source_embedding_id)
+             .order_by(Embedding.id)
+             .limit(batch_size)
+             .all())
+    if not batch:
+        return False
+
+    vectors = generate_embeddings([row.text_chunk for row in batch], version.model_name, batch_size=batch_size)
+    db.session.add_all([
+        Embedding(
+            uploaded_document_id=row.uploaded_document_id,
+            text_chunk=row.text_chunk,
+            embedding=serialize_embedding(vector),
+            model_name=version.model_name,
+            dimension=len(vector),
+            chunk_index=row.chunk_index,
+            token_count=row.token_count,
+            page_start=row.page_start,
+            page_end=row.page_end,
+            char_start=row.char_start,
+            char_end=row.char_end
+        )
+        for row, vector in zip(batch, vectors)
+    ])
+    _update_if_owner(version, owner, {
+        EmbeddingModelVersion.dimension: len(vectors[0]),
+        EmbeddingModelVersion.last_source_embedding_id: batch[-1].id,
+        EmbeddingModelVersion.rows_done: func.coalesce(EmbeddingModelVersion.rows_done, 0) + len(batch),
+    })
+    db.session.commit() # New rows, checkpoint and lease renewal are committed together, or not at all
+    return True
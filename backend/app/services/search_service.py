@@ -0,0 +1,215 @@
+import html
+import re
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import text
+from app import db
+
+# Highlight delimiters used inside the database; swapped for <mark> after the snippet is HTML-escaped
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+
+SCOPES = ('generated', 'uploaded', 'all')
+
+# SQLite: external-content FTS5 tables over the source rows, kept in sync by triggers
+_SQLITE_FTS = {
+    'generated': {
+        'table': 'generated_documents',
+        'fts': 'generated_documents_fts',
+        'columns': ('title', 'content'),
+        'rank': 'bm25(10.0, 1.0)', # Title matches weigh more than body matches
+    },
+    'uploaded': {
+        'table': 'uploaded_documents',
+        'fts': 'uploaded_documents_fts',
+        'columns': ('filename', 'parsed_text'),
+        'rank': 'bm25(10.0, 1.0)',
+    },
+}
+
+# Postgres: stored generated tsvector columns with GIN indexes (see database/init.sql).
+# Only the first TSVECTOR_MAX_CHARS of a body are indexed: a tsvector is limited to 1 MB,
+# and a longer parsed PDF would make its INSERT fail. Keep in sync with init.sql and migration 004.
+TSVECTOR_MAX_CHARS = 250000
+_POSTGRES_TSV = {
+    'generated': ('generated_documents', "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                  f"setweight(to_tsvector('english', left(coalesce(content, ''), {TSVECTOR_MAX_CHARS})), 'B')"),
+    'uploaded': ('uploaded_documents', "setweight(to_tsvector('english', coalesce(filename, '')), 'A') || "
+                 f"setweight(to_tsvector('english', left(coalesce(parsed_text, ''), {TSVECTOR_MAX_CHARS})), 'B')"),
+}
+
+def _dialect() -> str:
+    return db.engine.dialect.name
+
+def ensure_search_indexes():
+    """
+    Creates the full-text indexes (and the triggers keeping them current) if they
+    are missing, and backfills them from existing rows. Safe to run at every startup.
+    """
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        for spec in _SQLITE_FTS.values():
+            _ensure_sqlite_fts(**spec)
+    elif dialect == 'postgresql':
+        for table, expression in _POSTGRES_TSV.values():
+            column = db.session.execute(text(
+                "SELECT generation_expression FROM information_schema.columns WHERE table_name = :table AND column_name = 'search_vector'"
+            ), {"table": table}).first()
+            if column is not None and str(TSVECTOR_MAX_CHARS) in (column[0] or ''):
+                continue # Skip the ALTER TABLE lock on every startup
+            if column is not None:
+                # Created before the body was bounded; a generated column's expression cannot be altered in place
+                current_app.logger.warning(f"Rebuilding {table}.search_vector over the first {TSVECTOR_MAX_CHARS} characters")
+                db.session.execute(text(f"ALTER TABLE {table} DROP COLUMN search_vector"))
+            db.session.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS ({expression}) STORED"
+            ))
+            db.session.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table}_search_vector ON {table} USING GIN (search_vector)"))
+    else:
+        current_app.logger.warning(f"Full-text search is not supported on {dialect}; /api/search will be unavailable.")
+        return
+    db.session.commit()
+
+def _ensure_sqlite_fts(table, fts, columns, rank):
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts}
+    ).first()
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column_list}, content='{table}', content_rowid='id', tokenize='porter unicode61', prefix='3')"
+    ))
+    db.session.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+    ))
+    db.session.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    # Only re-index when an indexed column changed (e.g. not for pdf_filepath or status updates)
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in columns)
+    db.session.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} WHEN {changed} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+    ))
+    if not exists:
+        db.session.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        db.session.execute(text(f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', :rank)"), {"rank": rank})
+
+def _sqlite_match_query(query: str) -> str:
+    """
+    Turns free text into an FTS5 query: every word must match, the last one as a
+    prefix (search-as-you-type) once it has 3+ characters, which the prefix index
+    covers; shorter prefixes match too much of the corpus to rank quickly.
+    Quoting each term keeps FTS5 operators in user input from being parsed as query syntax.
+    """
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return ''
+    quoted = [f'"{term}"' for term in terms]
+    if len(terms[-1]) >= 3:
+        quoted[-1] += '*'
+    return " ".join(quoted)
+
+def _highlight(snippet: str) -> str:
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+def search_documents(query: str, user_id, scope: str = 'all', limit: int = 20, offset: int = 0) -> dict:
+    """
+    Ranked full-text search over the user's generated documents and/or the shared
+    uploaded knowledge base. Each hit has a short snippet with the matched terms
+    wrapped in <mark> (the rest of the snippet is HTML-escaped).
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"Unsupported scope: {scope}. Supported: {', '.join(SCOPES)}.")
+    sources = ['generated', 'uploaded'] if scope == 'all' else [scope]
+    dialect = _dialect()
+
+    results = []
+    for source in sources:
+        # Fetch enough of each source to merge and page the combined ranking (+1 to detect a next page)
+        if dialect == 'sqlite':
+            rows = _search_sqlite(source, query, user_id, offset + limit + 1)
+        elif dialect == 'postgresql':
+            rows = _search_postgres(source, query, user_id, offset + limit + 1)
+        else:
+            raise RuntimeError(f"Full-text search is not supported on {dialect}")
+        results.extend(rows)
+
+    # Both backends report "higher is better" scores; sources are merged on that
+    results.sort(key=lambda hit: hit['score'], reverse=True)
+    page = results[offset:offset + limit]
+    for hit in page:
+        hit['snippet'] = _highlight(hit['snippet'])
+    return {"results": page, "has_more": len(results) > offset + limit}
+
+def _search_sqlite(source, query, user_id, limit):
+    match = _sqlite_match_query(query)
+    if not match:
+        return []
+    spec = _SQLITE_FTS[source]
+    fts = spec['fts']
+    # Snippet from the body column (index 1), ~16 tokens around the best match
+    snippet = f"snippet({fts}, 1, '{_MARK_START}', '{_MARK_END}', '…', 16)"
+    if source == 'generated':
+        sql = f"""
+            SELECT d.id, d.title, d.document_type, d.generation_date AS date, {snippet} AS snippet, {fts}.rank AS rank
+            FROM {fts} JOIN generated_documents d ON d.id = {fts}.rowid
+            WHERE {fts} MATCH :match AND d.generated_by = :user_id
+            ORDER BY {fts}.rank LIMIT :limit
+        """
+    else:
+        sql = f"""
+            SELECT d.id, d.filename AS title, d.document_type, d.upload_date AS date, {snippet} AS snippet, {fts}.rank AS rank
+            FROM {fts} JOIN uploaded_documents d ON d.id = {fts}.rowid
+            WHERE {fts} MATCH :match
+            ORDER BY {fts}.rank LIMIT :limit
+        """
+    rows = db.session.execute(text(sql), {"match": match, "user_id": user_id, "limit": limit})
+    # bm25() is lower-is-better and negative; flip it so sources merge on a common "higher is better" score
+    return [_hit(source, row, -row.rank) for row in rows]
+
+def _search_postgres(source, query, user_id, limit):
+    table, _ = _POSTGRES_TSV[source]
+    title, date, body = ('title', 'generation_date', 'content') if source == 'generated' else ('filename', 'upload_date', 'parsed_text')
+    owner_filter = "AND generated_by = :user_id" if source == 'generated' else ""
+    # Rank on the GIN-matched rows first; ts_headline (expensive) only runs for the returned page
+    sql = f"""
+        SELECT ranked.id, ranked.title, ranked.document_type, ranked.date, ranked.rank,
+               ts_headline('english', d.{body}, ranked.query,
+                           'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=" … "') AS snippet
+        FROM (
+            SELECT id, {title} AS title, document_type, {date} AS date, query, ts_rank_cd(search_vector, query) AS rank
+            FROM {table}, websearch_to_tsquery('english', :query) AS query
+            WHERE search_vector @@ query {owner_filter}
+            ORDER BY rank DESC
+            LIMIT :limit
+        ) AS ranked
+        JOIN {table} d ON d.id = ranked.id
+        ORDER BY ranked.rank DESC
+    """
+    rows = db.session.execute(text(sql), {"query": query, "user_id": user_id, "limit": limit})
+    return [_hit(source, row, row.rank) for row in rows]
+
+def _isoformat(value):
+    # Raw SQLite rows hold timestamps as text ("YYYY-MM-DD HH:MM:SS")
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.isoformat() if value else None
+
+def _hit(source, row, score):
+    return {
+        "source": source,
+        "id": row.id,
+        "title": row.title,
+        "document_type": row.document_type,
+        "date": _isoformat(row.date),
+        "snippet": row.snippet,
+        "score": score,
+    }
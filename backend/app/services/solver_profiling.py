@@ -0,0 +1,156 @@
+import os
+import time
+from datetime import datetime
+from app.services.pdf_rendering import write_cache_file
+
+ROOT_FRAME = 'generate_timetable_draft_with_xai'
+ALLOCATION_FRAME = 'allocations'
+XAI_FRAME = 'xai_append'
+SLOWEST_ALLOCATIONS = 10 # Allocations listed individually in the summary
+
+class SolverProfiler:
+    """
+    Timings and probe counts of one timetable solver run.
+
+    An unprofiled run gets NULL_PROFILER instead, with the same interface. Rule times
+    include the XAI entries the rule appended (reported separately as xai_append); a
+    rule is "probed" once per slot it checks.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {} # phase name -> seconds
+        self.rules = {} # rule -> [probes, rejections, seconds]
+        self.xai = {} # rule or phase that appended -> [entries, seconds]
+        self.allocations = [] # one dict per subject allocation
+        self.total_seconds = None
+
+    def clock(self) -> float:
+        """The start time of a rule, phase or XAI entry, for the recording methods below."""
+        return time.perf_counter()
+
+    def phase(self, name: str, started: float) -> float:
+        """Adds the time since `started` to a phase of the run; returns the current time for the next phase."""
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - started
+        return now
+
+    def rule(self, name: str, started: float, rejected: bool = False) -> float:
+        """Records one probe of `name` that started at `started`; returns the current time for the next rule."""
+        now = time.perf_counter()
+        stats = self.rules.get(name)
+        if stats is None:
+            stats = self.rules[name] = [0, 0, 0.0]
+        stats[0] += 1
+        stats[1] += rejected
+        stats[2] += now - started
+        return now
+
+    def reject(self, name: str, started: float, xai_started: float | None = None) -> float:
+        """Records a probe of `name` that rejected the slot, and the XAI entry it appended since `xai_started`."""
+        if xai_started is not None:
+            self.xai_append(name, xai_started)
+        return self.rule(name, started, rejected=True)
+
+    def xai_append(self, frame: str, started: float):
+        """Records one XAI entry built and appended since `started` by a rule, or by a phase outside any rule."""
+        stats = self.xai.get(frame)
+        if stats is None:
+            stats = self.xai[frame] = [0, 0.0]
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+    def allocation(self, allocation: dict, attempts: int, slots_tried: int, periods_assigned: int):
+        self.allocations.append({
+            "subject_code": allocation.get('subject_code'),
+            "faculty": allocation.get('faculty'),
+            "branch_section": f"{allocation.get('branch')}-{allocation.get('section')}",
+            "periods_needed": allocation.get('periods_per_week'),
+            "periods_assigned": periods_assigned,
+            "attempts": attempts,
+            "slots_tried": slots_tried,
+        })
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self.started
+
+    def collapsed_stacks(self) -> str:
+        """The run in the collapsed-stack format of flamegraph.pl, speedscope and inferno; values are microseconds."""
+        samples = {}
+
+        def add(stack, seconds):
+            microseconds = round(seconds * 1_000_000)
+            if microseconds > 0:
+                samples[';'.join((ROOT_FRAME,) + stack)] = microseconds
+
+        rules_seconds = sum(seconds for _, _, seconds in self.rules.values())
+        for rule, (_, _, seconds) in self.rules.items(): # Rules run inside the allocation loop
+            xai_seconds = self.xai.get(rule, (0, 0.0))[1]
+            add((ALLOCATION_FRAME, rule), seconds - xai_seconds)
+            add((ALLOCATION_FRAME, rule, XAI_FRAME), xai_seconds)
+        for phase, seconds in self.phases.items():
+            xai_seconds = self.xai.get(phase, (0, 0.0))[1]
+            add((phase,), seconds - xai_seconds - (rules_seconds if phase == ALLOCATION_FRAME else 0.0))
+            add((phase, XAI_FRAME), xai_seconds)
+        return "".join(f"{stack} {value}\n" for stack, value in samples.items())
+
+    def summary(self, profile_file: str | None = None) -> dict:
+        """JSON-serialisable totals, stored with the draft and returned by /timetable/generate."""
+        rules = {}
+        for rule, (probes, rejections, seconds) in sorted(self.rules.items(), key=lambda item: -item[1][2]):
+            rules[rule] = {"probes": probes, "rejections": rejections, "ms": round(seconds * 1000, 3),
+                           "us_per_probe": round(seconds * 1_000_000 / probes, 2) if probes else None}
+        xai_entries = sum(entries for entries, _ in self.xai.values())
+        xai_seconds = sum(seconds for _, seconds in self.xai.values())
+        attempts = [a['attempts'] for a in self.allocations]
+        return {
+            "total_ms": round((self.total_seconds or 0.0) * 1000, 3),
+            "phases_ms": {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()},
+            "rules": rules,
+            "xai_append": {"entries": xai_entries, "ms": round(xai_seconds * 1000, 3),
+                           "by_frame": {frame: entries for frame, (entries, _) in self.xai.items()}},
+            "allocations": {
+                "count": len(attempts),
+                "attempts_total": sum(attempts),
+                "attempts_mean": round(sum(attempts) / len(attempts), 2) if attempts else None,
+                "attempts_max": max(attempts, default=None),
+                "incomplete": sum(1 for a in self.allocations if a['periods_assigned'] < (a['periods_needed'] or 0)),
+                "most_attempts": sorted(self.allocations, key=lambda a: -a['attempts'])[:SLOWEST_ALLOCATIONS],
+            },
+            "profile_file": profile_file,
+        }
+
+class NullSolverProfiler:
+    """The SolverProfiler interface doing nothing: the solver's default, so it needs no `if profiler:` checks."""
+    enabled = False
+    started = 0.0
+
+    def clock(self) -> float:
+        return 0.0
+
+    def phase(self, name: str, started: float) -> float:
+        return 0.0
+
+    def rule(self, name: str, started: float, rejected: bool = False) -> float:
+        return 0.0
+
+    def reject(self, name: str, started: float, xai_started: float | None = None) -> float:
+        return 0.0
+
+    def xai_append(self, frame: str, started: float):
+        pass
+
+    def allocation(self, allocation: dict, attempts: int, slots_tried: int, periods_assigned: int):
+        pass
+
+    def finish(self):
+        pass
+
+NULL_PROFILER = NullSolverProfiler()
+
+def write_profile(profiler: SolverProfiler, folder: str, draft_id: int) -> str:
+    """Writes the run's collapsed stacks to `folder`; returns the file name."""
+    filename = f"timetable_draft_{draft_id}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+    write_cache_file(os.path.join(folder, filename), profiler.collapsed_stacks().encode('utf-8'))
+    return filename
@@ -0,0 +1,203 @@
+import glob
+import hashlib
+import io
+import json
+import os
+from flask import current_app
+from app.services.pdf_rendering import get_render_executor, write_cache_file
+from app.utils.metrics import stage
+
+# reportlab and openpyxl (optional, XLSX output) are imported by the render functions, not at startup
+
+# Bump whenever the layout below changes, so previously cached timetables are re-rendered
+TIMETABLE_TEMPLATE_VERSION = 1
+
+# view -> field of a draft cell that names the timetable it belongs to
+VIEWS = {
+    'section': 'section',
+    'faculty': 'faculty',
+    'room': 'room',
+}
+FORMATS = ('pdf', 'xlsx')
+
+def timetable_axes(draft_content: dict) -> tuple[list[str], list[str]]:
+    """Days and slot start times of a draft, in the order the solver laid them out."""
+    days = list(draft_content or {})
+    slots = []
+    for day in days:
+        for slot_start in draft_content[day] or {}:
+            if slot_start not in slots:
+                slots.append(slot_start)
+    return days, sorted(slots)
+
+def timetable_views(draft_content: dict, view: str) -> dict:
+    """
+    Regroups a draft ({day: {slot: {branch-section: cell}}}) by section, faculty or
+    room: {name: {day: {slot: [entries]}}}. A slot holds a list since a faculty or
+    room can (in a conflicting draft) be booked by several sections at once.
+    """
+    key_field = VIEWS[view]
+    timetables = {}
+    for day, slots in (draft_content or {}).items():
+        for slot_start, cells in (slots or {}).items():
+            for section, cell in (cells or {}).items():
+                entry = dict(cell or {}, section=section)
+                name = entry.get(key_field)
+                if view == 'section':
+                    # Every section gets a timetable, including its free periods
+                    grid = timetables.setdefault(name, {}).setdefault(day, {})
+                    grid[slot_start] = [entry] if cell else []
+                elif cell and name:
+                    timetables.setdefault(name, {}).setdefault(day, {}).setdefault(slot_start, []).append(entry)
+    return timetables
+
+def section_timetables(draft_content: dict) -> dict:
+    return timetable_views(draft_content, 'section')
+
+def _entry_text(entry: dict, view: str) -> str:
+    fields = [field for field in ('subject', 'section', 'faculty', 'room') if field != VIEWS[view]]
+    lines = [entry.get(field) or '' for field in fields]
+    if entry.get('consecutive_part'):
+        lines[0] += f" ({entry['consecutive_part']})"
+    return "\n".join(line for line in lines if line)
+
+def _cell_text(entries, view: str) -> str:
+    return "\n\n".join(_entry_text(entry, view) for entry in entries or [])
+
+def _timetable_rows(view: str, days: list[str], slots: list[str], grid: dict) -> list[list[str]]:
+    rows = [["Day"] + slots]
+    for day in days:
+        rows.append([day] + [_cell_text((grid.get(day) or {}).get(slot), view) for slot in slots])
+    return rows
+
+def render_timetable_pdf(title: str, view: str, days: list[str], slots: list[str], grid: dict) -> bytes:
+    """Renders one timetable ({day: {slot: [entries]}}) as a days-by-slots table on a landscape page."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(letter))
+
+    table = Table(_timetable_rows(view, days, slots, grid), repeatRows=1)
+    table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('BACKGROUND', (0, 1), (0, -1), colors.whitesmoke),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+
+    doc.build([Paragraph(title, styles['h2']), Spacer(1, 12), table])
+    return buffer.getvalue()
+
+def _merge_pdfs(parts: list[bytes]) -> bytes:
+    import fitz # PyMuPDF, already used for PDF extraction
+    merged = fitz.open()
+    for part in parts:
+        with fitz.open(stream=part, filetype='pdf') as document:
+            merged.insert_pdf(document)
+    data = merged.tobytes(garbage=1, deflate=True)
+    merged.close()
+    return data
+
+def render_timetables_pdf(draft_title: str, view: str, days: list[str], slots: list[str], timetables: dict) -> bytes:
+    """
+    One PDF with a page per timetable. Timetables render in parallel in the shared
+    render pool, then the pages are concatenated in name order.
+    """
+    names = sorted(timetables)
+    jobs = [(f"{draft_title} - {view.title()} {name}", view, days, slots, timetables[name]) for name in names]
+    executor = get_render_executor()
+    if executor is None or len(jobs) < 2:
+        parts = [render_timetable_pdf(*job) for job in jobs]
+    else:
+        parts = list(executor.map(render_timetable_pdf, *zip(*jobs)))
+    return _merge_pdfs(parts) if parts else render_timetable_pdf(draft_title, view, days, slots, {})
+
+def _sheet_title(name: str, used: set) -> str:
+    title = "".join('_' if ch in '[]:*?/\\' else ch for ch in str(name))[:31] or 'Sheet'
+    candidate, n = title, 2
+    while candidate.lower() in used:
+        suffix = f"_{n}"
+        candidate, n = title[:31 - len(suffix)] + suffix, n + 1
+    used.add(candidate.lower())
+    return candidate
+
+def render_timetables_xlsx(draft_title: str, view: str, days: list[str], slots: list[str], timetables: dict) -> bytes:
+    """One workbook with a worksheet per timetable."""
+    try:
+        from openpyxl import Workbook
+        from openpyxl.styles import Alignment, Font, PatternFill
+    except ImportError:
+        raise RuntimeError("openpyxl is not installed; XLSX timetables are unavailable")
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    used_titles = set()
+    header_fill = PatternFill('solid', fgColor='DDDDDD')
+    wrap = Alignment(wrap_text=True, vertical='center', horizontal='center')
+
+    for name in sorted(timetables):
+        sheet = workbook.create_sheet(_sheet_title(name, used_titles))
+        sheet.append([f"{draft_title} - {view.title()} {name}"])
+        sheet['A1'].font = Font(bold=True, size=12)
+        for row in _timetable_rows(view, days, slots, timetables[name]):
+            sheet.append(row)
+        for cell in sheet[2]:
+            cell.font = Font(bold=True)
+            cell.fill = header_fill
+        for row in sheet.iter_rows(min_row=2):
+            for cell in row:
+                cell.alignment = wrap
+        sheet.column_dimensions['A'].width = 12
+        for column in sheet.iter_cols(min_col=2, max_col=len(slots) + 1, min_row=2, max_row=2):
+            sheet.column_dimensions[column[0].column_letter].width = 18
+
+    if not timetables:
+        workbook.create_sheet('Timetable').append([draft_title, "No timetables in this view"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def _draft_render_key(draft, view: str, fmt: str) -> str:
+    # The content hash covers edits within one second (SQLite's updated_at resolution)
+    updated_at = draft.updated_at.isoformat() if draft.updated_at else ''
+    key = json.dumps([draft.id, updated_at, view, fmt, TIMETABLE_TEMPLATE_VERSION, draft.draft_content], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+def get_cached_timetable_render(draft, view: str, fmt: str) -> tuple[str, str]:
+    """
+    Returns (path, etag) of the draft's `view` timetables rendered as `fmt`,
+    rendering only when no cached file matches the draft's current version.
+    """
+    if view not in VIEWS:
+        raise ValueError(f"Unsupported view: {view}. Supported: {', '.join(VIEWS)}.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}. Supported: {', '.join(FORMATS)}.")
+
+    etag = _draft_render_key(draft, view, fmt)
+    cache_folder = os.path.join(current_app.config['PDF_CACHE_FOLDER'], 'timetables')
+    prefix = os.path.join(cache_folder, f"draft_{draft.id}_{view}_")
+    path = f"{prefix}{etag}.{fmt}"
+    if os.path.exists(path):
+        return path, etag
+
+    days, slots = timetable_axes(draft.draft_content)
+    timetables = timetable_views(draft.draft_content, view)
+    render = render_timetables_pdf if fmt == 'pdf' else render_timetables_xlsx
+    with stage('pdf_render'):
+        data = render(f"Timetable Draft {draft.id}", view, days, slots, timetables)
+    write_cache_file(path, data)
+    current_app.logger.debug(f"Rendered {view} timetables of draft {draft.id} as {fmt} ({len(timetables)} timetables, {len(data)} bytes)")
+
+    # Earlier versions of this draft's render are stale now
+    for stale in glob.glob(f"{glob.escape(prefix)}*.{fmt}"):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path, etag
@@ -1,4 +1,5 @@
 from app.models import TimetableConfiguration, Faculty, Subject, Room, XaiLog
+from app.services.solver_profiling import NULL_PROFILER, SolverProfiler, ALLOCATION_FRAME
 from datetime import datetime, time
 import random
 from collections import defaultdict
@@ -20,7 +21,8 @@ def generate_timetable_draft_with_xai(
     inputs: dict,
     all_faculties: list[Faculty],
     all_subjects: list[Subject],
-    all_rooms: list[Room]
+    all_rooms: list[Room],
+    profiler: SolverProfiler = NULL_PROFILER
 ) -> tuple[dict, list]:
     """
     Generates a draft timetable based on academic constraints and inputs,
@@ -32,6 +34,8 @@ def generate_timetable_draft_with_xai(
         all_faculties: List of all Faculty objects.
         all_subjects: List of all Subject objects.
         all_rooms: List of all Room objects.
+        profiler: Collects per-rule timings and attempt counts when given; the
+            default NULL_PROFILER records nothing and never reads the clock.
 
     Returns:
         A tuple containing:
@@ -40,6 +44,7 @@ def generate_timetable_draft_with_xai(
     """
     draft_timetable = {}
     xai_logs = []
+    phase_started = profiler.started
 
     # Parse config data
     branches = config.branches
@@ -66,7 +71,6 @@ def generate_timetable_draft_with_xai(
     # Map for quick lookup
     faculty_map = {f.employee_id: f for f in all_faculties}
     subject_map = {s.code: s for s in all_subjects}
-    room_map = {r.name: r for r in all_rooms}
 
     # Admin Inputs: `subject_allocations` in inputs dict
     # Example: [{"subject_code": "CS301", "faculty_id": "F001", "branch": "CSE", "section": "A", "periods_per_week": 3}]
@@ -82,6 +86,7 @@ def generate_timetable_draft_with_xai(
                     all_possible_slots.append((day, slot_start, f"{branch}-{section}"))
 
     random.shuffle(all_possible_slots) # Randomize for initial draft generation
+    phase_started = profiler.phase('setup', phase_started)
 
     # --- Core Timetable Generation Loop ---
     # Iterate through subject allocations and try to place them
@@ -96,6 +101,7 @@ def generate_timetable_draft_with_xai(
         faculty = faculty_map.get(faculty_id)
 
         if not subject:
+            xai_started = profiler.clock()
             xai_logs.append({
                 "log_type": "rejection",
                 "rule_name": "Subject_NotFound",
@@ -103,8 +109,10 @@ def generate_timetable_draft_with_xai(
                 "explanation": f"Subject with code '{subject_code}' not found. Cannot allocate.",
                 "priority": 5
             })
+            profiler.xai_append(ALLOCATION_FRAME, xai_started)
             continue
         if not faculty:
+            xai_started = profiler.clock()
             xai_logs.append({
                 "log_type": "rejection",
                 "rule_name": "Faculty_NotFound",
@@ -112,6 +120,7 @@ def generate_timetable_draft_with_xai(
                 "explanation": f"Faculty with ID '{faculty_id}' not found. Cannot allocate.",
                 "priority": 5
             })
+            profiler.xai_append(ALLOCATION_FRAME, xai_started)
             continue
 
         periods_assigned_for_this_allocation = 0
@@ -122,6 +131,7 @@ def generate_timetable_draft_with_xai(
         consecutive_periods_required = subject.lab_periods if is_current_subject_lab else subject.lecture_periods
 
         attempts = 0
+        slots_tried = 0
         max_attempts_per_period = 50 # Avoid infinite loops
 
         while periods_assigned_for_this_allocation < periods_needed and attempts < max_attempts_per_period * periods_needed:
@@ -137,6 +147,8 @@ def generate_timetable_draft_with_xai(
             random.shuffle(available_slots_for_day)
 
             for slot_start_to_try in available_slots_for_day:
+                slots_tried += 1
+                mark = profiler.clock()
                 slot_details = {
                     "day": day_to_try,
                     "slot_start": slot_start_to_try,
@@ -156,6 +168,7 @@ def generate_timetable_draft_with_xai(
                 if is_current_subject_lab and (current_slot_index + consecutive_periods_required -1) >= len(slots_per_day_config):
                     last_valid_slot_for_lab = len(slots_per_day_config) - consecutive_periods_required
                     if current_slot_index > last_valid_slot_for_lab:
+                         xai_started = profiler.clock()
                          xai_logs.append({
                             "log_type": "rejection",
                             "rule_name": "No_Lab_In_Last_Period",
@@ -163,6 +176,7 @@ def generate_timetable_draft_with_xai(
                             "explanation": f"Cannot schedule lab {subject_code} starting at {slot_start_to_try} on {day_to_try} because it would extend into or beyond the last period.",
                             "priority": 3
                         })
+                         profiler.reject('slot_window', mark, xai_started)
                          continue # Try next slot
                 
                 # Check consecutive periods and breaks
@@ -176,6 +190,7 @@ def generate_timetable_draft_with_xai(
                     
                     if next_slot_config['type'] == 'break':
                         potential_consecutive_slots = []
+                        xai_started = profiler.clock()
                         xai_logs.append({
                             "log_type": "rejection",
                             "rule_name": "Break_Disruption",
@@ -183,11 +198,13 @@ def generate_timetable_draft_with_xai(
                             "explanation": f"Cannot schedule {subject_code} starting at {slot_start_to_try} on {day_to_try} because it would be interrupted by a break at {next_slot_start}.",
                             "priority": 3
                         })
+                        profiler.xai_append('slot_window', xai_started)
                         break # Cannot span breaks
 
                     # Check if the branch-section is already occupied in any of these consecutive slots
                     if draft_timetable[day_to_try][next_slot_start].get(target_branch_section) is not None:
                         potential_consecutive_slots = []
+                        xai_started = profiler.clock()
                         xai_logs.append({
                             "log_type": "rejection",
                             "rule_name": "Section_Already_Occupied_Consecutive",
@@ -195,12 +212,15 @@ def generate_timetable_draft_with_xai(
                             "explanation": f"Section {target_branch_section} is already occupied at {next_slot_start} on {day_to_try}.",
                             "priority": 2
                         })
+                        profiler.xai_append('slot_window', xai_started)
                         break
                     
                     potential_consecutive_slots.append(next_slot_start)
 
                 if len(potential_consecutive_slots) < consecutive_periods_required:
+                    profiler.reject('slot_window', mark)
                     continue # Not enough consecutive slots, try next start time
+                mark = profiler.rule('slot_window', mark)
 
 
                 # --- Rule Checks for the chosen slot(s) ---
@@ -214,6 +234,7 @@ def generate_timetable_draft_with_xai(
                         if slot_content and slot_content.get('faculty') == faculty_id:
                             is_valid = False
                             rejection_reason.append(f"Faculty '{faculty.name}' already teaching '{slot_content['subject']}' in '{bs_key}' at {check_slot_start} on {day_to_try} (Faculty_Clash_Detection).")
+                            xai_started = profiler.clock()
                             xai_logs.append({
                                 "log_type": "conflict",
                                 "rule_name": "Faculty_Clash_Detection",
@@ -221,9 +242,11 @@ def generate_timetable_draft_with_xai(
                                 "explanation": f"Faculty '{faculty.name}' is already assigned to another class at {day_to_try} {check_slot_start}.",
                                 "priority": 1
                             })
+                            profiler.xai_append('faculty_clash', xai_started)
                             break
                     if not is_valid: break
 
+                mark = profiler.rule('faculty_clash', mark, rejected=not is_valid)
                 if not is_valid: continue # Try next slot if faculty clash
 
                 # 2. Faculty Availability Validation
@@ -231,6 +254,7 @@ def generate_timetable_draft_with_xai(
                 if not faculty_available_today:
                     is_valid = False
                     rejection_reason.append(f"Faculty '{faculty.name}' is not available on {day_to_try} (Faculty_Availability_Validation).")
+                    xai_started = profiler.clock()
                     xai_logs.append({
                         "log_type": "rejection",
                         "rule_name": "Faculty_Availability_Validation",
@@ -238,6 +262,7 @@ def generate_timetable_draft_with_xai(
                         "explanation": f"Faculty '{faculty.name}' is marked as unavailable on {day_to_try}.",
                         "priority": 2
                     })
+                    profiler.reject('faculty_availability', mark, xai_started)
                     continue
 
                 for i in range(consecutive_periods_required):
@@ -245,6 +270,7 @@ def generate_timetable_draft_with_xai(
                     if slot_range not in faculty_available_today:
                         is_valid = False
                         rejection_reason.append(f"Faculty '{faculty.name}' is not available at {slot_range} on {day_to_try} (Faculty_Availability_Validation).")
+                        xai_started = profiler.clock()
                         xai_logs.append({
                             "log_type": "rejection",
                             "rule_name": "Faculty_Availability_Validation",
@@ -252,8 +278,10 @@ def generate_timetable_draft_with_xai(
                             "explanation": f"Faculty '{faculty.name}' is not available during {slot_range} on {day_to_try}.",
                             "priority": 2
                         })
+                        profiler.xai_append('faculty_availability', xai_started)
                         break
                 
+                mark = profiler.rule('faculty_availability', mark, rejected=not is_valid)
                 if not is_valid: continue
 
 
@@ -262,6 +290,7 @@ def generate_timetable_draft_with_xai(
                 if (current_daily_periods + consecutive_periods_required) > faculty.max_daily_periods:
                     is_valid = False
                     rejection_reason.append(f"Faculty '{faculty.name}' exceeds max daily periods on {day_to_try} ({current_daily_periods}/{faculty.max_daily_periods} already assigned) (Max_Periods_Per_Faculty_Per_Day).")
+                    xai_started = profiler.clock()
                     xai_logs.append({
                         "log_type": "rejection",
                         "rule_name": "Max_Periods_Per_Faculty_Per_Day",
@@ -269,6 +298,7 @@ def generate_timetable_draft_with_xai(
                         "explanation": f"Faculty '{faculty.name}' would exceed their maximum daily periods ({faculty.max_daily_periods}) on {day_to_try}.",
                         "priority": 3
                     })
+                    profiler.reject('faculty_workload', mark, xai_started)
                     continue
 
                 # 4. Maximum workload per faculty per week
@@ -276,6 +306,7 @@ def generate_timetable_draft_with_xai(
                 if (current_weekly_workload + consecutive_periods_required) > faculty.max_weekly_workload:
                     is_valid = False
                     rejection_reason.append(f"Faculty '{faculty.name}' exceeds max weekly workload ({current_weekly_workload}/{faculty.max_weekly_workload} already assigned) (Max_Workload_Per_Faculty_Per_Week).")
+                    xai_started = profiler.clock()
                     xai_logs.append({
                         "log_type": "rejection",
                         "rule_name": "Max_Workload_Per_Faculty_Per_Week",
@@ -283,15 +314,18 @@ def generate_timetable_draft_with_xai(
                         "explanation": f"Faculty '{faculty.name}' would exceed their maximum weekly workload ({faculty.max_weekly_workload}).",
                         "priority": 4
                     })
+                    profiler.reject('faculty_workload', mark, xai_started)
                     continue
-                
+                mark = profiler.rule('faculty_workload', mark)
+
                 # 5. Room and Lab Allocation Constraints
-                occupied_room_names = [room_map[rid].name for rid, slots_list in room_occupied_slots.items() for d, s in slots_list if d == day_to_try and s == slot_start_to_try]
-                suitable_rooms = [r for r in all_rooms if r.is_lab == is_current_subject_lab and r.name not in occupied_room_names]
+                occupied_room_ids = {rid for rid, slots_list in room_occupied_slots.items() for d, s in slots_list if d == day_to_try and s == slot_start_to_try}
+                suitable_rooms = [r for r in all_rooms if r.is_lab == is_current_subject_lab and r.id not in occupied_room_ids]
                 
                 if not suitable_rooms:
                     is_valid = False
                     rejection_reason.append(f"No suitable or available room for {'lab' if is_current_subject_lab else 'lecture'} at {slot_start_to_try} on {day_to_try} (Room_Allocation_Constraints).")
+                    xai_started = profiler.clock()
                     xai_logs.append({
                         "log_type": "rejection",
                         "rule_name": "Room_Allocation_Constraints",
@@ -299,11 +333,13 @@ def generate_timetable_draft_with_xai(
                         "explanation": f"No suitable {'lab' if is_current_subject_lab else 'lecture'} room available for {subject_code} at {day_to_try} {slot_start_to_try}.",
                         "priority": 4
                     })
+                    profiler.reject('room_search', mark, xai_started)
                     continue
                 
                 # Pick a random suitable room
                 chosen_room = random.choice(suitable_rooms)
                 slot_details['room'] = chosen_room.name
+                mark = profiler.rule('room_search', mark)
 
 
                 # If all rules pass for this slot
@@ -325,6 +361,7 @@ def generate_timetable_draft_with_xai(
                     
                     periods_assigned_for_this_allocation += consecutive_periods_required
                     branch_section_subjects_assigned[target_branch_section][subject_code] += consecutive_periods_required
+                    mark = profiler.rule('assignment', mark)
 
                     xai_logs.append({
                         "log_type": "choice",
@@ -333,10 +370,12 @@ def generate_timetable_draft_with_xai(
                         "explanation": f"Assigned {subject_code} to {target_branch_section} with {faculty.name} in {chosen_room.name} starting at {day_to_try} {slot_start_to_try} for {consecutive_periods_required} periods.",
                         "priority": 1
                     })
+                    profiler.xai_append(ALLOCATION_FRAME, mark)
                     break # Break from trying slots, move to next period needed
             
             # If after trying all slots for this period, we couldn't assign
             if periods_assigned_for_this_allocation < periods_needed and attempts % max_attempts_per_period == 0:
+                 xai_started = profiler.clock()
                  xai_logs.append({
                     "log_type": "rejection",
                     "rule_name": "No_Available_Slot_Found",
@@ -344,8 +383,13 @@ def generate_timetable_draft_with_xai(
                     "explanation": f"Could not find a suitable slot for {subject_code} for {target_branch_section} for {periods_needed - periods_assigned_for_this_allocation} more periods after multiple attempts.",
                     "priority": 5
                 })
+                 profiler.xai_append(ALLOCATION_FRAME, xai_started)
                  break # Give up on this allocation for now
 
+        profiler.allocation(allocation, attempts, slots_tried, periods_assigned_for_this_allocation)
+
+    phase_started = profiler.phase(ALLOCATION_FRAME, phase_started)
+
     # --- Post-generation validation / remaining rules check ---
     # 6. Subject frequency per week (ensure required_frequency_per_week is met)
     for allocation in subject_allocations:
@@ -362,6 +406,7 @@ def generate_timetable_draft_with_xai(
         # For simplicity, we check if at least one period was assigned.
         # A more complex rule would check distinct (day, first_period_of_class)
         if subject.required_frequency_per_week > 0 and actual_periods_assigned == 0:
+            xai_started = profiler.clock()
             xai_logs.append({
                 "log_type": "conflict",
                 "rule_name": "Subject_Frequency_Per_Week",
@@ -369,5 +414,8 @@ def generate_timetable_draft_with_xai(
                 "explanation": f"Subject '{subject.name}' ({subject_code}) for {target_branch_section} was not assigned any periods, but requires {subject.required_frequency_per_week} times per week.",
                 "priority": 2
             })
-        
+            profiler.xai_append('frequency_check', xai_started)
+
+    profiler.phase('frequency_check', phase_started)
+    profiler.finish()
     return draft_timetable, xai_logs
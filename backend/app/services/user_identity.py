@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app import db
+from app.models import User
+
+class CachedUser:
+    """Read-only snapshot of a users row; safe to share between requests and threads (unlike ORM instances)."""
+    __slots__ = ('id', 'username', 'email', 'is_admin', 'token_version')
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.is_admin = bool(user.is_admin)
+        self.token_version = user.token_version or 1
+
+    def __repr__(self):
+        return f'<CachedUser {self.username} v{self.token_version}>'
+
+class UserCache:
+    """
+    Process-local TTL + LRU cache of user snapshots by id. A snapshot may be up to
+    `ttl_seconds` stale when the row is changed by another process; changes
+    committed in this process invalidate it immediately (see _invalidate_on_commit).
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # user id -> (expires_at, CachedUser or None)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Returns (hit, snapshot); a hit may hold None for a user known not to exist."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                return False, None
+            self._entries.move_to_end(user_id)
+            return True, entry[1]
+
+    def put(self, user_id, snapshot):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def _get_user_cache() -> UserCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = UserCache(
+                    max_entries=current_app.config['USER_CACHE_MAX_ENTRIES'],
+                    ttl_seconds=current_app.config['USER_CACHE_TTL_SECONDS'],
+                )
+    return _cache
+
+def _load_user(user_id: int):
+    user = db.session.get(User, user_id)
+    snapshot = CachedUser(user) if user else None
+    _get_user_cache().put(user_id, snapshot)
+    return snapshot
+
+def get_cached_user(user_id, min_version: int = None):
+    """
+    User snapshot for `user_id` (None if there is no such user), from the cache when possible.
+    A cached snapshot older than `min_version` (e.g. the version in a token
+    issued by another process after a change) is reloaded from the database.
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    hit, snapshot = _get_user_cache().get(user_id)
+    if not hit or (snapshot is not None and min_version is not None and snapshot.token_version < min_version):
+        snapshot = _load_user(user_id)
+    return snapshot
+
+def invalidate_user(user_id):
+    if _cache is not None:
+        _cache.invalidate(int(user_id))
+
+def token_claims(user) -> dict:
+    """Claims added to access and refresh tokens; `ver` ties a token to the user's current token_version."""
+    return {"is_admin": bool(user.is_admin), "ver": user.token_version or 1}
+
+def user_from_token(jwt_data: dict):
+    """
+    The token's user, or None if the user is gone or the token predates a bump of
+    the user's token_version (password change, revoked sessions).
+    """
+    version = jwt_data.get('ver')
+    if version is None:
+        return None # Issued before versioned tokens
+    user = get_cached_user(jwt_data.get('sub'), min_version=version)
+    if user is None or user.token_version != version:
+        return None
+    return user
+
+# Drop cached snapshots of users changed or deleted in this process once the change is committed
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _mark_user_changed(mapper, connection, target):
+    object_session(target).info.setdefault('changed_user_ids', set()).add(target.id)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_on_commit(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_user(user_id)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('changed_user_ids', None)
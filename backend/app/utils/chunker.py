@@ -0,0 +1,134 @@
+import re
+from collections import deque, namedtuple
+
+# Sentence ends (., !, ? followed by whitespace) and paragraph breaks (blank lines)
+_BOUNDARY_RE = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+_WORD_RE = re.compile(r'\s*\S+')
+
+PAGE_SEPARATOR = "\n\n" # Must match how extract_text_from_pdf joins pages into parsed_text
+
+# A contiguous slice of the document text that is never split further unless it alone exceeds the budget
+_Unit = namedtuple('_Unit', ['text', 'start', 'page', 'tokens', 'paragraph_end'])
+
+def approximate_token_count(text: str) -> int:
+    """Rough WordPiece/BPE estimate (about 4 tokens per 3 words) used when no tokenizer is available."""
+    words = len(text.split())
+    return (words * 4 + 2) // 3
+
+def _split_oversized(text, start, page, count_tokens, max_tokens):
+    """Splits a single sentence that exceeds the token budget at word boundaries."""
+    piece_start = 0
+    piece_tokens = 0
+    for match in _WORD_RE.finditer(text):
+        word_tokens = count_tokens(match.group())
+        if piece_tokens and piece_tokens + word_tokens > max_tokens:
+            yield _Unit(text[piece_start:match.start()], start + piece_start, page, piece_tokens, False)
+            piece_start = match.start()
+            piece_tokens = 0
+        piece_tokens += word_tokens
+    yield _Unit(text[piece_start:], start + piece_start, page, piece_tokens, True)
+
+def _iter_units(pages, count_tokens, max_tokens):
+    """Yields sentence-level units in one left-to-right scan over each page."""
+    offset = 0
+    seen_text = False
+    for page_number, page_text in enumerate(pages, start=1):
+        if not page_text:
+            continue
+        prefix = ""
+        if seen_text:
+            prefix = PAGE_SEPARATOR
+            offset += len(PAGE_SEPARATOR)
+        seen_text = True
+
+        boundaries = [(m.end(), m.group().count('\n') > 1) for m in _BOUNDARY_RE.finditer(page_text)]
+        if not boundaries or boundaries[-1][0] != len(page_text):
+            boundaries.append((len(page_text), True))
+        else:
+            boundaries[-1] = (len(page_text), True) # End of page is always a paragraph boundary
+
+        unit_start = 0
+        for unit_end, paragraph_end in boundaries:
+            text = prefix + page_text[unit_start:unit_end]
+            start = offset + unit_start - len(prefix)
+            tokens = count_tokens(text)
+            if tokens > max_tokens:
+                pieces = list(_split_oversized(text, start, page_number, count_tokens, max_tokens))
+                for piece in pieces[:-1]:
+                    yield piece
+                yield pieces[-1]._replace(paragraph_end=paragraph_end)
+            else:
+                yield _Unit(text, start, page_number, tokens, paragraph_end)
+            unit_start = unit_end
+            prefix = ""
+        offset += len(page_text)
+
+def _make_chunk(units, chunk_index):
+    raw = "".join(unit.text for unit in units)
+    text = raw.strip()
+    char_start = units[0].start + (len(raw) - len(raw.lstrip()))
+    return {
+        "chunk_index": chunk_index,
+        "text": text,
+        "token_count": sum(unit.tokens for unit in units),
+        "page_start": units[0].page,
+        "page_end": units[-1].page,
+        "char_start": char_start,
+        "char_end": char_start + len(text),
+    }
+
+def iter_chunks(pages, max_tokens: int, overlap_tokens: int = 0, count_tokens=None):
+    """
+    Lazily splits document text into token-budgeted chunks in a single pass.
+
+    `pages` is an iterable of page texts (or a single string); empty pages are
+    skipped. Chunks end on sentence boundaries, preferring a paragraph break
+    once at least half the budget is filled, and the last sentences of each
+    chunk (up to `overlap_tokens`) are repeated at the start of the next one.
+
+    Each chunk is a dict with its text, token count, 1-based page span and
+    the [char_start, char_end) span within the pages joined by PAGE_SEPARATOR.
+    """
+    if isinstance(pages, str):
+        pages = [pages]
+    count_tokens = count_tokens or approximate_token_count
+
+    window = deque()
+    window_tokens = 0
+    chunk_index = 0
+
+    for unit in _iter_units(pages, count_tokens, max_tokens):
+        while window and window_tokens + unit.tokens > max_tokens:
+            # Cut at the last paragraph break past half the budget, else at the last sentence
+            cut = len(window)
+            running = 0
+            for i, candidate in enumerate(window):
+                running += candidate.tokens
+                if candidate.paragraph_end and running >= max_tokens // 2:
+                    cut = i + 1
+            emitted = [window.popleft() for _ in range(cut)]
+            chunk = _make_chunk(emitted, chunk_index)
+            if chunk["text"]:
+                yield chunk
+                chunk_index += 1
+
+            # Carry trailing sentences of the emitted chunk into the next one as overlap
+            overlap = []
+            overlap_total = 0
+            for candidate in reversed(emitted[1:]):
+                if overlap_total + candidate.tokens > overlap_tokens:
+                    break
+                overlap.append(candidate)
+                overlap_total += candidate.tokens
+            window_tokens = sum(candidate.tokens for candidate in window)
+            if overlap and window_tokens + overlap_total + unit.tokens <= max_tokens:
+                window.extendleft(overlap) # extendleft reverses, restoring document order
+                window_tokens += overlap_total
+
+        window.append(unit)
+        window_tokens += unit.tokens
+
+    if window:
+        chunk = _make_chunk(list(window), chunk_index)
+        if chunk["text"]:
+            yield chunk
@@ -0,0 +1,78 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+SQLITE_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def _is_sqlite_memory(url) -> bool:
+    return url.database in (None, '', ':memory:')
+
+def validate_engine_config(config):
+    """Raises ValueError for engine settings the database would reject or silently ignore."""
+    journal_mode = config['SQLITE_JOURNAL_MODE'].upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unsupported SQLITE_JOURNAL_MODE: {journal_mode}. Supported: {', '.join(SQLITE_JOURNAL_MODES)}.")
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"Unsupported SQLITE_SYNCHRONOUS: {synchronous}. Supported: {', '.join(SQLITE_SYNCHRONOUS_MODES)}.")
+    for key in ('SQLITE_MMAP_SIZE', 'SQLITE_CACHE_SIZE_KB', 'SQLITE_BUSY_TIMEOUT_MS', 'DB_POOL_SIZE', 'DB_MAX_OVERFLOW',
+                'DB_POOL_TIMEOUT_SECONDS', 'DB_POOL_RECYCLE_SECONDS', 'DB_STATEMENT_TIMEOUT_MS'):
+        if config[key] < 0:
+            raise ValueError(f"{key} must not be negative")
+    if config['DB_POOL_SIZE'] == 0:
+        raise ValueError("DB_POOL_SIZE must be at least 1")
+
+def engine_options(config) -> dict:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database. Every file/server
+    database gets a pool sized for the server's request threads; Postgres also
+    gets pre-ping, recycling and a server-side statement timeout, a SQLite file
+    the busy timeout (its pragmas are set per connection by `register_engine_events`).
+    In-memory SQLite keeps Flask-SQLAlchemy's single shared connection.
+    """
+    validate_engine_config(config)
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend == 'sqlite' and _is_sqlite_memory(url):
+        return {}
+
+    options = {
+        "pool_size": config['DB_POOL_SIZE'],
+        "max_overflow": config['DB_MAX_OVERFLOW'],
+        "pool_timeout": config['DB_POOL_TIMEOUT_SECONDS'],
+    }
+    if backend == 'sqlite':
+        # pysqlite's busy handler (seconds); busy_timeout in sqlite_pragmas sets the same limit
+        options["connect_args"] = {"timeout": config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}
+        return options
+
+    options["pool_recycle"] = config['DB_POOL_RECYCLE_SECONDS'] or -1
+    options["pool_pre_ping"] = config['DB_POOL_PRE_PING']
+    if backend == 'postgresql' and config['DB_STATEMENT_TIMEOUT_MS']:
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+def sqlite_pragmas(config) -> list[str]:
+    """Per-connection pragmas for a SQLite file database, in the order they are applied."""
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE'].upper()}", # WAL: readers no longer block the writer (or vice versa)
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS'].upper()}", # NORMAL is durable across app crashes in WAL mode; only an OS crash can lose the last commits
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}", # Wait for the write lock instead of failing with "database is locked"
+        f"PRAGMA cache_size=-{config['SQLITE_CACHE_SIZE_KB']}", # Negative = KiB rather than pages
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}",
+    ]
+
+def register_engine_events(engine, config):
+    """Applies `sqlite_pragmas` to every new connection of a SQLite file engine; no-op otherwise."""
+    if engine.dialect.name != 'sqlite' or _is_sqlite_memory(engine.url):
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
@@ -0,0 +1,279 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import Blueprint, Response, g, request
+
+# Seconds; spans cache hits (ms) to LLM calls and solver runs (tens of seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+FLUSH_SECONDS = 1.0 # How often a worker writes its values to METRICS_MULTIPROC_DIR
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values = {} # label values tuple -> count
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+    def samples(self, values: dict):
+        for labelvalues, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_number(value)}"
+
+class Histogram:
+    """Bucketed observations (plus their sum and count) per label combination."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # label values tuple -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value) # First bucket with upper bound >= value
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {labelvalues: list(values) for labelvalues, values in self._series.items()}
+
+    def reset(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def merge(values, other):
+        return [a + b for a, b in zip(values, other)]
+
+    def samples(self, series: dict):
+        for labelvalues, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                le = 'le="%s"' % ('+Inf' if bound == float('inf') else _format_number(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {repr(values[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class Registry:
+    """
+    The process's metrics. With a multiprocess directory set (gunicorn workers),
+    each process also writes its values to <dir>/<pid>.json every FLUSH_SECONDS
+    and at exit, and render() sums every file, so a scrape answered by any worker
+    covers all of them. Files of exited workers are kept, like prometheus_client's
+    multiprocess mode, so totals never go backwards when a worker is recycled;
+    serve.py empties the directory when the server starts.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self.multiprocess_dir = None
+        self._flusher_pid = None
+        self._flush_lock = threading.Lock()
+        self._last_flushed = None
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def _path(self, pid) -> str:
+        return os.path.join(self.multiprocess_dir, f"{pid}.json")
+
+    def start_flusher(self):
+        """Starts this process's flush thread once; cheap to call per request."""
+        if not self.multiprocess_dir or self._flusher_pid == os.getpid():
+            return
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_SECONDS)
+            try:
+                self.flush()
+            except OSError:
+                pass # Retried on the next tick
+
+    def flush(self):
+        """Writes this process's values to the multiprocess directory if they changed."""
+        if not self.multiprocess_dir or self._flusher_pid != os.getpid(): # Not e.g. a forked render pool process
+            return
+        with self._flush_lock:
+            data = json.dumps({metric.name: [[list(labelvalues), value] for labelvalues, value in metric.snapshot().items()]
+                               for metric in self._metrics})
+            if data == self._last_flushed:
+                return
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+            path = self._path(os.getpid())
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, path) # Scrapes never read a partial file
+            self._last_flushed = data
+
+    def _after_fork_in_child(self):
+        # Values observed by the master before the fork are its own (and in its own file)
+        for metric in self._metrics:
+            metric.reset()
+        self._flusher_pid = None
+        self._flush_lock = threading.Lock()
+        self._last_flushed = None
+
+    def _collect(self) -> dict:
+        """metric name -> {label values: value}, summed over every process when a multiprocess directory is set."""
+        collected = {metric.name: metric.snapshot() for metric in self._metrics}
+        if not self.multiprocess_dir:
+            return collected
+        merges = {metric.name: metric.merge for metric in self._metrics}
+        own_path = self._path(os.getpid())
+        for path in glob.glob(os.path.join(self.multiprocess_dir, '*.json')):
+            if path == own_path: # Live values are newer than the last flush
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue # Replaced or removed while listing
+            for name, rows in data.items():
+                if name not in collected:
+                    continue
+                values = collected[name]
+                for labelvalues, value in rows:
+                    labelvalues = tuple(labelvalues)
+                    values[labelvalues] = merges[name](values[labelvalues], value) if labelvalues in values else value
+        return collected
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        collected = self._collect()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(collected[metric.name]))
+        return "\n".join(lines) + "\n"
+
+def clear_multiprocess_dir(path: str):
+    """Removes metric files left by a previous server run; call before the workers start."""
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, '*.json')):
+        os.remove(stale)
+
+REGISTRY = Registry()
+os.register_at_fork(after_in_child=REGISTRY._after_fork_in_child)
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', "Request latency by route (blueprint endpoint), including streamed bodies.",
+    ('method', 'endpoint'),
+))
+REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', "Requests by route and status code.", ('method', 'endpoint', 'status'),
+))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    'http_request_errors_total', "Requests answered with a 5xx status, by route.", ('method', 'endpoint', 'status'),
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'app_stage_duration_seconds', "Time spent in a stage of request handling (embedding_encode, vector_search, "
+    "llm_call, solver_run, xai_persist, pdf_render).", ('stage',),
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    'app_stage_errors_total', "Stages that raised, by stage.", ('stage',),
+))
+
+@contextmanager
+def stage(name: str):
+    """Times a block as stage `name`; a block that raises is counted in app_stage_errors_total as well."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception: # Not GeneratorExit: a client leaving a stream early is not a failure
+        STAGE_ERRORS.inc(name)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - started, name)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint. Without METRICS_MULTIPROC_DIR values are per process: under gunicorn each scrape reads the worker that served it."""
+    return Response(REGISTRY.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+    REGISTRY.start_flusher()
+
+def _record(method, endpoint, status, started):
+    REQUEST_DURATION.observe(time.perf_counter() - started, method, endpoint)
+    REQUESTS.inc(method, endpoint, status)
+    if status >= 500:
+        REQUEST_ERRORS.inc(method, endpoint, status)
+
+def _record_response(response):
+    started = g.pop('_metrics_started', None)
+    if started is None: # A before_request hook ahead of ours answered the request
+        return response
+    # Unmatched URLs share one label, so scanners cannot create unbounded series
+    endpoint = request.endpoint or 'unmatched'
+    method, status = request.method, response.status_code
+    if response.is_streamed:
+        # SSE and zip downloads: measured until the body has been sent
+        response.call_on_close(lambda: _record(method, endpoint, status, started))
+    else:
+        _record(method, endpoint, status, started)
+    return response
+
+def init_metrics(app):
+    """Times every request and serves /metrics; a no-op when METRICS_ENABLED is off."""
+    if not app.config['METRICS_ENABLED']:
+        return
+    REGISTRY.multiprocess_dir = app.config['METRICS_MULTIPROC_DIR']
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_timer) # Ahead of other hooks, so they are timed too
+    app.after_request(_record_response)
+    app.register_blueprint(metrics_bp)
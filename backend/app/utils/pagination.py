@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, func, or_, select
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    payload = json.dumps([sort_value.isoformat() if sort_value else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError for cursors this module did not produce."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def like_pattern(text: str) -> str:
+    """Substring pattern for `ilike`; LIKE wildcards in `text` are backslash-escaped (pass escape='\\')."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+def get_page_limit(args) -> int:
+    """`limit` query parameter, defaulting to PAGE_SIZE_DEFAULT and capped at PAGE_SIZE_MAX."""
+    limit = args.get('limit', type=int) or current_app.config['PAGE_SIZE_DEFAULT']
+    return max(1, min(limit, current_app.config['PAGE_SIZE_MAX']))
+
+def keyset_paginate(query, model, sort_column, cursor: str, limit: int):
+    """
+    Applies a newest-first keyset page on (sort_column, id) to `query`.
+    Returns (rows, next cursor or None); rows must expose `sort_column.key` and `id`.
+
+    The cursor row's own sort value is compared column-to-column (falling back to
+    the value in the cursor if the row is gone), so stored timestamps in any
+    format, e.g. SQLite's CURRENT_TIMESTAMP strings, compare consistently.
+    """
+    if cursor:
+        cursor_value, cursor_id = decode_cursor(cursor)
+        anchor = func.coalesce(select(sort_column).where(model.id == cursor_id).scalar_subquery(), cursor_value)
+        query = query.filter(or_(sort_column < anchor, and_(sort_column == anchor, model.id < cursor_id)))
+
+    rows = query.order_by(sort_column.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
+    return rows, next_cursor
@@ -1,43 +1,99 @@
-import fitz # PyMuPDF for better text extraction and metadata
 import io
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from app.utils.chunker import iter_chunks
 
-def extract_text_from_pdf(filepath):
+# PyMuPDF (fitz) is imported inside the functions that open PDFs; it is only needed for uploads
+
+# Number of leading pages scanned for title/date/department when streaming
+METADATA_SCAN_PAGES = 3
+
+def _page_text(page):
+    """Extracts the text of a single page, one entry per text block joined by blank lines."""
+    blocks = []
+    for block in page.get_text("dict")["blocks"]:
+        if block['type'] == 0: # This is a text block
+            lines = []
+            for line in block["lines"]:
+                lines.append(" ".join(span["text"] for span in line["spans"]))
+            block_text = " \n".join(lines).strip()
+            if block_text:
+                blocks.append(block_text)
+    return "\n\n".join(blocks)
+
+def _extract_page_range(filepath, start, stop):
+    """Worker entry point: extracts pages [start, stop) of a PDF in a separate process."""
+    import fitz
+    with fitz.open(filepath) as doc:
+        return [_page_text(doc[page_num]) for page_num in range(start, stop)]
+
+def iter_pdf_pages(filepath, workers=0, pages_per_task=25, parallel_min_pages=200, metadata=None):
     """
-    Extracts text, basic structure, and common metadata from a PDF file.
-    Uses PyMuPDF (fitz) for robust extraction.
+    Yields the text of each page of a PDF, in page order, without ever
+    holding the whole document text in memory.
+
+    When `workers` > 1 and the PDF has at least `parallel_min_pages` pages,
+    page ranges of `pages_per_task` pages are extracted in worker processes.
+    A `metadata` dict is filled with the PDF's embedded metadata while the file is open.
     """
-    text_content = ""
-    metadata = {}
-    try:
-        with fitz.open(filepath) as doc:
-            metadata = doc.metadata or {}
-            full_text_blocks = []
-            for page_num, page in enumerate(doc):
-                # Extract text blocks with their coordinates to infer structure
-                text_blocks = page.get_text("dict")["blocks"]
-                for block in text_blocks:
-                    if block['type'] == 0: # This is a text block
-                        block_text = ""
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                block_text += span["text"] + " "
-                            block_text += "\n" # Newline after each line in a block
-                        full_text_blocks.append(block_text.strip())
+    import fitz
+    with fitz.open(filepath) as doc:
+        if metadata is not None:
+            metadata.update(doc.metadata or {})
+        page_count = doc.page_count
+        if workers <= 1 or page_count < parallel_min_pages:
+            for page in doc:
+                yield _page_text(page)
+            return
 
-            text_content = "\n\n".join(full_text_blocks) # Join blocks with double newlines
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() returns results in submission order, so pages stay ordered
+        results = executor.map(_extract_page_range, [filepath] * len(ranges), *zip(*ranges))
+        for page_texts in results:
+            yield from page_texts
 
-            # Further basic metadata extraction from text
-            metadata['extracted_title'] = _extract_title_from_text(text_content)
-            metadata['extracted_date'] = _extract_date_from_text(text_content)
-            metadata['extracted_department'] = _extract_department_from_text(text_content)
+def extract_pdf_metadata(filepath, leading_text=None):
+    """
+    Returns the PDF's embedded metadata plus title/date/department guessed
+    from `leading_text` (the first few pages) rather than the whole document.
+    """
+    import fitz
+    with fitz.open(filepath) as doc:
+        metadata = dict(doc.metadata or {})
+        if leading_text is None:
+            leading_text = "\n\n".join(_page_text(doc[i]) for i in range(min(METADATA_SCAN_PAGES, doc.page_count)))
+    return _add_extracted_metadata(metadata, leading_text)
+
+def _add_extracted_metadata(metadata, leading_text):
+    metadata['extracted_title'] = _extract_title_from_text(leading_text)
+    metadata['extracted_date'] = _extract_date_from_text(leading_text)
+    metadata['extracted_department'] = _extract_department_from_text(leading_text)
+    return metadata
 
-        return text_content, metadata
+def extract_text_from_pdf(filepath, workers=0):
+    """
+    Extracts text, basic structure, and common metadata from a PDF file.
+    Uses PyMuPDF (fitz) for robust extraction; the file is opened once.
+    """
+    try:
+        metadata = {}
+        page_texts = [text for text in iter_pdf_pages(filepath, workers=workers, metadata=metadata) if text]
+        text_content = "\n\n".join(page_texts) # Join blocks with double newlines
+        return text_content, _add_extracted_metadata(metadata, "\n\n".join(page_texts[:METADATA_SCAN_PAGES]))
     except Exception as e:
         print(f"Error extracting text from PDF {filepath}: {e}")
         return "", {}
 
+def iter_pdf_chunks(filepath, max_tokens, overlap_tokens, count_tokens=None, workers=0):
+    """
+    Streams a PDF straight into the chunker: pages are extracted lazily and
+    token-budgeted chunks (with page and character offsets) are yielded as
+    soon as enough text is buffered.
+    """
+    yield from iter_chunks(iter_pdf_pages(filepath, workers=workers), max_tokens, overlap_tokens, count_tokens)
+
 def _extract_title_from_text(text):
     """Simple logic to guess title from the first few lines."""
     lines = text.strip().split('\n')
@@ -78,48 +134,3 @@ def _extract_department_from_text(text):
             # Basic capitalization
             return ' '.join([word.capitalize() for word in dept.split() if word.lower() not in ['of', 'and']])
     return None
-
-def chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> list[str]:
-    """
-    Splits text into chunks with a specified size and overlap.
-    Aims to split at natural sentence or paragraph breaks where possible.
-    """
-    if len(text) <= chunk_size:
-        return [text]
-
-    chunks = []
-    current_position = 0
-
-    while current_position < len(text):
-        end_position = min(current_position + chunk_size, len(text))
-        chunk = text[current_position:end_position]
-
-        # Try to find a natural break point (end of sentence/paragraph)
-        if end_position < len(text):
-            # Prioritize splitting by double newline (paragraph)
-            last_double_newline = chunk.rfind('\n\n')
-            if last_double_newline != -1 and last_double_newline > chunk_size * 0.7: # Ensure chunk is substantial
-                chunk = chunk[:last_double_newline].strip()
-                next_start = current_position + last_double_newline + 2 # +2 for '\n\n'
-            else:
-                # Fallback to single newline or period
-                last_newline = chunk.rfind('\n')
-                last_period = chunk.rfind('.')
-                if last_period != -1 and last_period > chunk_size * 0.8:
-                    chunk = chunk[:last_period + 1].strip()
-                    next_start = current_position + last_period + 1
-                elif last_newline != -1 and last_newline > chunk_size * 0.8:
-                    chunk = chunk[:last_newline].strip()
-                    next_start = current_position + last_newline + 1
-                else:
-                    # If no good natural break, just split
-                    next_start = current_position + chunk_size
-        else:
-            next_start = end_position
-
-        chunks.append(chunk.strip())
-        current_position = next_start - chunk_overlap
-        if current_position < 0: # Ensure we don't go before start of text
-            current_position = 0
-
-    return [c for c in chunks if c] # Filter out empty chunks
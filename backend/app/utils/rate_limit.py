@@ -0,0 +1,44 @@
+import time
+from app import db
+from app.models import LoginFailure
+
+PRUNE_EVERY = 100 # Failures a process records between deletions of expired rows
+MAX_KEY_LENGTH = 255
+
+class FailureRateLimiter:
+    """
+    Sliding-window counter of failures per key (e.g. "user:alice", "ip:10.0.0.7"),
+    kept in the login_failures table so every worker process enforces the same
+    limits. A key is blocked once it has `max_failures` failures within
+    `window_seconds`; it unblocks as old failures age out of the window.
+    """
+
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+        self._recorded = 0 # Since the last prune, in this process
+
+    def retry_after(self, limits: dict) -> int:
+        """Seconds until every key in {key: max_failures} is under its limit; 0 if none is blocked."""
+        now = time.time()
+        wait = 0.0
+        for key, max_failures in limits.items():
+            # Unblocked once the max_failures-th most recent failure leaves the window
+            oldest_relevant = db.session.query(LoginFailure.failed_at).filter(
+                LoginFailure.key == key[:MAX_KEY_LENGTH], LoginFailure.failed_at > now - self.window_seconds
+            ).order_by(LoginFailure.failed_at.desc()).offset(max_failures - 1).limit(1).scalar()
+            if oldest_relevant is not None:
+                wait = max(wait, oldest_relevant + self.window_seconds - now)
+        return int(wait) + 1 if wait > 0 else 0
+
+    def record_failure(self, keys):
+        now = time.time()
+        db.session.add_all([LoginFailure(key=key[:MAX_KEY_LENGTH], failed_at=now) for key in keys])
+        self._recorded += 1
+        if self._recorded >= PRUNE_EVERY:
+            self._recorded = 0
+            LoginFailure.query.filter(LoginFailure.failed_at <= now - self.window_seconds).delete(synchronize_session=False)
+        db.session.commit()
+
+    def reset(self, key):
+        LoginFailure.query.filter(LoginFailure.key == key[:MAX_KEY_LENGTH]).delete(synchronize_session=False)
+        db.session.commit()
@@ -0,0 +1,49 @@
+import hashlib
+from flask import Request
+from werkzeug.formparser import default_stream_factory
+
+class HashingStream:
+    """
+    File-like container for an uploaded file that computes the SHA-256 of the
+    raw bytes as Werkzeug writes them while the request body is being received.
+    Everything other than `write` is delegated to the underlying spooled file.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self._sha256.update(data)
+        return self._stream.write(data)
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+    def __iter__(self):
+        return iter(self._stream)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class HashingRequest(Request):
+    """Request class whose uploaded files expose the raw-bytes hash via `file.stream.hexdigest()`."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingStream(default_stream_factory(
+            total_content_length=total_content_length,
+            content_type=content_type,
+            filename=filename,
+            content_length=content_length,
+        ))
+
+def raw_upload_hash(file_storage):
+    """Returns the SHA-256 of an uploaded file's raw bytes, hashing the stream only if it was not hashed on receipt."""
+    stream = file_storage.stream
+    if isinstance(stream, HashingStream):
+        return stream.hexdigest()
+    sha256 = hashlib.sha256()
+    for block in iter(lambda: stream.read(64 * 1024), b''):
+        sha256.update(block)
+    stream.seek(0)
+    return sha256.hexdigest()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+"""Audit the query plans of the SQL the API routes issue.
+
+Seeds a throwaway SQLite database with seed_large.py (or uses --database-url,
+already seeded with it), calls the API routes through the test client while
+recording every SELECT/UPDATE/DELETE they execute, then runs EXPLAIN QUERY
+PLAN (SQLite) or EXPLAIN (Postgres) on each distinct statement with the
+parameters it ran with.
+
+Fails (exit status 1) when a statement does a full table scan of a table
+holding more than --max-scan-rows rows. Full index scans (SQLite "SCAN ...
+USING INDEX") are listed but do not fail the audit, since with an ORDER BY
+and LIMIT they stop after the first rows. Statements the database cannot
+explain (pgvector searches on SQLite, where the route falls back to another
+query) are skipped and listed with the reason.
+
+Usage: python audit_query_plans.py [--scale 0.1] [--max-scan-rows 1000] [--database-url URL] [--verbose]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+
+from seed_large import LOAD_TEST_PASSWORD, scaled_counts, seed_database
+
+CAPTURED_PREFIXES = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+SQL_KEYWORDS = {'WHERE', 'ON', 'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'USING', 'ORDER', 'GROUP',
+                'LIMIT', 'SET', 'AND', 'OR', 'NATURAL', 'FULL', 'HAVING', 'UNION', 'OFFSET'}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=0.1, help="seed_large.py scale of the throwaway database")
+    parser.add_argument('--max-scan-rows', type=int, default=1000, help="Largest table a full scan is tolerated on")
+    parser.add_argument('--database-url', help="Audit an existing database instead of a seeded throwaway SQLite file")
+    parser.add_argument('--verbose', action='store_true', help="Print the plan of every statement")
+    return parser.parse_args()
+
+def exercise_routes(app, client, record):
+    """Calls each API route with realistic arguments; `record(label)` tags the SQL that follows."""
+    from app.models import GeneratedDocument, TimetableDraft, Embedding, User
+
+    def call(label, method, path, **kwargs):
+        record(label)
+        response = client.open(path, method=method, **kwargs)
+        if response.status_code >= 400:
+            print(f"  note: {label} answered {response.status_code}")
+        return response
+
+    login = call('POST /api/login', 'POST', '/api/login', json={"username": 'loadtest1', "password": LOAD_TEST_PASSWORD}).json
+    headers = {"Authorization": f"Bearer {login['access_token']}"}
+    call('POST /api/refresh', 'POST', '/api/refresh', headers={"Authorization": f"Bearer {login['refresh_token']}"})
+    call('GET /api/protected', 'GET', '/api/protected', headers=headers)
+
+    record(None)
+    with app.app_context():
+        user_id = User.query.filter_by(username='loadtest1').first().id
+        document_ids = [row.id for row in GeneratedDocument.query.with_entities(GeneratedDocument.id)
+                        .filter_by(generated_by=user_id).order_by(GeneratedDocument.id.desc()).limit(5)]
+        draft_id = TimetableDraft.query.with_entities(TimetableDraft.id).filter_by(generated_by=user_id).order_by(TimetableDraft.id.desc()).first().id
+        chunk_ids = [row.id for row in Embedding.query.with_entities(Embedding.id).order_by(Embedding.id.desc()).limit(5)]
+
+    page = call('GET /api/documents/history', 'GET', '/api/documents/history', headers=headers).json
+    call('GET /api/documents/history (next page)', 'GET', '/api/documents/history', headers=headers, query_string={"cursor": page['next_cursor']})
+    call('GET /api/documents/history?document_type', 'GET', '/api/documents/history', headers=headers, query_string={"document_type": 'notice'})
+    call('GET /api/documents/history?status', 'GET', '/api/documents/history', headers=headers, query_string={"status": 'draft'})
+    call('GET /api/documents/history?q', 'GET', '/api/documents/history', headers=headers, query_string={"q": 'seminar'})
+    call('GET /api/documents/<id>', 'GET', f'/api/documents/{document_ids[0]}', headers=headers)
+    call('GET /api/documents/<id>/pdf', 'GET', f'/api/documents/{document_ids[0]}/pdf', headers=headers)
+    call('POST /api/generate-document', 'POST', '/api/generate-document', headers=headers,
+         json={"document_type": 'circular', "inputs": {"title": 'Audit', "department": 'CSE'}})
+
+    call('GET /api/timetable/configs', 'GET', '/api/timetable/configs', headers=headers)
+    page = call('GET /api/timetable/drafts', 'GET', '/api/timetable/drafts', headers=headers).json
+    call('GET /api/timetable/drafts (next page)', 'GET', '/api/timetable/drafts', headers=headers, query_string={"cursor": page['next_cursor']})
+    call('GET /api/timetable/drafts?status', 'GET', '/api/timetable/drafts', headers=headers, query_string={"status": 'draft'})
+    call('GET /api/timetable/drafts?q', 'GET', '/api/timetable/drafts', headers=headers, query_string={"q": 'Config 1'})
+    call('GET /api/timetable/drafts/<id>', 'GET', f'/api/timetable/drafts/{draft_id}', headers=headers)
+    call('PUT /api/timetable/drafts/<id>', 'PUT', f'/api/timetable/drafts/{draft_id}', headers=headers, json={"status": 'validated'})
+    call('GET /api/timetable/drafts/<id>/render', 'GET', f'/api/timetable/drafts/{draft_id}/render', headers=headers,
+         query_string={"view": 'section', "format": 'pdf'})
+
+    call('GET /api/search', 'GET', '/api/search', headers=headers, query_string={"q": 'holiday seminar', "scope": 'all'})
+    call('GET /api/search?scope=generated', 'GET', '/api/search', headers=headers, query_string={"q": 'exam', "scope": 'generated'})
+
+    export = call('POST /api/exports', 'POST', '/api/exports', headers=headers, json={"document_ids": document_ids, "timetable_draft_id": draft_id}).json
+    call('GET /api/exports/<id>', 'GET', f"/api/exports/{export['job_id']}", headers=headers)
+    call('GET /api/exports/<id>/download', 'GET', f"/api/exports/{export['job_id']}/download", headers=headers).get_data()
+
+    call('POST /api/rag/chunks', 'POST', '/api/rag/chunks', headers=headers, json={"ids": chunk_ids})
+    call('GET /api/rag/reembed/status', 'GET', '/api/rag/reembed/status', headers=headers)
+    call('GET /readyz', 'GET', '/readyz')
+    record(None)
+
+def unexplainable(statement: str, dialect: str):
+    """Why the dialect cannot explain a statement the routes tried (and fell back from), or None."""
+    if dialect == 'sqlite' and ('<->' in statement or re.search(r'AS\s+vector\b', statement, re.IGNORECASE)):
+        return "pgvector similarity search; SQLite runs the fallback query instead"
+    return None
+
+def table_aliases(statement: str) -> dict:
+    """alias (or bare table name) -> table name, for the FROM/JOIN/UPDATE/INTO clauses of a statement."""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+"?(\w+)"?(?:\s+(?:AS\s+)?"?(\w+)"?)?', statement, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+def sqlite_plan(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    aliases = table_aliases(statement)
+    lines, scans = [], []
+    for row in rows:
+        detail = row[-1]
+        lines.append(detail)
+        match = re.match(r'SCAN (\w+)(.*)$', detail)
+        if match and 'VIRTUAL TABLE' not in match.group(2):
+            table = aliases.get(match.group(1))
+            if table:
+                scans.append((table, 'index scan' if 'USING' in match.group(2) else 'full scan'))
+    return lines, scans
+
+def postgres_plan(connection, statement, parameters):
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    lines, scans = [], []
+
+    def walk(node, depth=0):
+        relation = node.get('Relation Name')
+        lines.append(f"{'  ' * depth}{node['Node Type']}{f' on {relation}' if relation else ''}")
+        if node['Node Type'] == 'Seq Scan' and relation:
+            scans.append((relation, 'full scan'))
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan[0]['Plan'])
+    return lines, scans
+
+def main():
+    args = parse_args()
+    folder = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        folder = tempfile.TemporaryDirectory(prefix='audit_db_')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(folder.name, 'audit.db')}"
+    os.environ.setdefault('BCRYPT_ROUNDS', '4')
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+    os.environ.setdefault('EXPORT_RENDER_WORKERS', '0')
+    os.environ.setdefault('PDF_CACHE_FOLDER', os.path.join(tempfile.gettempdir(), 'audit_pdf_cache'))
+
+    from sqlalchemy import event, func, select, text
+    from app import create_app, db, init_db
+    from app.models import User
+
+    app = create_app()
+    app.logger.setLevel('CRITICAL') # Failing routes are reported as notes; their tracebacks are noise here
+    with app.app_context():
+        init_db()
+        if not args.database_url:
+            print(f"Seeding (scale {args.scale})...")
+            seed_database(scaled_counts(args.scale), embedding_dim=16, log=lambda message: None)
+        elif not User.query.filter_by(username='loadtest1').first():
+            sys.exit("The database has no loadtest users; seed it with seed_large.py or omit --database-url")
+        db.session.execute(text("ANALYZE")) # Give the planner real statistics
+        db.session.commit()
+        row_counts = {table.name: db.session.execute(select(func.count()).select_from(table)).scalar() for table in db.metadata.sorted_tables}
+        engine = db.engine
+        dialect = engine.dialect.name
+
+    captured = {} # statement -> (parameters, set of route labels)
+    current = {"label": None}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        label = current["label"]
+        if label is None or executemany or not statement.lstrip().upper().startswith(CAPTURED_PREFIXES):
+            return
+        entry = captured.setdefault(statement, (parameters, set()))
+        entry[1].add(label)
+
+    print("Calling the API routes...")
+    exercise_routes(app, app.test_client(), lambda label: current.__setitem__("label", label))
+    event.remove(engine, 'before_cursor_execute', capture)
+
+    explain = sqlite_plan if dialect == 'sqlite' else postgres_plan
+    failures, index_scans, skipped = [], [], []
+    with engine.connect() as connection:
+        for statement, (parameters, labels) in captured.items():
+            reason = unexplainable(statement, dialect)
+            if reason:
+                skipped.append((labels, reason))
+                continue
+            try:
+                lines, scans = explain(connection, statement, parameters)
+            except Exception as e:
+                print(f"  could not explain a statement from {', '.join(sorted(labels))}: {e}")
+                continue
+            for table, kind in scans:
+                rows = row_counts.get(table, 0)
+                if kind == 'full scan' and rows > args.max_scan_rows:
+                    failures.append((labels, table, rows, statement, lines))
+                elif kind == 'index scan':
+                    index_scans.append((labels, table, rows))
+            if args.verbose:
+                print(f"\n[{', '.join(sorted(labels))}]\n{' '.join(statement.split())}")
+                for line in lines:
+                    print(f"    {line}")
+
+    print(f"\nTable sizes: {', '.join(f'{table}={rows}' for table, rows in sorted(row_counts.items()))}")
+    print(f"Explained {len(captured)} distinct statements from {len({l for _, ls in captured.values() for l in ls})} route calls.")
+    by_table = defaultdict(set)
+    for labels, table, rows in index_scans:
+        by_table[(table, rows)].update(labels)
+    for (table, rows), labels in sorted(by_table.items()):
+        print(f"  index scan of {table} ({rows} rows): {', '.join(sorted(labels))}")
+    for labels, reason in skipped:
+        print(f"  skipped a statement from {', '.join(sorted(labels))}: {reason}")
+
+    if failures:
+        print(f"\nFAIL: {len(failures)} statement(s) scan a table above {args.max_scan_rows} rows:")
+        for labels, table, rows, statement, lines in failures:
+            print(f"\n  {table} ({rows} rows) from {', '.join(sorted(labels))}\n  {' '.join(statement.split())[:400]}")
+            for line in lines:
+                print(f"      {line}")
+        sys.exit(1)
+    print(f"\nOK: no full table scans above {args.max_scan_rows} rows.")
+
+if __name__ == '__main__':
+    main()
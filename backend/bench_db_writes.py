@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""Benchmark concurrent writes against a SQLite file with and without the engine tuning.
+
+Writer threads insert XaiLog and GeneratedDocument rows (one commit per row, as
+the timetable and generation routes do) while reader threads page through
+document history. "default" is a plain create_engine() (rollback journal,
+synchronous=FULL); "tuned" uses engine_options() and the per-connection pragmas
+from app/utils/db_engine.py with the current SQLITE_* / DB_* settings.
+
+Usage: python bench_db_writes.py [--writers 8] [--readers 4] [--rows 200]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+from app import db
+from app.config import Config
+from app.models import GeneratedDocument, User, XaiLog
+from app.utils.db_engine import engine_options, register_engine_events
+
+def make_engine(url, tuned):
+    if not tuned:
+        return create_engine(url)
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config['SQLALCHEMY_DATABASE_URI'] = url
+    engine = create_engine(url, **engine_options(config))
+    register_engine_events(engine, config)
+    return engine
+
+def run(url, tuned, writers, readers, rows):
+    engine = make_engine(url, tuned)
+    db.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    with Session() as session:
+        user = User(username=f"bench-{tuned}", password_hash='-', email=f"bench-{tuned}@example.com")
+        session.add(user)
+        session.commit()
+        user_id = user.id
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_reading = threading.Event()
+
+    def write(worker):
+        for n in range(rows):
+            started = time.perf_counter()
+            try:
+                with Session() as session:
+                    if n % 2:
+                        session.add(XaiLog(log_type='bench', rule_name='bench', explanation=f"writer {worker} row {n}", slot_details={"n": n}))
+                    else:
+                        session.add(GeneratedDocument(title=f"Bench {worker}-{n}", document_type='circular', generated_by=user_id, content='x' * 2000))
+                    session.commit()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+            except OperationalError as e:
+                with lock:
+                    errors.append(str(e.orig))
+            except PoolTimeoutError:
+                with lock:
+                    errors.append("connection pool exhausted")
+
+    def read():
+        while not stop_reading.is_set():
+            try:
+                with Session() as session:
+                    session.execute(
+                        select(GeneratedDocument.id, GeneratedDocument.title)
+                        .where(GeneratedDocument.generated_by == user_id)
+                        .order_by(GeneratedDocument.generation_date.desc()).limit(50)
+                    ).all()
+            except OperationalError as e:
+                with lock:
+                    errors.append(str(e.orig))
+            except PoolTimeoutError:
+                with lock:
+                    errors.append("connection pool exhausted")
+
+    reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop_reading.set()
+    for thread in reader_threads:
+        thread.join()
+    engine.dispose()
+    return elapsed, latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=200, help="Rows committed per writer")
+    args = parser.parse_args()
+
+    total = args.writers * args.rows
+    print(f"{args.writers} writers x {args.rows} rows, {args.readers} readers")
+    for label, tuned in (('default', False), ('tuned', True)):
+        with tempfile.TemporaryDirectory(prefix='bench_db_') as folder:
+            url = f"sqlite:///{os.path.join(folder, 'bench.db')}"
+            elapsed, latencies, errors = run(url, tuned, args.writers, args.readers, args.rows)
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) >= 20 else float('nan')
+        print(f"{label:8s} {len(latencies) / elapsed:8.0f} commits/s  p95 {p95:7.1f} ms  "
+              f"{len(latencies)}/{total} written  {len(errors)} errors")
+        for message in sorted(set(errors))[:3]:
+            print(f"         e.g. {message}")
+
+if __name__ == '__main__':
+    main()
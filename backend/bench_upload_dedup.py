@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""Benchmark the cost of re-uploading a PDF that is already in the knowledge base.
+
+"before" replays the old duplicate path (save to disk, full PyMuPDF extraction,
+hash the parsed text, look it up); "after" posts the same file to /api/upload-pdf,
+which now rejects it on the raw-bytes hash before writing or parsing anything.
+
+Usage: python bench_upload_dedup.py [--pages 300] [--runs 5]
+"""
+import argparse
+import hashlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+# Use a throwaway in-memory database and upload folder
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import fitz
+from flask_jwt_extended import create_access_token
+from app import create_app, db, init_db
+from app.models import UploadedDocument, User
+from app.services.user_identity import token_claims
+from app.utils.pdf_extractor import extract_text_from_pdf
+
+def build_pdf(path, pages):
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        lines = [f"Department of Examinations - Circular page {page_num + 1}"]
+        lines += [f"Line {i}: students must report to the examination hall by 09:00 on March 3, 2025." for i in range(40)]
+        page.insert_text((36, 36), "\n".join(lines), fontsize=8)
+    doc.save(path)
+
+def legacy_duplicate_upload(app, pdf_bytes):
+    """The pre-change duplicate path: write the file, parse it, hash the text, find the duplicate, delete the file."""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], 'bench_legacy_duplicate.pdf')
+    with open(filepath, 'wb') as f:
+        f.write(pdf_bytes)
+    parsed_text, _ = extract_text_from_pdf(filepath)
+    content_hash = hashlib.sha256(parsed_text.encode('utf-8')).hexdigest()
+    existing_doc = UploadedDocument.query.filter_by(original_content_hash=content_hash).first()
+    os.remove(filepath)
+    assert existing_doc is not None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp(prefix='bench_uploads_')
+    client = app.test_client()
+    with app.app_context():
+        init_db()
+        user = User(username='bench', password_hash='-', email='bench@example.com')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(user.id), additional_claims=token_claims(user))}"}
+
+    pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], 'source.pdf')
+    build_pdf(pdf_path, args.pages)
+    with open(pdf_path, 'rb') as f:
+        pdf_bytes = f.read()
+
+    def upload():
+        return client.post(
+            '/api/upload-pdf',
+            data={'pdf_file': (io.BytesIO(pdf_bytes), 'circular.pdf')},
+            headers=headers,
+            content_type='multipart/form-data',
+        )
+
+    first = upload()
+    assert first.status_code == 201, first.get_json()
+
+    before, after = [], []
+    for _ in range(args.runs):
+        with app.app_context():
+            start = time.perf_counter()
+            legacy_duplicate_upload(app, pdf_bytes)
+            before.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = upload()
+        after.append(time.perf_counter() - start)
+        assert response.get_json().get('status') == 'duplicate', response.get_json()
+
+    print(f"PDF: {args.pages} pages, {len(pdf_bytes) / 1024:.0f} KiB, {args.runs} runs")
+    print(f"before (parse then content hash): median {statistics.median(before) * 1000:8.1f} ms")
+    print(f"after  (raw hash on receipt):     median {statistics.median(after) * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""Check the LLM provider layer against the local mock LLM server.
+
+Starts mock_llm_server.py in-process and drives an OpenAIProvider at it:
+sequential calls must reuse one keep-alive connection, concurrent calls must
+never exceed LLM_MAX_CONCURRENCY at the server, a call that finds every slot
+busy must raise LLMBusyError, and a server slower than the timeout must fail
+the call instead of hanging it. Exits with status 1 if any check fails.
+
+Usage: python check_llm_provider.py [--concurrency 4] [--calls 12] [--latency 0.2]
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.llm_provider import LLMBusyError, LLMProvider, OpenAIProvider
+from mock_llm_server import MockLLMHandler, make_server
+
+def make_provider(base_url, timeout, max_concurrency):
+    return OpenAIProvider('gpt-mock', 'mock', base_url=base_url, timeout=timeout,
+                          max_concurrency=max_concurrency, max_retries=0)
+
+def set_server(latency=0.0, token_delay=0.0):
+    MockLLMHandler.latency = latency
+    MockLLMHandler.token_delay = token_delay
+    MockLLMHandler.max_in_flight = 0
+
+def check_abstract(base_url, args):
+    try:
+        LLMProvider('gpt-mock', 'mock')
+    except TypeError:
+        return None
+    return "LLMProvider can be instantiated without _complete/_stream"
+
+def check_connection_reuse(base_url, args):
+    set_server()
+    provider = make_provider(base_url, timeout=5, max_concurrency=args.concurrency)
+    connections = MockLLMHandler.connection_count
+    for _ in range(args.calls):
+        provider.complete("system", "prompt", max_tokens=20)
+    for _ in range(3):
+        "".join(provider.stream("system", "prompt", max_tokens=20))
+    opened = MockLLMHandler.connection_count - connections
+    if opened != 1:
+        return f"{args.calls + 3} sequential calls opened {opened} connections, expected 1"
+    return None
+
+def check_concurrency(base_url, args):
+    set_server(latency=args.latency)
+    provider = make_provider(base_url, timeout=args.latency * args.calls + 5, max_concurrency=args.concurrency)
+    connections = MockLLMHandler.connection_count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.calls) as pool:
+        results = list(pool.map(lambda _: provider.complete("system", "prompt", max_tokens=20), range(args.calls)))
+    elapsed = time.perf_counter() - started
+    opened = MockLLMHandler.connection_count - connections
+    waves = -(-args.calls // args.concurrency)
+    print(f"    {args.calls} calls in {elapsed:.2f}s, server saw at most {MockLLMHandler.max_in_flight} at once over {opened} connections")
+    if not all(results):
+        return "some concurrent calls returned no text"
+    if MockLLMHandler.max_in_flight > args.concurrency:
+        return f"server saw {MockLLMHandler.max_in_flight} requests at once, limit is {args.concurrency}"
+    if opened > args.concurrency:
+        return f"{opened} connections opened, pool limit is {args.concurrency}"
+    if elapsed < waves * args.latency * 0.9:
+        return f"finished in {elapsed:.2f}s, faster than {waves} waves of {args.latency}s allow"
+    return None
+
+def check_busy(base_url, args):
+    set_server(token_delay=0.05)
+    provider = make_provider(base_url, timeout=0.5, max_concurrency=1)
+    holder = provider.stream("system", "prompt", max_tokens=60) # Holds the only slot until closed
+    next(holder)
+    started = time.perf_counter()
+    try:
+        provider.complete("system", "prompt", max_tokens=20)
+    except LLMBusyError:
+        waited = time.perf_counter() - started
+        if not 0.4 <= waited < 2:
+            return f"LLMBusyError after {waited:.2f}s, expected about the 0.5s timeout"
+    else:
+        return "a call with every slot busy did not raise LLMBusyError"
+    finally:
+        holder.close()
+    set_server()
+    provider.complete("system", "prompt", max_tokens=20) # The slot was released by close()
+    return None
+
+def check_timeout(base_url, args):
+    set_server(latency=1.5)
+    provider = make_provider(base_url, timeout=0.5, max_concurrency=1)
+    started = time.perf_counter()
+    try:
+        provider.complete("system", "prompt", max_tokens=20)
+    except LLMBusyError:
+        return "timed out waiting for a slot instead of for the server"
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        if elapsed >= 1.5:
+            return f"{type(e).__name__} only after {elapsed:.2f}s, the server's full latency"
+    else:
+        return "a call to a server slower than the timeout succeeded"
+    set_server()
+    provider.complete("system", "prompt", max_tokens=20) # The slot was released after the timeout
+    return None
+
+CHECKS = [
+    ("LLMProvider is abstract", check_abstract),
+    ("keep-alive connection reuse", check_connection_reuse),
+    ("concurrency limit", check_concurrency),
+    ("LLMBusyError when every slot is busy", check_busy),
+    ("request timeout", check_timeout),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=4, help="LLM_MAX_CONCURRENCY of the provider under test")
+    parser.add_argument('--calls', type=int, default=12, help="Calls per check")
+    parser.add_argument('--latency', type=float, default=0.2, help="Mock server latency in the concurrency check")
+    args = parser.parse_args()
+
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    print(f"[*] Mock LLM server on {base_url}")
+
+    failures = 0
+    for name, check in CHECKS:
+        try:
+            problem = check(base_url, args)
+        except Exception as e:
+            problem = f"{type(e).__name__}: {e}"
+        if problem:
+            failures += 1
+            print(f"[!] {name}: {problem}")
+        else:
+            print(f"[*] {name}: ok")
+    server.shutdown()
+    print(f"[*] {len(CHECKS) - failures}/{len(CHECKS)} checks passed")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
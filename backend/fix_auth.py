@@ -6,12 +6,13 @@ import sys
 os.environ['FLASK_APP'] = 'wsgi.py'
 
 try:
-    from app import create_app, db
+    from app import create_app, db, init_db
     from app.models import User, set_password
     
     app = create_app()
     
     with app.app_context():
+        init_db()
         # Delete existing admin user if it exists
         existing_admin = User.query.filter_by(username='admin').first()
         if existing_admin:
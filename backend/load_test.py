@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+"""Load test the API with a realistic mix of concurrent admin traffic.
+
+Virtual users log in as the seed_large.py users (loadtest1..N) and loop over
+a weighted mix of login, document history, document generation, RAG search,
+full-text search, PDF upload, timetable generation and draft browsing for
+--duration seconds. Reports p50/p95/p99 latency, throughput and error rate per
+endpoint, and writes them as JSON (--output) so runs can be compared across
+commits (--compare an earlier result file).
+
+An in-process mock LLM server (mock_llm_server.py) stands in for the provider.
+Without --url the harness also starts the API itself with serve.py, pointed at
+the mock, on the database in DATABASE_URL. With --url, start the server with
+LLM_PROVIDER=openai LLM_API_KEY=mock LLM_BASE_URL=http://127.0.0.1:<--llm-port>/v1.
+Either way the database must be seeded: python seed_large.py [--scale 0.1]
+
+Usage: python load_test.py [--users 20] [--duration 60] [--mix generate_document=15,rag_search=15,...] [--compare old.json]
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+from mock_llm_server import make_server
+from seed_large import LOAD_TEST_PASSWORD, WORDS
+
+DEFAULT_MIX = {
+    "login": 5,
+    "document_history": 20,
+    "generate_document": 15,
+    "rag_search": 15,
+    "search": 10,
+    "pdf_upload": 5,
+    "timetable_generate": 5,
+    "timetable_drafts": 15,
+    "timetable_draft_detail": 10,
+}
+PERCENTILES = (50, 95, 99)
+
+def parse_mix(value: str) -> dict:
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation: {name}. Known: {', '.join(DEFAULT_MIX)}.")
+        mix[name] = int(weight)
+    return mix
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100)) # ceil
+    return sorted_values[int(rank) - 1]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+class ApiClient:
+    """One keep-alive connection per virtual user; reconnects after connection errors."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host, self.port, self.timeout = parts.hostname, parts.port or 80, timeout
+        self.connection = None
+        self.token = None
+
+    def request(self, method, path, body=None, headers=None, query=None):
+        """Returns (status, parsed JSON or None); raises on connection errors."""
+        headers = dict(headers or {})
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if query:
+            path = f"{path}?{urlencode(query)}"
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        try:
+            payload = json.loads(data) if response.getheader('Content-Type', '').startswith('application/json') else None
+        except ValueError:
+            payload = None
+        return response.status, payload
+
+    def login(self, username, password):
+        self.token = None
+        status, payload = self.request('POST', '/api/login', {"username": username, "password": password})
+        if status == 200:
+            self.token = payload['access_token']
+        return status, payload
+
+def build_pdf(rng) -> bytes:
+    """A small, unique circular, so uploads exercise parsing and embedding rather than the duplicate check."""
+    import fitz
+    doc = fitz.open()
+    for page_number in range(rng.randint(1, 3)):
+        page = doc.new_page()
+        lines = [f"Circular {uuid.uuid4()} - page {page_number + 1}"]
+        lines += [" ".join(rng.choices(WORDS, k=12)) for _ in range(30)]
+        page.insert_text((36, 36), "\n".join(lines), fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def multipart(field, filename, content, content_type, form=None):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in (form or {}).items():
+        body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode('utf-8'))
+    body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+               f"Content-Type: {content_type}\r\n\r\n".encode('utf-8'))
+    body.write(content)
+    body.write(f"\r\n--{boundary}--\r\n".encode('utf-8'))
+    return body.getvalue(), {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+def load_fixtures(user_count):
+    """Ids and codes the operations need, read from the seeded database through the app's models."""
+    from app import create_app
+    from app.models import Faculty, Subject, TimetableConfiguration, TimetableDraft, User
+
+    app = create_app()
+    with app.app_context():
+        usernames = [f"loadtest{n}" for n in range(1, user_count + 1)]
+        found = {user.username for user in User.query.filter(User.username.in_(usernames))}
+        if not found:
+            sys.exit("No loadtest users in the database; seed it first with seed_large.py")
+        configs = TimetableConfiguration.query.with_entities(TimetableConfiguration.id, TimetableConfiguration.sections_per_branch).all()
+        return {
+            "usernames": [username for username in usernames if username in found],
+            "configs": [(config.id, config.sections_per_branch or {}) for config in configs],
+            "subjects": [(s.code, s.department) for s in Subject.query.with_entities(Subject.code, Subject.department).filter_by(is_lab=False).limit(500)],
+            "faculty": [(f.employee_id, f.department) for f in Faculty.query.with_entities(Faculty.employee_id, Faculty.department).limit(2000)],
+            "draft_ids": [row.id for row in TimetableDraft.query.with_entities(TimetableDraft.id).order_by(TimetableDraft.id.desc()).limit(1000)],
+        }
+
+class Operations:
+    """The request each operation name sends; each returns the response status."""
+
+    def __init__(self, fixtures, password):
+        self.fixtures = fixtures
+        self.password = password
+
+    def login(self, client, rng, username):
+        return client.login(username, self.password)[0]
+
+    def document_history(self, client, rng, username):
+        status, payload = client.request('GET', '/api/documents/history', query={"limit": 20})
+        if status == 200 and payload.get('next_cursor') and rng.random() < 0.3: # Some users page on
+            status, _ = client.request('GET', '/api/documents/history', query={"limit": 20, "cursor": payload['next_cursor']})
+        return status
+
+    def generate_document(self, client, rng, username):
+        inputs = {"title": " ".join(rng.choices(WORDS, k=4)).title(), "department": rng.choice(('CSE', 'ECE', 'ME')),
+                  "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "details": " ".join(rng.choices(WORDS, k=20))}
+        document_type = rng.choice(('circular', 'notice', 'event_schedule'))
+        return client.request('POST', '/api/generate-document', {"document_type": document_type, "inputs": inputs})[0]
+
+    def rag_search(self, client, rng, username):
+        return client.request('POST', '/api/rag/search', {"query": " ".join(rng.choices(WORDS, k=5)), "top_k": 5})[0]
+
+    def search(self, client, rng, username):
+        return client.request('GET', '/api/search', query={"q": " ".join(rng.choices(WORDS, k=2))})[0]
+
+    def pdf_upload(self, client, rng, username):
+        body, headers = multipart('pdf_file', f"circular_{uuid.uuid4().hex[:8]}.pdf", build_pdf(rng), 'application/pdf',
+                                  form={"document_type": 'circular'})
+        return client.request('POST', '/api/upload-pdf', body, headers)[0]
+
+    def timetable_generate(self, client, rng, username):
+        config_id, sections_per_branch = rng.choice(self.fixtures['configs'])
+        allocations = []
+        branches = [branch for branch, sections in sections_per_branch.items() if sections]
+        for _ in range(20):
+            branch = rng.choice(branches)
+            subjects = [code for code, department in self.fixtures['subjects'] if department == branch] or [code for code, _ in self.fixtures['subjects']]
+            faculty = [employee for employee, department in self.fixtures['faculty'] if department == branch] or [employee for employee, _ in self.fixtures['faculty']]
+            allocations.append({"subject_code": rng.choice(subjects), "faculty": rng.choice(faculty), "branch": branch,
+                                "section": rng.choice(sections_per_branch[branch]), "periods_per_week": rng.randint(2, 4)})
+        return client.request('POST', '/api/timetable/generate', {"config_id": config_id, "inputs": {"subject_allocations": allocations}})[0]
+
+    def timetable_drafts(self, client, rng, username):
+        return client.request('GET', '/api/timetable/drafts', query={"limit": 20})[0]
+
+    def timetable_draft_detail(self, client, rng, username):
+        return client.request('GET', f"/api/timetable/drafts/{rng.choice(self.fixtures['draft_ids'])}")[0]
+
+def virtual_user(index, args, operations, mix, deadline, warmup_until, results, lock):
+    rng = random.Random(f"{args.seed}:{index}")
+    usernames = operations.fixtures['usernames']
+    username = usernames[index % len(usernames)]
+    client = ApiClient(args.url, args.timeout)
+    names, weights = list(mix), list(mix.values())
+    name = 'login'
+    while time.monotonic() < deadline:
+        if client.token is None:
+            name = 'login' # (Re)authenticate first; counted as a login
+        started = time.monotonic()
+        try:
+            status = getattr(operations, name)(client, rng, username)
+            error = None if status < 400 else f"HTTP {status}"
+        except Exception as e:
+            status, error = None, type(e).__name__
+        elapsed = time.monotonic() - started
+        if started >= warmup_until:
+            with lock:
+                results.append((name, elapsed, status, error))
+        if status == 401:
+            client.token = None
+        if args.think_ms:
+            time.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+        name = rng.choices(names, weights)[0]
+
+def summarize(results, elapsed) -> dict:
+    by_operation = defaultdict(list)
+    for record in results:
+        by_operation[record[0]].append(record)
+
+    def stats(records):
+        latencies = sorted(record[1] * 1000 for record in records)
+        errors = [record for record in records if record[3]]
+        return {
+            "requests": len(records),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(records), 4) if records else 0.0,
+            "throughput_rps": round(len(records) / elapsed, 2),
+            "latency_ms": {
+                **{f"p{pct}": round(percentile(latencies, pct), 1) for pct in PERCENTILES},
+                "mean": round(sum(latencies) / len(latencies), 1),
+                "max": round(latencies[-1], 1),
+            },
+            "status_codes": dict(Counter(str(record[2] or record[3]) for record in records)),
+        }
+
+    return {
+        "total": stats(results) if results else {},
+        "endpoints": {name: stats(records) for name, records in sorted(by_operation.items())},
+    }
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def print_report(report):
+    print(f"\n{'endpoint':24s} {'reqs':>7s} {'rps':>8s} {'err%':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s}  (ms)")
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+    for name, stats in rows:
+        if not stats:
+            continue
+        latency = stats['latency_ms']
+        print(f"{name:24s} {stats['requests']:7d} {stats['throughput_rps']:8.1f} {stats['error_rate'] * 100:6.1f} "
+              f"{latency['p50']:8.1f} {latency['p95']:8.1f} {latency['p99']:8.1f}")
+    for name, stats in rows:
+        failures = {code: count for code, count in stats.get('status_codes', {}).items() if not code.startswith(('2', '3'))}
+        if name != 'TOTAL' and failures:
+            print(f"  {name} errors: {', '.join(f'{code} x{count}' for code, count in failures.items())}")
+
+def print_comparison(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({(baseline.get('git_commit') or 'unknown')[:10]}):")
+    print(f"{'endpoint':24s} {'p95 ms':>18s} {'rps':>16s} {'err%':>14s}")
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+    for name, stats in rows:
+        before = baseline['total'] if name == 'TOTAL' else baseline['endpoints'].get(name)
+        if not stats or not before:
+            continue
+        p95, old_p95 = stats['latency_ms']['p95'], before['latency_ms']['p95']
+        change = f"{(p95 - old_p95) / old_p95 * 100:+.0f}%" if old_p95 else ''
+        print(f"{name:24s} {old_p95:7.1f} > {p95:7.1f} {change:>5s} {before['throughput_rps']:6.1f} > {stats['throughput_rps']:6.1f} "
+              f"{before['error_rate'] * 100:5.1f} > {stats['error_rate'] * 100:5.1f}")
+
+def start_server(args, llm_url, upload_folder):
+    port = free_port()
+    env = dict(os.environ, LLM_PROVIDER='openai', LLM_API_KEY='mock', LLM_BASE_URL=llm_url)
+    env.setdefault('UPLOAD_FOLDER', upload_folder) # Uploaded test PDFs are thrown away with the run
+    command = [sys.executable, 'serve.py', '--port', str(port), '--init-db']
+    for flag, value in (('--workers', args.server_workers), ('--threads', args.server_threads)):
+        if value:
+            command += [flag, str(value)]
+    log = open(args.server_log, 'w')
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"The API server exited with status {process.returncode}; see {args.server_log}")
+        try:
+            if ApiClient(url, 2).request('GET', '/readyz')[0] == 200:
+                return process, url
+        except OSError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    sys.exit(f"The API server did not become ready within 60 s; see {args.server_log}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="Test a running server instead of starting one with serve.py")
+    parser.add_argument('--users', type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds of load, after --warmup")
+    parser.add_argument('--warmup', type=float, default=5, help="Seconds of load whose requests are not counted")
+    parser.add_argument('--think-ms', type=float, default=0, help="Mean pause between a user's requests")
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX), help="Operation weights, e.g. pdf_upload=0,search=30")
+    parser.add_argument('--seed', type=int, default=42, help="Seeds each user's operation sequence")
+    parser.add_argument('--timeout', type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument('--password', default=LOAD_TEST_PASSWORD)
+    parser.add_argument('--llm-port', type=int, default=0, help="Mock LLM port (0 picks a free one; fix it when using --url)")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="Mock LLM seconds per completion")
+    parser.add_argument('--server-workers', type=int, help="serve.py --workers")
+    parser.add_argument('--server-threads', type=int, help="serve.py --threads")
+    parser.add_argument('--server-log', default='load_test_server.log')
+    parser.add_argument('--output', help="Result JSON path (default loadtest_results/<time>-<commit>.json)")
+    parser.add_argument('--compare', help="Earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.users)
+    llm_server = make_server(port=args.llm_port, latency=args.llm_latency)
+    threading.Thread(target=llm_server.serve_forever, daemon=True).start()
+    llm_url = f"http://127.0.0.1:{llm_server.server_address[1]}/v1"
+    print(f"[*] Mock LLM server on {llm_url}")
+
+    server, upload_folder = None, tempfile.TemporaryDirectory(prefix='load_test_uploads_')
+    if not args.url:
+        server, args.url = start_server(args, llm_url, upload_folder.name)
+        print(f"[*] API server (serve.py) on {args.url}, log in {args.server_log}")
+
+    mix = {name: weight for name, weight in args.mix.items() if weight > 0}
+    print(f"[*] {args.users} users for {args.duration:.0f} s (+{args.warmup:.0f} s warmup) against {args.url}")
+    results, lock = [], threading.Lock()
+    started = time.monotonic()
+    warmup_until = started + args.warmup
+    deadline = warmup_until + args.duration
+    operations = Operations(fixtures, args.password)
+    threads = [threading.Thread(target=virtual_user, args=(i, args, operations, mix, deadline, warmup_until, results, lock))
+               for i in range(args.users)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if server:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        llm_server.shutdown()
+        upload_folder.cleanup()
+    elapsed = time.monotonic() - warmup_until
+
+    commit, dirty = git_commit()
+    report = {
+        "started_at": datetime.now().isoformat(timespec='seconds'),
+        "git_commit": commit,
+        "git_dirty": dirty,
+        "settings": {"url": args.url, "users": args.users, "duration_s": args.duration, "warmup_s": args.warmup, "think_ms": args.think_ms,
+                     "mix": mix, "seed": args.seed, "llm_latency_s": args.llm_latency,
+                     "server_workers": args.server_workers, "server_threads": args.server_threads},
+        "elapsed_s": round(elapsed, 2),
+        **summarize(results, elapsed),
+    }
+    print_report(report)
+    if args.compare:
+        print_comparison(report, args.compare)
+
+    output = args.output or os.path.join('loadtest_results', f"{datetime.now():%Y%m%d-%H%M%S}-{(commit or 'nogit')[:10]}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[*] Results written to {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""Local mock of an OpenAI-compatible chat completions API.
+
+Point the backend at it to exercise the LLM provider layer without an API key:
+
+    python mock_llm_server.py --port 8001 --latency 0.5 --token-delay 0.02
+    LLM_PROVIDER=openai LLM_API_KEY=mock LLM_BASE_URL=http://127.0.0.1:8001/v1 python run_with_waitress.py
+
+Supports POST /v1/chat/completions with and without "stream": true.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, so connection reuse by clients is observable
+    latency = 0.0 # Seconds before the first token
+    token_delay = 0.0 # Seconds between streamed tokens
+    request_count = 0
+    connection_count = 0
+    in_flight = 0
+    max_in_flight = 0 # Most requests handled at once
+    _count_lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with MockLLMHandler._count_lock:
+            MockLLMHandler.connection_count += 1
+
+    def log_message(self, format, *args):
+        pass # Keep load tests quiet
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send_json({"requests": MockLLMHandler.request_count, "connections": MockLLMHandler.connection_count,
+                             "max_in_flight": MockLLMHandler.max_in_flight})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json({"error": "not found"}, status=404)
+            return
+        with MockLLMHandler._count_lock:
+            MockLLMHandler.request_count += 1
+            MockLLMHandler.in_flight += 1
+            MockLLMHandler.max_in_flight = max(MockLLMHandler.max_in_flight, MockLLMHandler.in_flight)
+        try:
+            self._complete()
+        except (BrokenPipeError, ConnectionResetError):
+            pass # The client gave up, e.g. on its timeout
+        finally:
+            with MockLLMHandler._count_lock:
+                MockLLMHandler.in_flight -= 1
+
+    def _complete(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        model = body.get('model', 'mock-model')
+        prompt = body.get('messages', [{}])[-1].get('content', '')
+        tokens = self._completion_tokens(prompt, body.get('max_tokens') or 200)
+        time.sleep(self.latency)
+
+        if not body.get('stream'):
+            self._send_json({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(tokens), "total_tokens": len(prompt.split()) + len(tokens)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            self._send_chunk(self._stream_event(model, {"content": token}, None))
+            if self.token_delay and i < len(tokens) - 1:
+                time.sleep(self.token_delay)
+        self._send_chunk(self._stream_event(model, {}, "stop"))
+        self._send_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    @staticmethod
+    def _completion_tokens(prompt, max_tokens):
+        words = ["This", "is", "a", "mock", "document", "generated", "for", "testing", "purposes."]
+        count = min(max_tokens, 60)
+        return [("" if i == 0 else " ") + words[i % len(words)] for i in range(count)]
+
+    @staticmethod
+    def _stream_event(model, delta, finish_reason):
+        payload = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    def _send_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def make_server(host='127.0.0.1', port=8001, latency=0.0, token_delay=0.0):
+    """Builds (but does not start) a mock server; port 0 picks a free port."""
+    MockLLMHandler.latency = latency
+    MockLLMHandler.token_delay = token_delay
+    return ThreadingHTTPServer((host, port), MockLLMHandler)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.token_delay)
+    print(f"[*] Mock LLM server listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[*] Mock LLM server stopped")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""Measure the API's cold start: `from app import create_app; create_app()` in fresh interpreters.
+
+Each run is a new interpreter, so nothing is cached between runs. Reports the
+median create_app time (imports included), then, from one extra run under
+`python -X importtime` (which inflates times somewhat), the slowest imports by
+cumulative time and the total self time per top-level package. The embedding
+model is never loaded by create_app, so it is not part of the number.
+
+Exits with status 1 when the median exceeds --budget-ms, so it can gate CI.
+
+Usage: python profile_startup.py [--runs 5] [--top 25] [--budget-ms 300]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+PROBE = (
+    "import time; started = time.perf_counter(); "
+    "from app import create_app; create_app(); "
+    "print(f'create_app_ms={(time.perf_counter() - started) * 1000:.1f}')"
+)
+
+def run_once(importtime=False):
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite://') # create_app must not need a real database
+    flags = ['-X', 'importtime'] if importtime else []
+    result = subprocess.run(
+        [sys.executable, *flags, '-c', PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed = next(float(line.split('=', 1)[1]) for line in result.stdout.splitlines() if line.startswith('create_app_ms='))
+    return elapsed, parse_importtime(result.stderr)
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, nesting depth) per line of -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=25, help="Slowest imports to list")
+    parser.add_argument('--budget-ms', type=float, default=300)
+    args = parser.parse_args()
+
+    timings = [run_once()[0] for _ in range(args.runs)]
+    _, modules = run_once(importtime=True)
+
+    median = statistics.median(timings)
+    print(f"create_app(): median {median:.0f} ms over {args.runs} runs (min {min(timings):.0f}, max {max(timings):.0f}); budget {args.budget_ms:.0f} ms")
+
+    print("\nSlowest imports (cumulative, -X importtime run):")
+    for name, _, cumulative_us, depth in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {'  ' * depth}{name}")
+
+    per_package = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        per_package[name.split('.')[0]] += self_us
+    print("\nSelf time by top-level package (-X importtime run):")
+    for package, self_us in sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    sys.exit(0 if median <= args.budget_ms else 1)
+
+if __name__ == '__main__':
+    main()
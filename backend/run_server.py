@@ -1,5 +1,8 @@
 #!/usr/bin/env python
-"""Run Flask app with better error handling"""
+"""Run Flask app with better error handling
+
+Usage: python run_server.py [--init-db]
+"""
 import sys
 import traceback
 
@@ -9,8 +12,12 @@ try:
     print("[*] Flask imported successfully")
     
     print("[*] Creating app...")
-    from app import create_app
+    from app import create_app, init_db
     app = create_app()
+    if '--init-db' in sys.argv[1:]: # Create missing tables and search indexes, as `serve.py --init-db` does
+        print("[*] Initializing the database...")
+        with app.app_context():
+            init_db()
     print("[*] App created successfully")
     
     print("[*] Starting server on 0.0.0.0:5000...")
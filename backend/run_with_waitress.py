@@ -1,5 +1,8 @@
 #!/usr/bin/env python
-"""Run the Flask app using waitress (Windows-friendly WSGI server)"""
+"""Run the Flask app using waitress (Windows-friendly WSGI server)
+
+Usage: python run_with_waitress.py [--init-db]
+"""
 import sys
 import os
 
@@ -8,9 +11,13 @@ try:
     from waitress import serve
     
     print("[*] Creating Flask app...")
-    from app import create_app
+    from app import create_app, init_db
     
     app = create_app()
+    if '--init-db' in sys.argv[1:]: # Create missing tables and search indexes, as `serve.py --init-db` does
+        print("[*] Initializing the database...")
+        with app.app_context():
+            init_db()
     print("[*] Flask app created successfully")
     
     print("[*] Starting server with waitress...")
@@ -19,7 +26,7 @@ try:
     print("[*] Press Ctrl+C to stop")
     
     # Use waitress to serve the app - this is more compatible with Windows
-    serve(app, host='0.0.0.0', port=5000, threads=10)
+    serve(app, host='0.0.0.0', port=5000, threads=app.config['SERVER_THREADS'])
     
 except KeyboardInterrupt:
     print("\n[*] Server stopped by user")
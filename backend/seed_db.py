@@ -1,4 +1,4 @@
-from app import create_app, db
+from app import create_app, db, init_db
 from app.models import User, TimetableConfiguration, Faculty, Subject, Room, set_password
 import json
 import os
@@ -8,6 +8,7 @@ os.environ['FLASK_APP'] = 'wsgi.py'
 
 app = create_app()
 app.app_context().push() # Push application context
+init_db() # Tables and search indexes
 
 # --- Users ---
 # Check if admin user already exists before adding
@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+"""Seed the configured database (DATABASE_URL) with a large, reproducible synthetic dataset for load testing.
+
+Generates users, thousands of faculty with weekly availability, subjects,
+rooms, configurations covering hundreds of sections, generated documents,
+timetable drafts with their XAI logs, and uploaded documents split into
+chunks with embeddings. Every table draws from its own random stream derived
+from --seed, so the same seed and counts always produce the same rows, and
+changing one count does not reshuffle the other tables.
+
+Rows are bulk loaded in --batch-size batches: COPY ... FROM STDIN on Postgres
+(psycopg2 or psycopg), executemany Core inserts elsewhere. New rows get ids
+after the current maximum, so it can seed into a database that already has
+data (Postgres sequences are moved past them afterwards). The load-test users
+are loadtest1..N with --password.
+
+Usage: python seed_large.py [--scale 1.0] [--seed 42] [--xai-logs 1000000] [--chunks 100000] [--batch-size 5000]
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, text
+
+DEFAULT_COUNTS = {
+    "users": 20,
+    "faculty": 2000,
+    "subjects": 400,
+    "rooms": 300,
+    "branches": 12,
+    "sections": 300, # Spread over the branches
+    "configs": 4, # Each covers every section
+    "generated_documents": 50000,
+    "drafts": 2000,
+    "xai_logs": 1000000, # Spread over the drafts
+    "uploads": 2000,
+    "chunks": 100000, # Spread over the uploads
+}
+LOAD_TEST_PASSWORD = 'loadtest_password'
+BRANCHES = ('CSE', 'ECE', 'ME', 'CE', 'EE', 'IT', 'CHE', 'AE', 'BT', 'MME', 'PE', 'ARCH', 'MA', 'PH', 'CY', 'HS')
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')
+SLOTS = (
+    {"start": "09:00", "end": "10:00", "type": "lecture"},
+    {"start": "10:00", "end": "11:00", "type": "lecture"},
+    {"start": "11:00", "end": "12:00", "type": "lecture"},
+    {"start": "12:00", "end": "13:00", "type": "break"},
+    {"start": "13:00", "end": "14:00", "type": "lecture"},
+    {"start": "14:00", "end": "15:00", "type": "lecture"},
+    {"start": "15:00", "end": "16:00", "type": "lab_lecture_combined"},
+)
+TEACHING_SLOTS = [slot for slot in SLOTS if slot['type'] != 'break']
+DOCUMENT_TYPES = ('circular', 'notice', 'event_schedule', 'exam_timetable', 'meeting_minutes')
+XAI_RULES = ( # (log_type, rule_name, priority, relative frequency), after the solver's rules
+    ('choice', 'Slot_Assignment_Success', 1, 50),
+    ('conflict', 'Faculty_Clash_Detection', 4, 12),
+    ('rejection', 'Faculty_Availability_Validation', 3, 10),
+    ('rejection', 'Section_Already_Occupied_Consecutive', 3, 8),
+    ('rejection', 'Max_Periods_Per_Faculty_Per_Day', 3, 6),
+    ('rejection', 'Max_Workload_Per_Faculty_Per_Week', 3, 4),
+    ('rejection', 'Room_Allocation_Constraints', 4, 4),
+    ('rejection', 'No_Lab_In_Last_Period', 2, 2),
+    ('rejection', 'Break_Disruption', 2, 2),
+    ('rejection', 'No_Available_Slot_Found', 5, 1),
+    ('conflict', 'Subject_Frequency_Per_Week', 4, 1),
+)
+WORDS = (
+    'academic', 'admission', 'assessment', 'attendance', 'board', 'campus', 'certificate', 'committee', 'course',
+    'curriculum', 'deadline', 'department', 'examination', 'faculty', 'fee', 'hall', 'holiday', 'hostel', 'internal',
+    'laboratory', 'lecture', 'library', 'meeting', 'notice', 'orientation', 'placement', 'practical', 'principal',
+    'project', 'registration', 'research', 'result', 'revaluation', 'schedule', 'scholarship', 'semester', 'seminar',
+    'session', 'sports', 'students', 'submission', 'syllabus', 'timetable', 'tutorial', 'university', 'workshop',
+    'all', 'are', 'be', 'by', 'for', 'from', 'in', 'is', 'of', 'on', 'the', 'to', 'will', 'with', 'within',
+)
+START_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc) # Fixed, so timestamps are reproducible too
+
+def scaled_counts(scale: float = 1.0, **overrides) -> dict:
+    """DEFAULT_COUNTS multiplied by `scale` (each at least 1), with explicit per-table overrides."""
+    counts = {key: value if key == 'branches' else max(1, int(value * scale)) for key, value in DEFAULT_COUNTS.items()}
+    counts.update({key: value for key, value in overrides.items() if value is not None})
+    counts["branches"] = min(counts["branches"], len(BRANCHES))
+    return counts
+
+def _sentence(rng, low=8, high=20) -> str:
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return " ".join(words).capitalize() + "."
+
+def _paragraph(rng, sentences) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+def _section_names(count) -> list[str]:
+    """A, B, ..., Z, AA, AB, ..."""
+    names = []
+    for n in range(count):
+        name = ""
+        n += 1
+        while n:
+            n, remainder = divmod(n - 1, 26)
+            name = chr(65 + remainder) + name
+        names.append(name)
+    return names
+
+def _split(total, parts) -> list[int]:
+    """`total` spread as evenly as possible over `parts` buckets."""
+    base, extra = divmod(total, parts)
+    return [base + (1 if n < extra else 0) for n in range(parts)]
+
+class BulkLoader:
+    """Loads rows (dicts with the same keys) into a table in batches, by COPY on Postgres and executemany elsewhere."""
+
+    def __init__(self, engine, batch_size):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.use_copy = engine.dialect.name == 'postgresql'
+
+    def next_id(self, table) -> int:
+        with self.engine.connect() as connection:
+            return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+    def load(self, table, rows) -> int:
+        loaded = 0
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            with self.engine.begin() as connection:
+                if self.use_copy:
+                    self._copy(connection, table, batch)
+                else:
+                    connection.execute(table.insert(), batch)
+            loaded += len(batch)
+        if self.use_copy and loaded:
+            with self.engine.begin() as connection: # Explicit ids do not advance the serial sequence
+                connection.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"))
+        return loaded
+
+    def _copy(self, connection, table, batch):
+        columns = list(batch[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow([self._csv_value(row[column]) for column in columns])
+        statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        cursor = connection.connection.driver_connection.cursor()
+        try:
+            if hasattr(cursor, 'copy_expert'): # psycopg2
+                buffer.seek(0)
+                cursor.copy_expert(statement, buffer)
+            else: # psycopg 3
+                with cursor.copy(statement) as copy:
+                    copy.write(buffer.getvalue())
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _csv_value(value):
+        if value is None:
+            return None # Unquoted empty field: NULL in COPY's csv format
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, separators=(',', ':'))
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+def _users(loader, count, password):
+    """The loadtest1..N users (existing ones are kept); returns their ids."""
+    from app.models import User
+    from app.services.password_hashing import hash_password
+
+    table = User.__table__
+    usernames = [f"loadtest{n}" for n in range(1, count + 1)]
+    with loader.engine.connect() as connection:
+        existing = dict(connection.execute(select(table.c.username, table.c.id).where(table.c.username.in_(usernames))).all())
+    first_id = loader.next_id(table)
+    password_hash = hash_password(password)
+    missing = [username for username in usernames if username not in existing]
+    loader.load(table, (
+        {"id": first_id + n, "username": username, "email": f"{username}@loadtest.example.com", "password_hash": password_hash,
+         "is_admin": True, "token_version": 1, "created_at": START_DATE, "updated_at": START_DATE}
+        for n, username in enumerate(missing)
+    ))
+    existing.update({username: first_id + n for n, username in enumerate(missing)})
+    return [existing[username] for username in usernames], len(missing)
+
+def _faculty(rng, first_id, count, branches):
+    slot_names = [f"{slot['start']}-{slot['end']}" for slot in TEACHING_SLOTS]
+    for n in range(count):
+        faculty_id = first_id + n
+        yield {
+            "id": faculty_id, "name": f"Dr. {rng.choice(WORDS).title()} {faculty_id}", "employee_id": f"F{faculty_id:06d}",
+            "department": rng.choice(branches), "max_weekly_workload": rng.randint(12, 24), "max_daily_periods": rng.randint(3, 5),
+            "availability": {day: sorted(rng.sample(slot_names, rng.randint(2, len(slot_names)))) for day in DAYS},
+            "created_at": START_DATE, "updated_at": START_DATE,
+        }
+
+def _subjects(rng, first_id, count, branches):
+    for n in range(count):
+        subject_id = first_id + n
+        department = rng.choice(branches)
+        is_lab = rng.random() < 0.2
+        yield {
+            "id": subject_id, "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}{' Lab' if is_lab else ''}",
+            "code": f"{department}{'L' if is_lab else ''}{subject_id:05d}", "department": department, "is_lab": is_lab,
+            "credits": 2 if is_lab else rng.randint(3, 4), "required_frequency_per_week": 1 if is_lab else rng.randint(2, 4),
+            "lecture_periods": None if is_lab else 1, "lab_periods": 2 if is_lab else None,
+        }
+
+def _rooms(rng, first_id, count):
+    for n in range(count):
+        room_id = first_id + n
+        is_lab = rng.random() < 0.2
+        yield {
+            "id": room_id, "name": f"{'LAB' if is_lab else 'LH'}{room_id:05d}", "room_type": 'Lab' if is_lab else 'Lecture Hall',
+            "capacity": 30 if is_lab else rng.choice((40, 60, 90, 120)), "is_lab": is_lab,
+        }
+
+def _configs(rng, first_id, count, sections_per_branch, user_ids):
+    for n in range(count):
+        config_id = first_id + n
+        created = START_DATE + timedelta(days=rng.randint(0, 364))
+        yield {
+            "id": config_id, "config_name": f"Load test configuration {config_id}", "academic_year": f"{2025 + n // 2}-{2026 + n // 2}",
+            "semester": 'Fall' if n % 2 == 0 else 'Spring', "branches": list(sections_per_branch),
+            "sections_per_branch": sections_per_branch, "slots_per_day": list(SLOTS), "created_by": rng.choice(user_ids),
+            "created_at": created, "updated_at": created,
+        }
+
+def _generated_documents(rng, first_id, count, user_ids):
+    for n in range(count):
+        generated = START_DATE + timedelta(seconds=rng.randint(0, 365 * 86400))
+        document_type = rng.choice(DOCUMENT_TYPES)
+        yield {
+            "id": first_id + n, "title": f"{document_type.replace('_', ' ').title()}: {_sentence(rng, 3, 7)[:-1]}",
+            "document_type": document_type, "generated_by": rng.choice(user_ids), "generation_date": generated,
+            "content": "\n\n".join(_paragraph(rng, rng.randint(3, 6)) for _ in range(rng.randint(2, 5))),
+            "admin_inputs": {"department": rng.choice(BRANCHES), "audience": rng.choice(('students', 'faculty', 'all'))},
+            "status": rng.choice(('draft', 'draft', 'final')), "version": 1, "updated_at": generated,
+        }
+
+def _draft_content(rng, branch, sections, subjects, faculty, rooms):
+    """A filled-in week for (up to 6 of) one branch's sections, in the solver's draft_content layout."""
+    content = {}
+    for day in DAYS:
+        content[day] = {}
+        for slot in SLOTS:
+            content[day][slot['start']] = {
+                f"{branch}-{section}": None if slot['type'] == 'break' or rng.random() < 0.15 else {
+                    "subject": rng.choice(subjects), "faculty": rng.choice(faculty), "room": rng.choice(rooms), "consecutive_part": None,
+                }
+                for section in sections[:6]
+            }
+    return content
+
+def _drafts(rng, first_id, count, config_ids, user_ids, sections_per_branch, subjects, faculty, rooms):
+    for n in range(count):
+        generated = START_DATE + timedelta(seconds=rng.randint(0, 365 * 86400))
+        branch = rng.choice(list(sections_per_branch))
+        yield {
+            "id": first_id + n, "config_id": rng.choice(config_ids), "generated_by": rng.choice(user_ids), "generation_date": generated,
+            "status": rng.choice(('draft', 'draft', 'validated', 'approved')),
+            "draft_content": _draft_content(rng, branch, sections_per_branch[branch], subjects, faculty, rooms),
+            "updated_at": generated,
+        }
+
+def _xai_logs(rng, first_id, drafts, per_draft, sections_per_branch, subjects, faculty, rooms):
+    """`drafts` is a list of (draft id, generation date); `per_draft` the log count of each."""
+    rules, weights = XAI_RULES, [rule[3] for rule in XAI_RULES]
+    branches = list(sections_per_branch)
+    log_id = first_id
+    for (draft_id, generated), count in zip(drafts, per_draft):
+        for n, (log_type, rule_name, priority, _) in enumerate(rng.choices(rules, weights, k=count)):
+            branch = rng.choice(branches)
+            slot = {"day": rng.choice(DAYS), "slot_start": rng.choice(TEACHING_SLOTS)['start'],
+                    "branch_section": f"{branch}-{rng.choice(sections_per_branch[branch])}",
+                    "subject": rng.choice(subjects), "faculty": rng.choice(faculty), "room": rng.choice(rooms)}
+            yield {
+                "id": log_id, "timetable_draft_id": draft_id, "log_type": log_type, "rule_name": rule_name, "priority": priority,
+                "timestamp": generated + timedelta(milliseconds=n), "slot_details": slot,
+                "explanation": f"{rule_name.replace('_', ' ')}: {slot['subject']} for {slot['branch_section']} with {slot['faculty']} "
+                               f"in {slot['room']} on {slot['day']} {slot['slot_start']}.",
+            }
+            log_id += 1
+
+def _random_vector(rng, dimension) -> list[float]:
+    vector = [rng.gauss(0, 1) for _ in range(dimension)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [round(value / norm, 5) for value in vector] # Normalized, as the embedding service stores them
+
+def _uploads_and_chunks(rng, first_upload_id, first_chunk_id, uploads, chunks_per_upload, user_ids, model_name, dimension):
+    """Yields (upload row, [chunk rows]); chunk spans index into the upload's parsed_text."""
+    chunk_id = first_chunk_id
+    for n, chunk_count in zip(range(uploads), chunks_per_upload):
+        upload_id = first_upload_id + n
+        uploaded = START_DATE + timedelta(seconds=rng.randint(0, 365 * 86400))
+        texts = [_paragraph(rng, rng.randint(4, 8)) for _ in range(chunk_count)]
+        chunks, offset = [], 0
+        for index, chunk_text in enumerate(texts):
+            chunks.append({
+                "id": chunk_id, "uploaded_document_id": upload_id, "chunk_index": index, "text_chunk": chunk_text,
+                "embedding": json.dumps(_random_vector(rng, dimension), separators=(',', ':')), "model_name": model_name,
+                "dimension": dimension, "token_count": len(chunk_text.split()) * 4 // 3,
+                "page_start": index // 3 + 1, "page_end": index // 3 + 1, "char_start": offset, "char_end": offset + len(chunk_text),
+                "created_at": uploaded,
+            })
+            chunk_id += 1
+            offset += len(chunk_text) + 2
+        upload = {
+            "id": upload_id, "filename": f"{rng.choice(DOCUMENT_TYPES)}_{upload_id}.pdf", "filepath": f"uploads/loadtest_{upload_id}.pdf",
+            "uploaded_by": rng.choice(user_ids), "upload_date": uploaded, "document_type": rng.choice(DOCUMENT_TYPES),
+            "original_content_hash": f"{upload_id:064x}", "raw_content_hash": f"{upload_id + 10 ** 12:064x}",
+            "document_metadata": {"page_count": max(1, math.ceil(chunk_count / 3))}, "parsed_text": "\n\n".join(texts),
+            "status": 'processed', "updated_at": uploaded,
+        }
+        yield upload, chunks
+
+def seed_database(counts: dict, seed: int = 42, embedding_dim: int = 384, batch_size: int = 5000,
+                  password: str = LOAD_TEST_PASSWORD, log=print) -> dict:
+    """
+    Seeds the current app's database with `counts` rows per table (see
+    DEFAULT_COUNTS / scaled_counts). Must run in an app context with the tables
+    created. Returns the rows inserted per table.
+    """
+    from flask import current_app
+    from app import db
+    from app.models import (Embedding, Faculty, GeneratedDocument, Room, Subject, TimetableConfiguration,
+                            TimetableDraft, UploadedDocument, XaiLog)
+
+    loader = BulkLoader(db.engine, batch_size)
+    streams = {} # One reproducible random stream per table
+
+    def rng(name):
+        return streams.setdefault(name, random.Random(f"{seed}:{name}"))
+
+    inserted = {}
+    def load(model, rows):
+        started = time.perf_counter()
+        count = loader.load(model.__table__, rows)
+        elapsed = time.perf_counter() - started
+        inserted[model.__tablename__] = inserted.get(model.__tablename__, 0) + count
+        log(f"[*] {model.__tablename__}: {count} rows in {elapsed:.1f} s ({count / elapsed if elapsed else 0:.0f} rows/s)")
+
+    user_ids, new_users = _users(loader, counts['users'], password)
+    inserted['users'] = new_users
+    log(f"[*] users: {new_users} new (loadtest1..loadtest{counts['users']})")
+
+    branches = list(BRANCHES[:counts['branches']])
+    section_counts = _split(counts['sections'], len(branches))
+    sections_per_branch = {branch: _section_names(max(1, section_count)) for branch, section_count in zip(branches, section_counts)}
+
+    first_faculty = loader.next_id(Faculty.__table__)
+    load(Faculty, _faculty(rng('faculty'), first_faculty, counts['faculty'], branches))
+    first_subject = loader.next_id(Subject.__table__)
+    load(Subject, _subjects(rng('subjects'), first_subject, counts['subjects'], branches))
+    load(Room, _rooms(rng('rooms'), loader.next_id(Room.__table__), counts['rooms']))
+
+    first_config = loader.next_id(TimetableConfiguration.__table__)
+    load(TimetableConfiguration, _configs(rng('configs'), first_config, counts['configs'], sections_per_branch, user_ids))
+    load(GeneratedDocument, _generated_documents(rng('generated_documents'), loader.next_id(GeneratedDocument.__table__),
+                                                 counts['generated_documents'], user_ids))
+
+    # Drafts and logs reference the seeded reference data by name, as the solver's output does
+    with db.engine.connect() as connection:
+        subject_codes = connection.execute(select(Subject.code).where(Subject.id >= first_subject)).scalars().all()
+        employee_ids = connection.execute(select(Faculty.employee_id).where(Faculty.id >= first_faculty)).scalars().all()
+        room_names = connection.execute(select(Room.name)).scalars().all()
+    config_ids = list(range(first_config, first_config + counts['configs']))
+    first_draft = loader.next_id(TimetableDraft.__table__)
+    load(TimetableDraft, _drafts(rng('drafts'), first_draft, counts['drafts'], config_ids, user_ids, sections_per_branch,
+                                 subject_codes, employee_ids, room_names))
+    with db.engine.connect() as connection:
+        drafts = connection.execute(
+            select(TimetableDraft.id, TimetableDraft.generation_date).where(TimetableDraft.id >= first_draft).order_by(TimetableDraft.id)
+        ).all()
+    load(XaiLog, _xai_logs(rng('xai_logs'), loader.next_id(XaiLog.__table__), drafts, _split(counts['xai_logs'], len(drafts)),
+                           sections_per_branch, subject_codes, employee_ids, room_names))
+
+    # Uploads and their chunks are generated together so chunk spans match the parsed text
+    pairs = _uploads_and_chunks(rng('uploads'), loader.next_id(UploadedDocument.__table__), loader.next_id(Embedding.__table__),
+                                counts['uploads'], _split(counts['chunks'], counts['uploads']), user_ids,
+                                current_app.config['EMBEDDING_MODEL_NAME'], embedding_dim)
+    uploads_per_batch = max(1, batch_size * counts['uploads'] // max(counts['chunks'], 1))
+    started, upload_total, chunk_total = time.perf_counter(), 0, 0
+    while True:
+        batch = list(itertools.islice(pairs, uploads_per_batch))
+        if not batch:
+            break
+        upload_total += loader.load(UploadedDocument.__table__, (upload for upload, _ in batch))
+        chunk_total += loader.load(Embedding.__table__, (chunk for _, chunks in batch for chunk in chunks))
+    elapsed = time.perf_counter() - started
+    inserted['uploaded_documents'], inserted['embeddings'] = upload_total, chunk_total
+    log(f"[*] uploaded_documents + embeddings: {upload_total} + {chunk_total} rows in {elapsed:.1f} s")
+
+    with db.engine.begin() as connection:
+        connection.execute(text("ANALYZE")) # Fresh planner statistics for the new volume
+    return inserted
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplies every default count")
+    parser.add_argument('--seed', type=int, default=42, help="Same seed and counts, same data")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--embedding-dim', type=int, default=384, help="Vector size (384 for all-MiniLM-L6-v2)")
+    parser.add_argument('--password', default=LOAD_TEST_PASSWORD, help="Password of the loadtest users")
+    for key, value in DEFAULT_COUNTS.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, help=f"Overrides the scaled count (default {value})")
+    args = parser.parse_args()
+
+    from app import create_app, init_db
+    counts = scaled_counts(args.scale, **{key: getattr(args, key) for key in DEFAULT_COUNTS})
+    app = create_app()
+    with app.app_context():
+        init_db()
+        print(f"[*] Seeding {app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1]} with seed {args.seed}: "
+              + ", ".join(f"{key}={value}" for key, value in counts.items()))
+        started = time.perf_counter()
+        inserted = seed_database(counts, seed=args.seed, embedding_dim=args.embedding_dim, batch_size=args.batch_size, password=args.password)
+        print(f"[*] Done: {sum(inserted.values())} rows in {time.perf_counter() - started:.1f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Production launcher for the API, configured from app.config (SERVER_* settings / env vars).
+
+On Linux it runs gunicorn in pre-fork mode: the app (models, blueprints) is
+created once in the master and forked into SERVER_WORKERS processes
+with SERVER_THREADS request threads each, so CPU-bound work (solver, PDF
+rendering) spreads across cores instead of contending for one GIL.
+  kill -HUP <master pid>   graceful restart: new workers start, old ones finish in-flight requests
+  kill -TERM <master pid>  graceful stop, waiting up to SERVER_GRACEFUL_TIMEOUT_SECONDS
+Deploy new code with USR2 (start a new master next to the old one), then TERM the old master.
+
+Elsewhere (or with --server waitress) it runs a single waitress process with
+SERVER_THREADS threads.
+
+Workers share state through the database (export jobs, re-embedding leases, login
+failure limits) and directories (EXPORT_FOLDER, METRICS_MULTIPROC_DIR), which must be
+shared by every worker. Still per process, so multiplied by the worker count: the
+user and generation caches, the LLM_MAX_CONCURRENCY and password-hashing limits,
+the PDF render pool and the embedding model. The model is loaded by each worker on
+first use; --preload-models loads it once in the master, so workers start with it
+and share its memory copy-on-write until they write to those pages.
+
+Usage: python serve.py [--server gunicorn|waitress] [--workers N] [--threads N] [--port N] [--init-db] [--preload-models]
+"""
+import argparse
+import multiprocessing
+import sys
+
+from app.config import Config
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError: # Not available on Windows
+    BaseApplication = None
+
+def _worker_count(configured: int) -> int:
+    return configured if configured > 0 else multiprocessing.cpu_count()
+
+def _worker_exit(server, worker):
+    # Final values of a recycled or stopped worker, summed into /metrics from now on
+    from app.utils.metrics import REGISTRY
+    REGISTRY.flush()
+
+def _post_fork(server, worker):
+    # Connections opened by the master while preloading (e.g. --init-db, --preload-models)
+    # must not be shared with the children; each worker opens its own
+    from app import db
+    with server.app.wsgi_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+if BaseApplication is not None:
+    class GunicornApplication(BaseApplication):
+        def __init__(self, wsgi_app, options):
+            self.wsgi_app = wsgi_app
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.wsgi_app
+
+def _gunicorn_options(settings: dict) -> dict:
+    return {
+        'bind': f"{settings['SERVER_HOST']}:{settings['SERVER_PORT']}",
+        'workers': _worker_count(settings['SERVER_WORKERS']),
+        'worker_class': 'gthread',
+        'threads': settings['SERVER_THREADS'],
+        'backlog': settings['SERVER_BACKLOG'],
+        'worker_connections': settings['SERVER_MAX_CONNECTIONS'],
+        'timeout': settings['SERVER_TIMEOUT_SECONDS'],
+        'graceful_timeout': settings['SERVER_GRACEFUL_TIMEOUT_SECONDS'],
+        'keepalive': settings['SERVER_KEEPALIVE_SECONDS'],
+        'max_requests': settings['SERVER_MAX_REQUESTS'],
+        'max_requests_jitter': settings['SERVER_MAX_REQUESTS'] // 10, # Spread recycling so workers do not restart together
+        'preload_app': True,
+        'post_fork': _post_fork,
+        'worker_exit': _worker_exit,
+        'accesslog': '-',
+    }
+
+def serve_gunicorn(app, settings: dict):
+    options = _gunicorn_options(settings)
+    if app.config['METRICS_ENABLED'] and options['workers'] > 1:
+        if app.config['METRICS_MULTIPROC_DIR']:
+            from app.utils.metrics import clear_multiprocess_dir
+            clear_multiprocess_dir(app.config['METRICS_MULTIPROC_DIR'])
+        else:
+            print(f"[!] METRICS_MULTIPROC_DIR is not set: /metrics reports only the one of {options['workers']} workers "
+                  "that answers each scrape. Set it to a directory shared by the workers.")
+    print(f"[*] gunicorn: {options['workers']} workers x {options['threads']} threads on http://{options['bind']}")
+    GunicornApplication(app, options).run()
+
+def serve_waitress(app, settings: dict):
+    from waitress import serve
+    if settings['SERVER_WORKERS'] > 1:
+        print("[!] waitress runs a single process; SERVER_WORKERS is ignored")
+    print(f"[*] waitress: {settings['SERVER_THREADS']} threads on http://{settings['SERVER_HOST']}:{settings['SERVER_PORT']}")
+    serve(
+        app,
+        host=settings['SERVER_HOST'],
+        port=settings['SERVER_PORT'],
+        threads=settings['SERVER_THREADS'],
+        backlog=settings['SERVER_BACKLOG'],
+        connection_limit=settings['SERVER_MAX_CONNECTIONS'],
+        channel_timeout=settings['SERVER_TIMEOUT_SECONDS'],
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the College Admin API with a production WSGI server.")
+    parser.add_argument('--server', choices=('gunicorn', 'waitress'), default='gunicorn' if BaseApplication else 'waitress')
+    parser.add_argument('--workers', type=int, help="Overrides SERVER_WORKERS")
+    parser.add_argument('--threads', type=int, help="Overrides SERVER_THREADS")
+    parser.add_argument('--port', type=int, help="Overrides SERVER_PORT")
+    parser.add_argument('--init-db', action='store_true', help="Create missing tables and search indexes before serving")
+    parser.add_argument('--preload-models', action='store_true', help="Load the embedding model before the workers fork")
+    args = parser.parse_args(argv)
+
+    from app import create_app, init_db
+    app = create_app()
+    if args.init_db:
+        with app.app_context():
+            init_db()
+    if args.preload_models:
+        from app.services.embedding_service import preload_embedding_model
+        with app.app_context():
+            # Load only: running the model here would start torch threads that do not survive the fork
+            if preload_embedding_model():
+                print("[*] Embedding model loaded before forking the workers")
+            else:
+                print("[!] Embedding model could not be preloaded; each worker will try on first use")
+    settings = {key: app.config[key] for key in dir(Config) if key.startswith('SERVER_')}
+    for key, value in (('SERVER_WORKERS', args.workers), ('SERVER_THREADS', args.threads), ('SERVER_PORT', args.port)):
+        if value is not None:
+            settings[key] = value
+
+    if args.server == 'gunicorn':
+        if BaseApplication is None:
+            print("[!] gunicorn is not installed (it does not run on Windows); use --server waitress")
+            sys.exit(1)
+        serve_gunicorn(app, settings)
+    else:
+        serve_waitress(app, settings)
+
+if __name__ == '__main__':
+    main()
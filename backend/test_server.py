@@ -1,5 +1,8 @@
 #!/usr/bin/env python
-"""Simple test server to debug login issues"""
+"""Simple test server to debug login issues
+
+Usage: python test_server.py [--init-db]
+"""
 import os
 import sys
 import logging
@@ -12,9 +15,13 @@ os.environ['FLASK_APP'] = 'wsgi.py'
 
 try:
     logger.info("Creating Flask app...")
-    from app import create_app
+    from app import create_app, init_db
     from flask import request
     app = create_app()
+    if '--init-db' in sys.argv[1:]: # Create missing tables and search indexes, as `serve.py --init-db` does
+        logger.info("Initializing the database...")
+        with app.app_context():
+            init_db()
     logger.info("Flask app created successfully")
     
     # Add request logging
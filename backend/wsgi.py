@@ -1,8 +1,10 @@
-from app import create_app
+from app import create_app, init_db
 
 app = create_app()
 
 if __name__ == '__main__':
+    with app.app_context():
+        init_db()
     # For network access, use host='0.0.0.0'
     # For local development, use host='127.0.0.1'
     print("[*] College Admin API starting...")
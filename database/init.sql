@@ -8,6 +8,7 @@ CREATE TABLE users (
     password_hash VARCHAR(128) NOT NULL, -- Stores bcrypt hash
     email VARCHAR(120) UNIQUE,
     is_admin BOOLEAN DEFAULT TRUE,
+    token_version INTEGER NOT NULL DEFAULT 1, -- Carried in JWTs as "ver"; bumping it revokes issued tokens
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -21,23 +22,52 @@ CREATE TABLE uploaded_documents (
     upload_date TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     document_type VARCHAR(50), -- e.g., 'Circular', 'Notice', 'Timetable'
     original_content_hash VARCHAR(64) UNIQUE, -- MD5/SHA256 hash of original file content for deduplication
+    raw_content_hash VARCHAR(64), -- SHA256 of the raw uploaded bytes, checked before the PDF is parsed
     metadata JSONB, -- Stores extracted metadata as JSON (e.g., department, date, keywords)
     parsed_text TEXT, -- Stores full extracted text content for initial processing
     status VARCHAR(20) DEFAULT 'processed' -- e.g., 'pending', 'processed', 'failed'
 );
 
+CREATE INDEX idx_uploaded_documents_raw_content_hash ON uploaded_documents (raw_content_hash);
+
 -- Table for RAG Embeddings
 CREATE TABLE embeddings (
     id SERIAL PRIMARY KEY,
     uploaded_document_id INTEGER REFERENCES uploaded_documents(id) ON DELETE CASCADE,
     text_chunk TEXT NOT NULL, -- The specific text chunk from the document
-    embedding VECTOR(1536) NOT NULL, -- Adjust dimension based on your embedding model (e.g., 1536 for OpenAI ada-002, 384 for MiniLM-L6-v2)
+    embedding VECTOR NOT NULL, -- Dimension varies by model so several model versions can coexist during re-embedding
+    model_name VARCHAR(100), -- Embedding model that produced the vector (see embedding_model_versions)
+    dimension INTEGER,
     chunk_index INTEGER, -- Order of the chunk within the document
+    token_count INTEGER, -- Embedding-model tokens in the chunk
+    page_start INTEGER, -- 1-based page span of the chunk in the source PDF
+    page_end INTEGER,
+    char_start INTEGER, -- [char_start, char_end) span within uploaded_documents.parsed_text
+    char_end INTEGER,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
--- Index for efficient vector search
-CREATE INDEX ON embeddings USING ivfflat (embedding vector_l2_ops); -- Or vector_cosine_ops depending on similarity metric
+-- Index for efficient vector search: one partial index per embedding model, with the model's dimension, e.g.
+-- CREATE INDEX ON embeddings USING ivfflat ((embedding::vector(384)) vector_l2_ops) WHERE model_name = 'all-MiniLM-L6-v2';
+CREATE INDEX idx_embeddings_model_id ON embeddings (model_name, id); -- One model's rows in id order
+CREATE INDEX idx_embeddings_document_chunk ON embeddings (uploaded_document_id, chunk_index);
+
+-- Embedding model versions: exactly one 'active' row is served by retrieval, a 'building' row is being re-embedded
+CREATE TABLE embedding_model_versions (
+    id SERIAL PRIMARY KEY,
+    model_name VARCHAR(100) UNIQUE NOT NULL,
+    dimension INTEGER,
+    status VARCHAR(20) DEFAULT 'building', -- 'building', 'active', 'retired', 'failed'
+    source_model_name VARCHAR(100), -- Model whose rows are being re-embedded
+    last_source_embedding_id INTEGER DEFAULT 0, -- Checkpoint: highest source row already re-embedded
+    rows_done INTEGER DEFAULT 0,
+    error TEXT,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    activated_at TIMESTAMP WITH TIME ZONE,
+    lease_expires_at TIMESTAMP WITH TIME ZONE, -- The worker running the job holds it until then (renewed every batch)
+    lease_owner VARCHAR(32) -- Token of the claim holding the lease; every batch commit checks it
+);
 
 -- Table for Generated Documents
 CREATE TABLE generated_documents (
@@ -50,12 +80,19 @@ CREATE TABLE generated_documents (
     pdf_filepath VARCHAR(255),
     admin_inputs JSONB, -- Stores the specific inputs provided by the admin for generation
     rag_context_ids INTEGER[], -- Array of IDs from `embeddings` table used for RAG
+    prompt_tokens INTEGER, -- Token counts of the LLM call that produced `content`
+    context_tokens INTEGER, -- RAG context share of prompt_tokens
+    completion_tokens INTEGER,
     status VARCHAR(20) DEFAULT 'draft', -- e.g., 'draft', 'approved', 'rejected'
     version INTEGER DEFAULT 1,
     parent_document_id INTEGER REFERENCES generated_documents(id) ON DELETE SET NULL, -- For versioning/drafts
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Keyset-paginated history listing: WHERE generated_by = ? ORDER BY generation_date DESC, id DESC
+CREATE INDEX idx_generated_documents_user_date ON generated_documents (generated_by, generation_date DESC, id DESC);
+CREATE INDEX idx_generated_documents_parent ON generated_documents (parent_document_id);
+
 -- Table for Timetable Configuration (e.g., courses, faculties, rooms)
 CREATE TABLE timetable_configurations (
     id SERIAL PRIMARY KEY,
@@ -117,6 +154,49 @@ CREATE TABLE timetable_drafts (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX idx_timetable_drafts_user_date ON timetable_drafts (generated_by, generation_date DESC, id DESC);
+CREATE INDEX idx_timetable_drafts_config ON timetable_drafts (config_id);
+
+-- Bulk PDF exports (see app/services/bulk_export.py); the archives live under EXPORT_FOLDER
+CREATE TABLE export_jobs (
+    id VARCHAR(32) PRIMARY KEY, -- uuid4 hex, also the archive's file name
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    document_ids JSONB,
+    timetable_draft_id INTEGER,
+    status VARCHAR(20) DEFAULT 'pending', -- 'pending', 'running', 'completed', 'failed'
+    total INTEGER DEFAULT 0,
+    done INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0,
+    errors JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP, -- Heartbeat of the building worker
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX idx_export_jobs_created_at ON export_jobs (created_at);
+
+-- Failed logins per rate-limit key (see app/utils/rate_limit.py), shared by all worker processes
+CREATE TABLE login_failures (
+    id SERIAL PRIMARY KEY,
+    key VARCHAR(255) NOT NULL, -- 'user:<username>' or 'ip:<client address>'
+    failed_at DOUBLE PRECISION NOT NULL -- Unix time
+);
+
+CREATE INDEX idx_login_failures_key_time ON login_failures (key, failed_at);
+CREATE INDEX idx_login_failures_failed_at ON login_failures (failed_at);
+
+-- Full-text search (see app/services/search_service.py): weighted tsvectors kept current by Postgres itself.
+-- Bodies are indexed up to TSVECTOR_MAX_CHARS (250000) characters; a tsvector cannot exceed 1 MB.
+ALTER TABLE generated_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') || setweight(to_tsvector('english', left(coalesce(content, ''), 250000)), 'B')
+) STORED;
+CREATE INDEX idx_generated_documents_search_vector ON generated_documents USING GIN (search_vector);
+
+ALTER TABLE uploaded_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(filename, '')), 'A') || setweight(to_tsvector('english', left(coalesce(parsed_text, ''), 250000)), 'B')
+) STORED;
+CREATE INDEX idx_uploaded_documents_search_vector ON uploaded_documents USING GIN (search_vector);
+
 -- Table for Explainable AI (XAI) logs for Timetable Generation
 CREATE TABLE xai_logs (
     id SERIAL PRIMARY KEY,
@@ -129,6 +209,8 @@ CREATE TABLE xai_logs (
     priority INTEGER DEFAULT 1 -- Higher priority for critical issues
 );
 
+CREATE INDEX idx_xai_logs_draft_timestamp ON xai_logs (timetable_draft_id, timestamp);
+
 -- Trigger to update `updated_at` column automatically
 CREATE OR REPLACE FUNCTION update_timestamp()
 RETURNS TRIGGER AS $$
@@ -146,9 +228,20 @@ CREATE TRIGGER update_uploaded_documents_timestamp
 BEFORE UPDATE ON uploaded_documents
 FOR EACH ROW EXECUTE FUNCTION update_timestamp();
 
+-- Recording the rendered PDF's path is not an edit: leave updated_at (the PDF cache key) alone
+CREATE OR REPLACE FUNCTION update_generated_documents_timestamp()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (to_jsonb(NEW) - 'pdf_filepath' - 'updated_at') IS DISTINCT FROM (to_jsonb(OLD) - 'pdf_filepath' - 'updated_at') THEN
+        NEW.updated_at = NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
 CREATE TRIGGER update_generated_documents_timestamp
 BEFORE UPDATE ON generated_documents
-FOR EACH ROW EXECUTE FUNCTION update_timestamp();
+FOR EACH ROW EXECUTE FUNCTION update_generated_documents_timestamp();
 
 CREATE TRIGGER update_timetable_configurations_timestamp
 BEFORE UPDATE ON timetable_configurations
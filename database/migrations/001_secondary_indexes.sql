@@ -0,0 +1,9 @@
+-- Secondary indexes for databases created from init.sql before they were added there.
+-- CONCURRENTLY builds each index without blocking writes; run outside a transaction
+-- block, e.g. psql -f 001_secondary_indexes.sql. (SQLite databases get them from `flask init-db`.)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_generated_documents_user_date ON generated_documents (generated_by, generation_date DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_generated_documents_parent ON generated_documents (parent_document_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_timetable_drafts_user_date ON timetable_drafts (generated_by, generation_date DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_timetable_drafts_config ON timetable_drafts (config_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_xai_logs_draft_timestamp ON xai_logs (timetable_draft_id, timestamp);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_document_chunk ON embeddings (uploaded_document_id, chunk_index);
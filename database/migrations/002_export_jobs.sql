@@ -0,0 +1,17 @@
+-- Export job state shared by all worker processes, for databases created from init.sql before it was added.
+-- (SQLite databases get it from `flask init-db`.)
+CREATE TABLE IF NOT EXISTS export_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    document_ids JSONB,
+    timetable_draft_id INTEGER,
+    status VARCHAR(20) DEFAULT 'pending',
+    total INTEGER DEFAULT 0,
+    done INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0,
+    errors JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS idx_export_jobs_created_at ON export_jobs (created_at);
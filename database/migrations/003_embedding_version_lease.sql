@@ -0,0 +1,4 @@
+-- Lease of the worker running a re-embedding job, for databases created from init.sql before it was added.
+-- Databases without embedding_model_versions get the table, lease included, from 007.
+-- (SQLite databases get it from `flask init-db`.)
+ALTER TABLE IF EXISTS embedding_model_versions ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,17 @@
+-- Rebuild the full-text columns over a bounded prefix of each body (a tsvector cannot exceed 1 MB,
+-- so indexing a long parsed PDF in full fails its INSERT). A generated column's expression cannot be
+-- altered in place: this drops and re-adds it, rewriting both tables. Run in a maintenance window.
+-- (`flask init-db` does the same when it finds the old expression; SQLite's FTS5 tables are unaffected.)
+BEGIN;
+ALTER TABLE generated_documents DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE generated_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') || setweight(to_tsvector('english', left(coalesce(content, ''), 250000)), 'B')
+) STORED;
+CREATE INDEX idx_generated_documents_search_vector ON generated_documents USING GIN (search_vector);
+
+ALTER TABLE uploaded_documents DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE uploaded_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(filename, '')), 'A') || setweight(to_tsvector('english', left(coalesce(parsed_text, ''), 250000)), 'B')
+) STORED;
+CREATE INDEX idx_uploaded_documents_search_vector ON uploaded_documents USING GIN (search_vector);
+COMMIT;
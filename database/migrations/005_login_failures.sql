@@ -0,0 +1,9 @@
+-- Login failure counts shared by all worker processes, for databases created from init.sql before it was added.
+-- (SQLite databases get it from `flask init-db`.)
+CREATE TABLE IF NOT EXISTS login_failures (
+    id SERIAL PRIMARY KEY,
+    key VARCHAR(255) NOT NULL,
+    failed_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_login_failures_key_time ON login_failures (key, failed_at);
+CREATE INDEX IF NOT EXISTS idx_login_failures_failed_at ON login_failures (failed_at);
@@ -0,0 +1,4 @@
+-- Per-user token version carried in JWTs as "ver" (bumping it revokes issued tokens),
+-- for databases created from init.sql before it was added. Existing users start at 1.
+-- (SQLite databases get it from `flask init-db`.)
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,30 @@
+-- Embedding model versioning (re-embedding with a new model next to the served one), for databases
+-- created from init.sql before it was added. Afterwards run `flask init-db`: it records the configured
+-- EMBEDDING_MODEL_NAME as the active version and tags the existing rows with it.
+-- (SQLite databases get all of this from `flask init-db`.)
+BEGIN;
+-- Vectors of several models (and dimensions) coexist during re-embedding; the old ivfflat index
+-- is tied to the fixed dimension, so it is replaced by per-model partial indexes (see init.sql)
+DROP INDEX IF EXISTS embeddings_embedding_idx;
+ALTER TABLE embeddings ALTER COLUMN embedding TYPE VECTOR;
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS model_name VARCHAR(100);
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS dimension INTEGER;
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS chunk_index INTEGER;
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS token_count INTEGER;
+CREATE INDEX IF NOT EXISTS idx_embeddings_model_id ON embeddings (model_name, id);
+
+CREATE TABLE IF NOT EXISTS embedding_model_versions (
+    id SERIAL PRIMARY KEY,
+    model_name VARCHAR(100) UNIQUE NOT NULL,
+    dimension INTEGER,
+    status VARCHAR(20) DEFAULT 'building',
+    source_model_name VARCHAR(100),
+    last_source_embedding_id INTEGER DEFAULT 0,
+    rows_done INTEGER DEFAULT 0,
+    error TEXT,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    activated_at TIMESTAMP WITH TIME ZONE,
+    lease_expires_at TIMESTAMP WITH TIME ZONE
+);
+COMMIT;
@@ -0,0 +1,4 @@
+-- Raw-byte hash of uploads (deduplication before parsing), for databases created from init.sql before it was added.
+-- (SQLite databases get it from `flask init-db`.)
+ALTER TABLE uploaded_documents ADD COLUMN IF NOT EXISTS raw_content_hash VARCHAR(64);
+CREATE INDEX IF NOT EXISTS idx_uploaded_documents_raw_content_hash ON uploaded_documents (raw_content_hash);
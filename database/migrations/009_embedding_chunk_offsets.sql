@@ -0,0 +1,7 @@
+-- Page and character spans of chunks, for databases created from init.sql before they were added.
+-- (SQLite databases get them from `flask init-db`.)
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS page_start INTEGER;
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS page_end INTEGER;
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS char_start INTEGER;
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS char_end INTEGER;
+CREATE INDEX IF NOT EXISTS idx_embeddings_document_chunk ON embeddings (uploaded_document_id, chunk_index);
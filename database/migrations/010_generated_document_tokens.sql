@@ -0,0 +1,5 @@
+-- Token counts of the LLM call behind a generated document, for databases created from init.sql before they were added.
+-- (SQLite databases get them from `flask init-db`.)
+ALTER TABLE generated_documents ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER;
+ALTER TABLE generated_documents ADD COLUMN IF NOT EXISTS context_tokens INTEGER;
+ALTER TABLE generated_documents ADD COLUMN IF NOT EXISTS completion_tokens INTEGER;
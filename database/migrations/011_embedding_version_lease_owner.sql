@@ -0,0 +1,3 @@
+-- Owner token of a re-embedding lease, so a worker that lost its lease stops writing,
+-- for databases created from init.sql before it was added. (SQLite databases get it from `flask init-db`.)
+ALTER TABLE embedding_model_versions ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(32);
@@ -0,0 +1,6 @@
+-- Replaces the single-column model_name index with (model_name, id), which also serves reading one
+-- model's rows in id order (re-embedding batches, the non-vector retrieval fallback), for databases
+-- created from init.sql before the change. CONCURRENTLY: run outside a transaction block.
+-- (SQLite databases get the new index from `flask init-db`.)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_embeddings_model_id ON embeddings (model_name, id);
+DROP INDEX CONCURRENTLY IF EXISTS idx_embeddings_model_name;
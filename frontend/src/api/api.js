@@ -75,7 +75,7 @@ const mockApi = {
   getDrafts: () =>
     new Promise((resolve) => {
       setTimeout(() => {
-        resolve({ data: MOCK_DATA.drafts });
+        resolve({ data: { items: MOCK_DATA.drafts, next_cursor: null } });
       }, 300);
     }),
 
@@ -167,8 +167,97 @@ if (api) {
       return Promise.reject(error);
     }
   );
+
+  // On an expired access token, swap the refresh token for a new one and retry the request once
+  api.interceptors.response.use(
+    (response) => response,
+    async (error) => {
+      const original = error.config;
+      if (error.response?.status !== 401 || !original || original._retried || original.url === '/refresh') {
+        return Promise.reject(error);
+      }
+      const token = await refreshAccessToken();
+      if (!token) {
+        return Promise.reject(error);
+      }
+      original._retried = true;
+      original.headers.Authorization = `Bearer ${token}`;
+      return api(original);
+    }
+  );
 }
 
+// One refresh at a time; concurrent 401s wait for the same new access token
+let refreshing = null;
+const refreshAccessToken = () => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) {
+    return Promise.resolve(null);
+  }
+  if (!refreshing) {
+    refreshing = axios.post(`${API_BASE_URL}/refresh`, null, {
+      headers: { Authorization: `Bearer ${refreshToken}` },
+    })
+      .then((response) => {
+        localStorage.setItem('token', response.data.access_token);
+        return response.data.access_token;
+      })
+      .catch(() => {
+        localStorage.removeItem('refresh_token');
+        return null;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+// POST a JSON body and consume a text/event-stream response (EventSource only supports GET)
+const streamSse = async (path, body, onDelta) => {
+  const post = (token) => fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(body),
+  });
+  let response = await post(localStorage.getItem('token'));
+  if (response.status === 401) {
+    const token = await refreshAccessToken();
+    if (token) response = await post(token);
+  }
+  if (!response.ok || !response.body) {
+    throw new Error(`Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach((line) => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      });
+      const payload = data ? JSON.parse(data) : {};
+      if (event === 'delta') onDelta(payload.text);
+      else if (event === 'done') return payload;
+      else if (event === 'error') throw new Error(payload.error || payload.message);
+    }
+  }
+  throw new Error('Stream ended before the document was saved');
+};
+
 export const auth = {
   login: (username, password) => USE_DEMO_MODE
     ? mockApi.login(username, password)
@@ -189,9 +278,15 @@ export const documents = {
   generateDocument: (docType, inputs) => USE_DEMO_MODE
     ? Promise.resolve({ data: { id: 1, message: 'Mock generation' } })
     : api.post('/generate-document', { document_type: docType, inputs }),
-  getDocumentsHistory: () => USE_DEMO_MODE
-    ? Promise.resolve({ data: [] })
-    : api.get('/documents/history'),
+  // Streams generated text via Server-Sent Events; onDelta receives each piece as it arrives.
+  // Resolves with the `done` payload ({ document_id, ... }).
+  generateDocumentStream: (docType, inputs, onDelta) => USE_DEMO_MODE
+    ? Promise.resolve({ document_id: 1, message: 'Mock generation' })
+    : streamSse('/generate-document/stream', { document_type: docType, inputs }, onDelta),
+  // Paginated: params { limit, cursor, document_type, status, q }; resolves with { items, next_cursor }
+  getDocumentsHistory: (params = {}) => USE_DEMO_MODE
+    ? Promise.resolve({ data: { items: [], next_cursor: null } })
+    : api.get('/documents/history', { params }),
   getDocumentDetails: (docId) => USE_DEMO_MODE
     ? Promise.resolve({ data: {} })
     : api.get(`/documents/${docId}`),
@@ -207,9 +302,10 @@ export const timetable = {
   getConfigurations: () => USE_DEMO_MODE
     ? mockApi.getConfigurations()
     : api.get('/timetable/configs'),
-  getDrafts: () => USE_DEMO_MODE
+  // Paginated: params { limit, cursor, status, q }; resolves with { items, next_cursor }
+  getDrafts: (params = {}) => USE_DEMO_MODE
     ? mockApi.getDrafts()
-    : api.get('/timetable/drafts'),
+    : api.get('/timetable/drafts', { params }),
   getDraftDetails: (draftId) => USE_DEMO_MODE
     ? Promise.resolve({ data: MOCK_DATA.drafts.find(d => d.id === parseInt(draftId)) || {} })
     : api.get(`/timetable/drafts/${draftId}`),
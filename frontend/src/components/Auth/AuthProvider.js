@@ -21,6 +21,9 @@ export const AuthProvider = ({ children }) => {
     try {
       const response = await authApi.login(username, password);
       localStorage.setItem('token', response.data.access_token);
+      if (response.data.refresh_token) {
+        localStorage.setItem('refresh_token', response.data.refresh_token);
+      }
       setIsAuthenticated(true);
       return true;
     } catch (error) {
@@ -32,6 +35,7 @@ export const AuthProvider = ({ children }) => {
 
   const logout = useCallback(() => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     setIsAuthenticated(false);
   }, []);
 
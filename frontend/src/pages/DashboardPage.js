@@ -14,15 +14,15 @@ const DashboardPage = () => {
   const [shouldStartRealtime, setShouldStartRealtime] = useState(false);
 
   const handleDocumentGenerate = async (docType, inputs) => {
+    const title = inputs.title || 'Untitled Document';
     try {
-      const response = await documents.generateDocument(docType, inputs);
-      setGeneratedDocument({
-        id: response.data.document_id,
-        content: response.data.generated_text,
-        type: docType,
-        title: inputs.title || 'Untitled Document'
-      });
       setGeneratedTimetable(null); // Clear timetable if generating doc
+      setGeneratedDocument({ id: null, content: '', type: docType, title });
+      // Render text as it streams in instead of waiting for the full response
+      const result = await documents.generateDocumentStream(docType, inputs, (text) => {
+        setGeneratedDocument((doc) => ({ ...doc, content: doc.content + text }));
+      });
+      setGeneratedDocument((doc) => ({ ...doc, id: result.document_id }));
     } catch (error) {
       console.error('Error generating document:', error);
       alert('Failed to generate document. Check console for details.');
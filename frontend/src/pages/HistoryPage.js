@@ -4,6 +4,8 @@ import DocumentPreview from '../components/Dashboard/DocumentPreview';
 
 const HistoryPage = () => {
   const [documentHistory, setDocumentHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [selectedDocument, setSelectedDocument] = useState(null);
@@ -12,7 +14,8 @@ const HistoryPage = () => {
     const fetchHistory = async () => {
       try {
         const response = await documents.getDocumentsHistory();
-        setDocumentHistory(response.data);
+        setDocumentHistory(response.data.items);
+        setNextCursor(response.data.next_cursor);
       } catch (err) {
         console.error('Failed to fetch document history:', err);
         setError('Failed to load document history. Please try again.');
@@ -23,6 +26,20 @@ const HistoryPage = () => {
     fetchHistory();
   }, []);
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await documents.getDocumentsHistory({ cursor: nextCursor });
+      setDocumentHistory((previous) => [...previous, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      console.error('Failed to fetch more document history:', err);
+      alert('Could not load more documents.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleViewDocument = async (docId) => {
     try {
       const response = await documents.getDocumentDetails(docId);
@@ -96,6 +113,15 @@ const HistoryPage = () => {
               ))}
             </ul>
           )}
+          {nextCursor && (
+            <button
+              onClick={handleLoadMore}
+              disabled={loadingMore}
+              className="mt-3 w-full text-sm text-indigo-600 hover:text-indigo-900 disabled:text-gray-400"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
 
         <div className="md:col-span-2">